@@ -0,0 +1,11 @@
+## ImagesLoader2Jpeg library.
+## The toolbox scripts and the command line (python -m imagesloader) are thin
+## wrappers around these modules. arcpy is only imported by the stages that
+## need it (see gis.py).
+from .options import LoaderOptions
+from .profiles import OutputProfile
+from .loader import plan, run, watch
+from .pipeline import ImageResult, CancelToken, convert_folder, aconvert_folder
+from .watch import watch_folder
+from .metadata import writeMetadataTemplate
+from .cli import main
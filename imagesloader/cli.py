@@ -0,0 +1,223 @@
+## Command line of the ImagesLoader.
+## Only the 'run', 'watch' and 'tiles' sub commands and the metadata reading 'template' load arcpy;
+## 'list', 'plan', 'template --blank' and 'catalog' start without it.
+import argparse
+import sys
+
+
+def cmdList(args):
+    from .discovery import listImages
+    for f in listImages(args.image_folder):
+        print(f)
+    return 0
+
+
+def cmdPlan(args):
+    from .loader import plan
+    for source, target in plan(args.image_folder):
+        print(source + ' -> ' + target)
+    return 0
+
+
+def cmdTemplate(args):
+    from .metadata import writeMetadataTemplate
+    print(writeMetadataTemplate(args.image_folder, args.out_folder, read_metadata=not args.blank))
+    return 0
+
+
+def cmdCatalog(args):
+    from .records import RecordStore
+    store = RecordStore.fromLog(args.log)
+    if args.count:
+        for (crs, status), n in sorted(store.counts(args.status, args.crs).items()):
+            print(f"{crs}|{status}|{n}")
+    else:
+        for r in store.select(args.status, args.crs):
+            print('|'.join([r.source, r.output, r.status, r.error]))
+    return 0
+
+
+# options of the run and watch commands
+def runOptions(args):
+    from .loader import LoaderOptions
+    from .profiles import parseProfile, parseBytes
+    return LoaderOptions(image_folder=args.image_folder, out_folder_path=args.out_folder,
+                         metadatafile=args.metadata or '', georeference_checked=bool(args.georeference_shp),
+                         georeference_file=args.georeference_shp or '', path_field=args.path_field,
+                         flt_dir_field=args.flt_dir_field, scale_dir_field=args.scale_field, gdb=args.gdb or '',
+                         georeference_profiles=args.georeference_profiles or '',
+                         georeference_region=args.georeference_region or '',
+                         discovery_workers=args.discovery_workers, snapshot=args.snapshot or '',
+                         group_workers=args.group_workers, convert_workers=args.convert_workers,
+                         downsample=args.downsample, output_format=args.output_format,
+                         max_bytes=parseBytes(args.max_bytes), bpp=args.bpp,
+                         profiles=[parseProfile(p) for p in args.profile],
+                         passthrough=not args.no_passthrough, north_up=args.north_up, fingerprint=args.fingerprint,
+                         stream_threshold_mb=args.stream_threshold_mb,
+                         strip_mb=args.strip_mb, stretch=args.stretch, stretch_clip=args.stretch_clip,
+                         stretch_stddev=args.stretch_stddev, memory_budget_mb=args.memory_budget_mb,
+                         tiles=args.tiles or '', tiles_format=args.tiles_format, tile_image=args.tile_image,
+                         tile_min_zoom=args.tile_min_zoom, tile_max_zoom=args.tile_max_zoom,
+                         tile_workers=args.tile_workers, executor=args.executor, profiling=args.profiling)
+
+
+def cmdRun(args):
+    from .loader import run
+    print(run(runOptions(args)))
+    return 0
+
+
+# watch the folder until Ctrl+C, which finishes the images already taken
+def cmdWatch(args):
+    import signal
+    import threading
+    from .loader import watch
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    print(watch(runOptions(args), stop, settle=args.settle, poll=args.poll, initial=args.initial))
+    return 0
+
+
+# web tiles of the images loaded by a run, from its log
+def cmdTiles(args):
+    from .loader import LoaderOptions, writeTiles
+    from .records import RecordStore
+    options = LoaderOptions('', '', tiles=args.tiles, tiles_format=args.tiles_format, tile_image=args.tile_image,
+                            tile_min_zoom=args.tile_min_zoom, tile_max_zoom=args.tile_max_zoom,
+                            tile_workers=args.tile_workers)
+    summary = writeTiles(RecordStore.fromLog(args.log).loaded(), options)
+    for group, (written, deleted, zooms) in sorted(summary.items()):
+        print(f"{group}|{written}|{deleted}|{zooms[0] if zooms else ''}-{zooms[1] if zooms else ''}")
+    return 0
+
+
+# arguments of the web tiles
+def addTileArguments(p):
+    p.add_argument('--tiles-format', choices=['xyz', 'mbtiles'], default='xyz',
+                   help='{z}/{x}/{y} files or an MBTiles file per coordinate system group')
+    p.add_argument('--tile-image', choices=['png', 'jpg'], default='png',
+                   help='png tiles are transparent outside the images')
+    p.add_argument('--tile-min-zoom', type=int, default=-1, help='least detailed zoom level (default: the group)')
+    p.add_argument('--tile-max-zoom', type=int, default=-1,
+                   help='most detailed zoom level (default: the resolution of the images)')
+    p.add_argument('--tile-workers', type=int, default=8, help='tiles drawn concurrently')
+
+
+# arguments of the run and watch commands
+def addRunArguments(p):
+    p.add_argument('image_folder')
+    p.add_argument('out_folder')
+    p.add_argument('--metadata', help='metadata csv created by the template command')
+    p.add_argument('--gdb', help='existing file geodatabase of the output folder to add the images to')
+    p.add_argument('--georeference-shp', help='centerpoint shapefile to georeference non-projected images')
+    p.add_argument('--path-field', default='')
+    p.add_argument('--flt-dir-field', default='')
+    p.add_argument('--scale-field', default='')
+    p.add_argument('--georeference-profiles',
+                   help='csv of pixel size and center offsets by flight direction, scale and region')
+    p.add_argument('--georeference-region', help='region of the georeference profiles to use first')
+    p.add_argument('--discovery-workers', type=int, default=16,
+                   help='folders listed concurrently while looking for the images')
+    p.add_argument('--snapshot', help='json snapshot of the folder tree; unchanged folders are not listed again')
+    p.add_argument('--group-workers', type=int, default=4,
+                   help='number of coordinate system groups built concurrently')
+    p.add_argument('--convert-workers', type=int, default=4,
+                   help='number of images converted concurrently, largest first')
+    p.add_argument('--downsample', type=int, default=1,
+                   help='reduce the images by this factor (streamed conversion)')
+    p.add_argument('--output-format', choices=['jpeg', 'cog'], default='jpeg',
+                   help='reduced images as jpegs with a world file or as cloud optimized GeoTIFFs (tiled, with '
+                        'overviews)')
+    p.add_argument('--max-bytes', default='0',
+                   help="byte budget of every reduced jpeg, e.g. '500k'; the quality is searched per image")
+    p.add_argument('--bpp', type=float, default=0.0,
+                   help='byte budget of every reduced jpeg in bits per pixel; the quality is searched per image')
+    p.add_argument('--profile', action='append', default=[],
+                   help="extra output built from the same read, e.g. '_Thumbnails:max_size=256,quality=60' "
+                        "or '_Preview:factor=8,format=png' or '_Web:max_size=2048,max_bytes=300k' "
+                        "or '_COG:format=cog' (repeatable)")
+    p.add_argument('--no-passthrough', action='store_true',
+                   help='re-encode 8 bit jpeg sources instead of linking them with their world file')
+    p.add_argument('--north-up', action='store_true',
+                   help='turn the frames with a rotated world file (EW flight lines) north-up in the reduced images')
+    p.add_argument('--fingerprint', choices=['none', 'sample', 'full'], default='sample',
+                   help='convert the copies of an image found in several folders once: sampled or full hash')
+    p.add_argument('--stream-threshold-mb', type=int, default=1024,
+                   help='stream the conversion of images needing more memory than this')
+    p.add_argument('--strip-mb', type=int, default=64, help='source pixels read per strip when streaming')
+    p.add_argument('--stretch', choices=['none', 'minmax', 'percent', 'stddev'], default='none',
+                   help='8 bit rescale of 16 bit and float images, from a sample of their pixels')
+    p.add_argument('--stretch-clip', type=float, default=2.0, help='percent clipped at each end (percent)')
+    p.add_argument('--stretch-stddev', type=float, default=2.5, help='standard deviations kept (stddev)')
+    p.add_argument('--memory-budget-mb', type=int, default=0,
+                   help='memory budget of the conversions in flight (default: half of the physical memory)')
+    p.add_argument('--tiles', help='folder of the web tiles (Web Mercator) of every coordinate system group, '
+                                   'updated where new images were added')
+    addTileArguments(p)
+    p.add_argument('--executor', choices=['process', 'thread'], default='process',
+                   help='convert and build the mosaic datasets in worker processes or in threads')
+    p.add_argument('--profiling', choices=['none', 'cprofile', 'sample'], default='none',
+                   help='profile the stages (cProfile or sampled stacks) and count the arcpy and file system calls; '
+                        'written next to the log (the run uses --executor thread)')
+
+
+def buildParser():
+    parser = argparse.ArgumentParser(prog='imagesloader',
+                                     description='Downsize a folder of images to jpeg, add their metadata and '
+                                                 'group them in mosaic datasets.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('list', help='list the images of a folder')
+    p.add_argument('image_folder')
+    p.set_defaults(func=cmdList)
+
+    p = sub.add_parser('plan', help='show where every reduced image would be written')
+    p.add_argument('image_folder')
+    p.set_defaults(func=cmdPlan)
+
+    p = sub.add_parser('template', help='create the metadata csv template (NoMetadataImagesList)')
+    p.add_argument('image_folder')
+    p.add_argument('out_folder')
+    p.add_argument('--blank', action='store_true',
+                   help='do not read the metadata of the images (only if they have none)')
+    p.set_defaults(func=cmdTemplate)
+
+    p = sub.add_parser('catalog', help='query the tracking log of a run')
+    p.add_argument('log')
+    p.add_argument('--status', help='only rows with this status (SUCCESS, FAILED)')
+    p.add_argument('--crs', help='only rows with this output coordinate system')
+    p.add_argument('--count', action='store_true', help='count rows per coordinate system and status')
+    p.set_defaults(func=cmdCatalog)
+
+    p = sub.add_parser('tiles', help='build or update the web tiles of the images of a run log (requires arcpy)')
+    p.add_argument('log')
+    p.add_argument('tiles')
+    addTileArguments(p)
+    p.set_defaults(func=cmdTiles)
+
+    p = sub.add_parser('run', help='run the ImagesLoader (requires arcpy)')
+    addRunArguments(p)
+    p.set_defaults(func=cmdRun)
+
+    p = sub.add_parser('watch', help='load the images written in the folder as they arrive, until Ctrl+C')
+    addRunArguments(p)
+    p.add_argument('--settle', type=float, default=2.0,
+                   help='seconds a file must stay unchanged before it is loaded')
+    p.add_argument('--poll', type=float, default=1.0,
+                   help='seconds between two scans of the folder when watchdog is not installed')
+    p.add_argument('--initial', action='store_true', help='also load the images already in the folder')
+    p.set_defaults(func=cmdWatch)
+    return parser
+
+
+def main(argv=None):
+    parser = buildParser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'tiles', None) and getattr(args, 'output_format', 'jpeg') == 'cog':
+        # the tiles are drawn from reduced images placed by their world file
+        parser.error("--tiles needs the jpeg output format (the COG outputs have no world file)")
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+## Cloud optimized GeoTIFF outputs: internally tiled, JPEG compressed, with
+## overviews and the georeferencing embedded, so range-read clients only
+## fetch the tiles and levels they show. CopyRaster writes them from a
+## source (convert.copyFromToCog); the images built by the streamed
+## conversion, written on disk strip by strip with their world file and
+## projection, are converted by GDAL when its python bindings are installed,
+## otherwise by CopyRaster.
+import os
+
+from .convert import copyFromToCog, COG_TILE
+
+
+# GDAL with the driver of a format, None when its python bindings or the driver are missing
+def gdalWith(driver):
+    try:
+        from osgeo import gdal
+    except ImportError:
+        return None
+    return gdal if gdal.GetDriverByName(driver) is not None else None
+
+
+# write a georeferenced 8 bit raster (world file and .prj) as a COG
+def writeCog(fromPath, toPath, quality=75):
+    if os.path.exists(toPath):
+        os.remove(toPath)
+    gdal = gdalWith('COG')
+    if gdal is None:
+        copyFromToCog(fromPath, toPath, quality)
+        return
+    gdal.Translate(toPath, fromPath, format='COG', creationOptions=[
+        'COMPRESS=JPEG', 'QUALITY=' + str(quality), 'BLOCKSIZE=' + str(COG_TILE), 'OVERVIEWS=AUTO',
+        'RESAMPLING=AVERAGE'])
@@ -0,0 +1,116 @@
+## Location of the reduced images and conversion of a source raster to jpeg.
+import os
+import re
+
+from . import gis
+from .records import splitPath
+
+# pixels of the internal tiles and overviews of the cloud optimized GeoTIFFs
+COG_TILE = 512
+
+
+# parent folder and name of a folder, whichever its separators ('\\' from the
+# toolbox, '/' from the discovery)
+def splitFolder(folder):
+    folder = folder.rstrip('/\\')
+    i = max(folder.rfind('/'), folder.rfind('\\'))
+    return folder[:max(i, 0)], folder[i + 1:]
+
+
+# next free version of the '<root name><suffix>_v#' folders next to the images folder
+def _nextIndex(image_folder, rootName, suffix):
+    prefix = rootName + suffix + '_v'
+    list_Reduced_folders = []
+    for elem in os.listdir(image_folder or '.'):
+        if os.path.isdir(os.path.join(image_folder, elem)):
+            if prefix in elem:
+                list_Reduced_folders.append(elem)
+    listIndexes = []
+    for folder in list_Reduced_folders:
+        # version number after the prefix (the root name may hold digits too)
+        match = re.findall(r'\d+', folder[folder.find(prefix) + len(prefix):])
+        if len(match) > 0:
+            if match[0].isdigit():
+                listIndexes.append(int(match[0]))
+    max_index = 0
+    if len(listIndexes) != 0:
+        max_index = max(listIndexes) + 1
+    return max_index
+
+
+# next free '<root name><suffix>_v#' folder name next to the images folder
+def getIndexNewFolder(image_folder, suffix='_Reduced_Images'):
+    return getIndexNewFolders(image_folder, [suffix])[0]
+
+
+# '<root name><suffix>_v#' folder names of the outputs of a run, one per suffix,
+# all with the same version: the first one free for every suffix
+def getIndexNewFolders(image_folder, suffixes):
+    # Root Name of the input images folder
+    image_folder, rootName = splitFolder(image_folder)
+    index = max(_nextIndex(image_folder, rootName, suffix) for suffix in suffixes)
+    return [rootName + suffix + '_v' + str(index) for suffix in suffixes]
+
+
+# output paths of the images of a run. The output folders are next to the
+# images folder and mirror its sub folders; the ones of a source folder are
+# worked out once and created once (create), not for every image.
+class PathMapping:
+    def __init__(self, image_folder, outputFolders):
+        self.image_folder = image_folder.rstrip('/\\')
+        parent, rootName = splitFolder(image_folder)
+        self.outputRoots = [os.path.join(parent, name) for name in outputFolders]
+        # output folders of every source folder, and the source folders whose ones exist
+        self._folders = {}
+        self._created = set()
+
+    # output folders of a source folder (with its separator), one per output root
+    def foldersOf(self, folder):
+        folders = self._folders.get(folder)
+        if folders is None:
+            if folder.startswith(self.image_folder):
+                relative = folder[len(self.image_folder):]
+            else:
+                relative = os.path.relpath(folder, self.image_folder)
+            parts = [part for part in re.split(r'[\\/]', relative) if part not in ('', '.')]
+            folders = [os.path.join(root, *parts, '') for root in self.outputRoots]
+            self._folders[folder] = folders
+        return folders
+
+    # create the output folders of the folder of an image, the first time one of its images is seen
+    def create(self, path):
+        folder, name = splitPath(path)
+        if folder not in self._created:
+            for output in self.foldersOf(folder):
+                os.makedirs(output, exist_ok=True)
+            self._created.add(folder)
+
+    # path of an image in the output folder i
+    def outputPath(self, path, i=0, extension='.jpg'):
+        folder, name = splitPath(path)
+        return self.foldersOf(folder)[i] + os.path.splitext(name)[0] + extension
+
+
+def copyFromToReduce(fromPath, toPath):
+    gis.arcpy().management.CopyRaster(fromPath, toPath, '', None, "256", "NONE", "NONE", "8_BIT_UNSIGNED", "NONE",
+                                      "NONE", "JPEG", "NONE", "CURRENT_SLICE", "NO_TRANSPOSE")
+
+
+# jpeg of the given quality, or png, of an 8 bit raster (the images written by the streamed conversion)
+def copyFromToFormat(fromPath, toPath, format='JPEG', quality=75):
+    arcpy = gis.arcpy()
+    settings = {'compression': "JPEG " + str(quality)} if format == 'JPEG' else {}
+    with arcpy.EnvManager(**settings):
+        arcpy.management.CopyRaster(fromPath, toPath, '', None, "256", "NONE", "NONE", "8_BIT_UNSIGNED", "NONE",
+                                    "NONE", format, "NONE", "CURRENT_SLICE", "NO_TRANSPOSE")
+
+
+# cloud optimized GeoTIFF: internally tiled, JPEG compressed, with overviews
+# and the georeferencing embedded
+def copyFromToCog(fromPath, toPath, quality=75):
+    arcpy = gis.arcpy()
+    # set for this copy only: the other CopyRaster calls and the mosaic pyramids keep theirs
+    with arcpy.EnvManager(compression="JPEG " + str(quality), tileSize=str(COG_TILE) + " " + str(COG_TILE),
+                          pyramid="PYRAMIDS -1 BILINEAR JPEG " + str(quality) + " NO_SKIP"):
+        arcpy.management.CopyRaster(fromPath, toPath, '', None, "256", "NONE", "NONE", "8_BIT_UNSIGNED", "NONE",
+                                    "NONE", "COG", "NONE", "CURRENT_SLICE", "NO_TRANSPOSE")
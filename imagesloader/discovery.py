@@ -0,0 +1,142 @@
+## Discovery of the image files under a source folder. Pure python, no arcpy.
+## On network shares every directory listing is a round trip, so the run
+## lists many folders at once (DirectoryCrawler) and can keep a snapshot of
+## the tree: a folder whose modification time did not change since is not
+## listed again.
+import concurrent.futures
+import json
+import os
+
+listFormats = ['jpg', 'tif', 'png', 'jp2', 'img', 'bmp', 'gif', 'crf', 'bip']
+
+
+# is the file one of the raster formats handled by the loader
+def isImage(f):
+    return f[-3:] in listFormats or f[-4:] in listFormats or f[-6:] in listFormats
+
+
+# yield recursively the path and stat of the raster files of a folder
+def iterImageStats(path):
+    with os.scandir(path) as it:
+        entries = list(it)
+    for entry in entries:
+        if entry.is_file():
+            if isImage(entry.name):
+                yield path + "/" + entry.name, entry.stat()
+        elif entry.is_dir():
+            yield from iterImageStats(path + "/" + entry.name)
+
+
+# folders listed concurrently by the crawler
+CRAWL_WORKERS = 16
+
+
+# modification time, (name, size) of the images and names of the sub folders of a
+# folder; the listing of the snapshot when the folder has not changed since
+def _listFolder(path, cached=None):
+    # read before the listing, so a folder changed meanwhile is listed again next time
+    mtime = os.stat(path).st_mtime_ns
+    if cached is not None and cached[0] == mtime:
+        return cached
+    files = []
+    folders = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_file():
+                if isImage(entry.name):
+                    files.append((entry.name, entry.stat().st_size))
+            elif entry.is_dir():
+                folders.append(entry.name)
+    return mtime, files, folders
+
+
+# listings of the folders under root saved by a previous crawl, keyed by their
+# path relative to root; empty when there is none or it was for another folder
+def readSnapshot(snapshot, root):
+    try:
+        with open(snapshot) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get('root') != root:
+        return {}
+    return {folder: (mtime, [tuple(file) for file in files], folders)
+            for folder, (mtime, files, folders) in data.get('folders', {}).items()}
+
+
+def writeSnapshot(snapshot, root, listings):
+    temp = snapshot + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump({'root': root, 'folders': listings}, f)
+    os.replace(temp, snapshot)
+
+
+# iterable of the (path, size) of the images under a folder, in the order their
+# folders are listed by a pool of worker threads. With a snapshot file, the
+# folders unchanged since the last crawl are not listed again, and the snapshot
+# is updated once the whole tree was crawled.
+class DirectoryCrawler:
+    def __init__(self, path, workers=CRAWL_WORKERS, snapshot=''):
+        self.path = path
+        self.workers = max(1, workers)
+        self.snapshot = snapshot
+        # folders listed, and taken from the snapshot
+        self.listed = 0
+        self.reused = 0
+
+    def __iter__(self):
+        previous = readSnapshot(self.snapshot, self.path) if self.snapshot else {}
+        listings = {}
+        pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix='imagesloader-crawl')
+        try:
+            pending = {pool.submit(_listFolder, self.path, previous.get('')): ''}
+            while pending:
+                done, _ = concurrent.futures.wait(list(pending), return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    relative = pending.pop(future)
+                    listing = future.result()
+                    listings[relative] = listing
+                    if listing is previous.get(relative):
+                        self.reused = self.reused + 1
+                    else:
+                        self.listed = self.listed + 1
+                    mtime, files, folders = listing
+                    for name in folders:
+                        sub = relative + "/" + name
+                        pending[pool.submit(_listFolder, self.path + sub, previous.get(sub))] = sub
+                    for name, size in files:
+                        yield self.path + relative + "/" + name, size
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if self.snapshot:
+            writeSnapshot(self.snapshot, self.path, listings)
+
+
+# list recursively the raster files of a folder, sorted
+def listImages(path, workers=CRAWL_WORKERS):
+    return sorted(f for f, size in DirectoryCrawler(path, workers))
+
+
+def rasSize(raster):
+    if raster == '' or not os.path.exists(raster):
+        return 0
+    basename = os.path.basename(raster).split(".")[0]
+    rootFolder = os.path.dirname(raster)
+    associatedFiles = [os.path.join(rootFolder, f) for f in next(os.walk(os.path.dirname(raster)))[2] if
+                       f.split(".")[0] == basename]
+    if len(os.path.basename(raster).split(".")) == 1:
+        fileList = next(os.walk(raster))[2]
+        dirSize = sum([os.path.getsize(os.path.join(raster, f)) for f in fileList])
+        rasSize = sum([os.path.getsize(f) for f in associatedFiles]) + dirSize
+    else:
+        rasSize = sum([os.path.getsize(f) for f in associatedFiles])
+    return rasSize
+
+
+def convertSize(size, precision=2):
+    suffixes = ['B', 'KB', 'MB', 'GB', 'TB']
+    suffixIndex = 0
+    while size > 1024 and suffixIndex < 4:
+        suffixIndex += 1  # increment the index of the suffix
+        size = size / 1024.0  # apply the division
+    return "%.*f %s" % (precision, size, suffixes[suffixIndex])
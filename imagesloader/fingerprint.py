@@ -0,0 +1,94 @@
+## Content fingerprints of the source images, to find the frames copied in
+## several project folders and convert them only once.
+## A fingerprint is the size of the file and a hash of a few blocks spread
+## over it (or of the whole file with full=True), together with its world
+## file and projection, since the same pixels placed elsewhere are not the
+## same image. Files are only read when another one of the same size was
+## found, so a folder without copies costs no more than its listing.
+import hashlib
+import os
+
+from .worldfile import findWorldFile
+
+FINGERPRINTS = ['none', 'sample', 'full']
+
+# blocks hashed by the sampled fingerprint, evenly spread from the start to the end of the file
+SAMPLE_BLOCKS = 16
+SAMPLE_BLOCK_BYTES = 65536
+# bytes read at a time by the full fingerprint
+READ_BYTES = 1048576
+
+
+def _hashSidecars(digest, path):
+    for sidecar in (findWorldFile(path), os.path.splitext(path)[0] + '.prj'):
+        if sidecar != '' and os.path.isfile(sidecar):
+            with open(sidecar, 'rb') as f:
+                digest.update(f.read())
+        digest.update(b'\0')
+
+
+# fingerprint of the file path of size bytes, as a hex string
+def fingerprint(path, size, full=False):
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        if full or size <= SAMPLE_BLOCKS * SAMPLE_BLOCK_BYTES:
+            while True:
+                data = f.read(READ_BYTES)
+                if not data:
+                    break
+                digest.update(data)
+        else:
+            step = (size - SAMPLE_BLOCK_BYTES) // (SAMPLE_BLOCKS - 1)
+            for i in range(SAMPLE_BLOCKS):
+                f.seek(i * step)
+                digest.update(f.read(SAMPLE_BLOCK_BYTES))
+    _hashSidecars(digest, path)
+    return digest.hexdigest()
+
+
+# first image seen with the content of every image, fed in the order of discovery
+class DuplicateFinder:
+    def __init__(self, full=False):
+        self.full = full
+        # size of every path, and the only path of a size that is not read yet
+        # ('' once another file of that size was found)
+        self._sizes = {}
+        self._unread = {}
+        # fingerprint of the paths read so far, and the first path of every fingerprint
+        self._fingerprints = {}
+        self._originals = {}
+
+    def _fingerprint(self, path, size):
+        key = fingerprint(path, size, self.full)
+        self._fingerprints[path] = key
+        self._originals.setdefault(key, path)
+        return key
+
+    def _forget(self, path):
+        size = self._sizes.pop(path)
+        if self._unread.get(size) == path:
+            del self._unread[size]
+        key = self._fingerprints.pop(path, None)
+        if key is not None and self._originals.get(key) == path:
+            # the next image seen with that content becomes the original of the later ones
+            others = [other for other, otherKey in self._fingerprints.items() if otherKey == key]
+            if others:
+                self._originals[key] = others[0]
+            else:
+                del self._originals[key]
+
+    # the first image with the same content as path, None when path is the first one.
+    # A path given again (modified in watch mode) is fingerprinted anew.
+    def originalOf(self, path, size):
+        if path in self._sizes:
+            self._forget(path)
+        self._sizes[path] = size
+        unread = self._unread.get(size)
+        if unread is None:
+            self._unread[size] = path
+            return None
+        if unread != '':
+            self._fingerprint(unread, size)
+            self._unread[size] = ''
+        original = self._originals.get(self._fingerprint(path, size))
+        return original if original != path else None
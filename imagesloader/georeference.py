@@ -0,0 +1,262 @@
+## Georeferencing of the APFO images that have no known projection, by
+## generating a world file from the centerpoint shapefile.
+## The pixel size and the offset of the center point for every flight
+## direction and scale come from a profiles table (georeference_profiles.csv,
+## or the file given with --georeference-profiles), so a new project only
+## needs a new row. The world files of all the frames of the shapefile are
+## computed at once from its X/Y columns. Point shapefiles are read by
+## shapefile.py, so the world files can be written without arcpy; other
+## feature classes go through an arcpy cursor. The projection (WGS 1984 Web
+## Mercator) is written in .prj and .aux.xml sidecars instead of running
+## DefineProjection on every frame.
+import csv
+import os
+import xml.etree.ElementTree as ET
+
+from . import gis
+from .shapefile import readPointShapefile, shapefileFields
+from .worldfile import writeWorld
+
+DEFAULT_PROFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'georeference_profiles.csv')
+FLIGHT_DIRECTIONS = ('NS', 'EW')
+
+# errors of the frames that cannot be georeferenced; the first two follow the raster name
+MISSING_SCALE = "SHP is missing scale information, and a world file could not be created."
+UNKNOWN_DIRECTION = "SHP does not have a standard FLT_DIR attribute, and a world file could not be created."
+EMPTY_DIRECTION = "Referencing Info found but empty FLT_DIR"
+NOT_FOUND = "No referencing Info for this image in the SHP"
+
+# projection of the georeferenced frames (EPSG 3857)
+WEB_MERCATOR_WKT = ('PROJCS["WGS_1984_Web_Mercator_Auxiliary_Sphere",GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",'
+                    'SPHEROID["WGS_1984",6378137.0,298.257223563]],PRIMEM["Greenwich",0.0],'
+                    'UNIT["Degree",0.0174532925199433]],PROJECTION["Mercator_Auxiliary_Sphere"],'
+                    'PARAMETER["False_Easting",0.0],PARAMETER["False_Northing",0.0],'
+                    'PARAMETER["Central_Meridian",0.0],PARAMETER["Standard_Parallel_1",0.0],'
+                    'PARAMETER["Auxiliary_Sphere_Type",0.0],UNIT["Meter",1.0]]')
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required to georeference the images")
+    return numpy
+
+
+# shapefile read by shapefile.py instead of arcpy
+def isNativeShapefile(shp):
+    root, ext = os.path.splitext(shp)
+    return ext.lower() == '.shp' and os.path.isfile(root + '.shx') and os.path.isfile(root + '.dbf')
+
+
+# check if a field exist in a giving SHP
+def checkFieldinSHP(shp, path_field, flt_dir_field, scale_dir_field):
+    res = ''
+    if isNativeShapefile(shp):
+        listFields = shapefileFields(shp)
+    else:
+        desc = gis.arcpy().Describe(shp)
+        flds = desc.fields
+        listFields = []
+        for fld in flds:
+            listFields.append(fld.name)
+    if path_field not in listFields:
+        res = 'Missing path Column'
+    if flt_dir_field not in listFields:
+        res = res + ' Missing flt_dir Column'
+    if scale_dir_field not in listFields:
+        res = res + ' Missing scale Column'
+    return res
+
+
+# scale attribute as written in the profiles table ('20000' for 20000.0)
+def scaleKey(scale):
+    if isinstance(scale, float):
+        if scale != scale:
+            # empty numeric field
+            return ''
+        if scale.is_integer():
+            scale = int(scale)
+    return str(scale).strip()
+
+
+# read a profiles table: {(flt_dir, scale, region): (cell size, offset x, offset y)}
+def readProfiles(path=''):
+    profiles = {}
+    with open(path or DEFAULT_PROFILES, newline='') as f:
+        rows = csv.DictReader(line for line in f if not line.startswith('#'))
+        for row in rows:
+            fltDir = row['flt_dir'].strip().upper()
+            if fltDir not in FLIGHT_DIRECTIONS:
+                raise ValueError("Unknown flight direction " + row['flt_dir'] + " in " + (path or DEFAULT_PROFILES))
+            key = (fltDir, scaleKey(row['scale']), (row.get('region') or '').strip())
+            profiles[key] = (float(row['cell_size']), float(row['offset_x']), float(row['offset_y']))
+    return profiles
+
+
+# name of a raster as matched against the path field of the shapefile
+def rasterName(path):
+    name = path.replace('\\', '/')
+    name = name[name.rfind('/') + 1:]
+    return name[:name.rfind('.')] if '.' in name else name
+
+
+# rasterName of every path of an array of str
+def _rasterNames(paths):
+    np = _numpy()
+    names = np.char.rpartition(np.char.replace(paths, '\\', '/'), '/')[:, 2]
+    parts = np.char.rpartition(names, '.')
+    return np.where(parts[:, 1] == '.', parts[:, 0], names)
+
+
+# str array of a column, '' for the empty (None) values of a cursor
+def _strings(values):
+    np = _numpy()
+    if not isinstance(values, np.ndarray):
+        values = ['' if value is None else str(value) for value in values]
+    return np.array(values, dtype=str).reshape(len(values))
+
+
+# scale keys of a column: computed once per distinct value
+def _scaleKeys(scales):
+    np = _numpy()
+    if isinstance(scales, np.ndarray) and scales.dtype.kind == 'f':
+        values, inverse = np.unique(scales, return_inverse=True)
+        return np.array([scaleKey(float(v)) for v in values] or [''])[inverse.reshape(-1)]
+    return np.array([scaleKey(scale) for scale in scales], dtype=str)
+
+
+# world files of the frames of a centerpoint shapefile
+class GeoreferenceTable:
+    # errors of the rows, indexes in ERRORS
+    ERRORS = ['', EMPTY_DIRECTION, MISSING_SCALE, UNKNOWN_DIRECTION]
+
+    def __init__(self, paths, flightDirs, scales, xs, ys, profiles, region=''):
+        np = _numpy()
+        count = len(paths)
+        self.paths = _strings(paths)
+        directions = _strings(flightDirs)
+        keys = _scaleKeys(scales).reshape(count)
+        self.errors = np.zeros(count, dtype=np.int8)
+        self.errors[directions == ''] = 1
+        # profile of every row, looked up once per (direction, scale) combination
+        combinations, inverse = np.unique(np.char.add(np.char.add(directions, '|'), keys), return_inverse=True)
+        inverse = inverse.reshape(-1)
+        cells = np.full(len(combinations), np.nan)
+        offsetX = np.zeros(len(combinations))
+        offsetY = np.zeros(len(combinations))
+        rotated = np.zeros(len(combinations), dtype=bool)
+        self.unknown = {}
+        for i, combination in enumerate(combinations.tolist()):
+            fltDir, scale = combination.split('|', 1)
+            if fltDir == '':
+                continue
+            profile = profiles.get((fltDir, scale, region)) or profiles.get((fltDir, scale, ''))
+            if profile is None:
+                rows = inverse == i
+                self.errors[rows] = 2 if fltDir in FLIGHT_DIRECTIONS else 3
+                self.unknown[(fltDir, scale)] = int(rows.sum())
+                continue
+            cells[i], offsetX[i], offsetY[i] = profile
+            rotated[i] = fltDir == 'EW'
+        # one vectorised pass over the X/Y columns: NS (s, 0, 0, -s, x, y), EW (0, s, s, -0, x, y)
+        cell = cells[inverse]
+        turned = rotated[inverse]
+        zeros = np.zeros(count)
+        self.world = np.column_stack([np.where(turned, zeros, cell), np.where(turned, cell, zeros),
+                                      np.where(turned, cell, zeros), np.where(turned, -zeros, -cell),
+                                      np.asarray(xs, dtype=np.float64) + offsetX[inverse],
+                                      np.asarray(ys, dtype=np.float64) + offsetY[inverse]])
+        # frames by raster name; the first row of a name wins, like the cursor did
+        filled = np.nonzero(self.paths != '')[0]
+        names = _rasterNames(self.paths[filled])
+        self.rows = dict(zip(names[::-1].tolist(), filled[::-1].tolist()))
+
+    # read the frames of a centerpoint shapefile
+    @classmethod
+    def fromShapefile(cls, shp, path_field, flt_dir_field, scale_dir_field, profiles, region=''):
+        fields = [path_field, flt_dir_field, scale_dir_field, 'SHAPE@X', 'SHAPE@Y']
+        if isNativeShapefile(shp):
+            columns = readPointShapefile(shp, fields[:3])
+            return cls(*[columns[name] for name in fields], profiles, region)
+        columns = [[], [], [], [], []]
+        with gis.arcpy().da.SearchCursor(shp, fields) as cursor:
+            for row in cursor:
+                for column, value in zip(columns, row):
+                    column.append(value)
+        return cls(*columns, profiles, region)
+
+    # flight direction and scale combinations without a profile, with their number of frames
+    def unknownCombinations(self):
+        return dict(self.unknown)
+
+    # row of the shapefile of a raster, -1 when there is none
+    def find(self, raster_file):
+        name = rasterName(raster_file)
+        i = self.rows.get(name)
+        if i is not None:
+            return i
+        # the path field may hold more than the file name
+        np = _numpy()
+        matches = np.nonzero(np.char.find(self.paths, name) >= 0)[0]
+        return int(matches[0]) if len(matches) > 0 else -1
+
+    # world file of a raster, None with the error when it cannot be georeferenced
+    def worldOf(self, raster_file):
+        i = self.find(raster_file)
+        if i < 0:
+            return None, NOT_FOUND
+        error = self.ERRORS[self.errors[i]]
+        if error != '':
+            if error != EMPTY_DIRECTION:
+                error = rasterName(raster_file) + ' ' + error
+            return None, error
+        return tuple(self.world[i].tolist()), ''
+
+    # write the world file and the projection of a raster next to it and
+    # return the error, '' when it is georeferenced
+    def georeference(self, raster_file):
+        params, error = self.worldOf(raster_file)
+        if params is not None:
+            writeWorld(raster_file[:raster_file.rfind('.')] + '.tfw', params)
+            writeProjectionSidecars(raster_file)
+        return error
+
+
+# projection of a raster in its .prj and in the SRS of its .aux.xml, keeping
+# what the .aux.xml already holds (metadata, statistics)
+def writeProjectionSidecars(raster_file, wkt=WEB_MERCATOR_WKT):
+    with open(raster_file[:raster_file.rfind('.')] + '.prj', 'w') as f:
+        f.write(wkt)
+    auxPath = raster_file + '.aux.xml'
+    root = None
+    if os.path.isfile(auxPath):
+        try:
+            root = ET.parse(auxPath).getroot()
+        except ET.ParseError:
+            root = None
+    if root is None:
+        root = ET.Element('PAMDataset')
+    srs = root.find('SRS')
+    if srs is None:
+        srs = ET.Element('SRS')
+        root.insert(0, srs)
+    srs.text = wkt
+    ET.ElementTree(root).write(auxPath, encoding='UTF-8', xml_declaration=False)
+
+
+# georeference table of the shapefile of a run. The combinations of flight
+# direction and scale without a profile are reported once, with their number of frames.
+def loadGeoreferenceTable(Target_shapefile, path_field, flt_dir_field, scale_dir_field, profilesPath='',
+                          region=''):
+    if not os.path.exists(Target_shapefile):
+        raise ValueError("Georeference shapefile not found: " + Target_shapefile)
+    res = checkFieldinSHP(Target_shapefile, path_field, flt_dir_field, scale_dir_field)
+    if res != '':
+        raise ValueError(res)
+    table = GeoreferenceTable.fromShapefile(Target_shapefile, path_field, flt_dir_field, scale_dir_field,
+                                            readProfiles(profilesPath), region)
+    for (fltDir, scale), count in sorted(table.unknownCombinations().items()):
+        gis.addMessage(f"No georeference profile for FLT_DIR {fltDir} scale {scale} ({count} frames)")
+    return table
+
@@ -0,0 +1,43 @@
+## Lazy access to arcpy.
+## Importing arcpy costs several seconds of start-up, so only the stages
+## that actually open rasters, geodatabases or metadata load it. Planning,
+## blank template generation and log queries never touch it.
+import sys
+
+_arcpy = None
+
+
+# import arcpy on first use and keep the module around
+def arcpy():
+    global _arcpy
+    if _arcpy is None:
+        import arcpy as module
+        _arcpy = module
+    return _arcpy
+
+
+# arcpy metadata lib, loaded together with arcpy
+def metadata():
+    arcpy()
+    from arcpy import metadata as md
+    return md
+
+
+def arcpyLoaded():
+    return 'arcpy' in sys.modules
+
+
+# write to the geoprocessing messages when arcpy is already loaded,
+# otherwise to the console - never import arcpy just to print
+def addMessage(message):
+    if arcpyLoaded():
+        sys.modules['arcpy'].AddMessage(message)
+    else:
+        print(message)
+
+
+def addError(message):
+    if arcpyLoaded():
+        sys.modules['arcpy'].AddError(message)
+    else:
+        print(message, file=sys.stderr)
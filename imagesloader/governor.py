@@ -0,0 +1,138 @@
+## Memory governor of the conversion stage.
+## The peak memory of a conversion is estimated from the raster header
+## (width x height x bands x pixel type, plus the 8 bit output) and jobs are
+## only admitted while the sum of the estimates of the jobs in flight fits in
+## the budget. A job larger than the whole budget still runs, alone.
+import threading
+
+# bytes per pixel of the arcpy pixel types
+PIXEL_BYTES = {'U1': 1, 'U2': 1, 'U4': 1, 'U8': 1, 'S8': 1, 'U16': 2, 'S16': 2, 'U32': 4, 'S32': 4, 'F32': 4,
+               'F64': 8}
+
+# decoding buffers, format conversion and the encoder on top of the pixels
+OVERHEAD = 1.25
+
+
+def pixelBytes(pixelType):
+    return PIXEL_BYTES.get(str(pixelType).upper(), 4)
+
+
+def estimateMemory(width, height, bands, pixelType):
+    source = width * height * bands * pixelBytes(pixelType)
+    output = width * height * min(bands, 3)
+    return int((source + output) * OVERHEAD)
+
+
+# (width, height, bands, pixel type) from an arcpy Describe of the raster, None
+# when it cannot be read. The size of a multiband raster is read from its first band.
+def rasterHeader(desc):
+    try:
+        bands = desc.bandCount
+        band = desc.children[0] if bands > 1 else desc
+        return band.width, band.height, bands, band.pixelType
+    except Exception:
+        return None
+
+
+# physical memory of the machine, None when it cannot be read
+def physicalMemory():
+    try:
+        import psutil
+        return psutil.virtual_memory().total
+    except ImportError:
+        pass
+    try:
+        import os
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+# budget in bytes from the option in MB; 0 means half of the physical memory
+def memoryBudget(budget_mb):
+    if budget_mb > 0:
+        return budget_mb * 1048576
+    total = physicalMemory()
+    return total // 2 if total else None
+
+
+class MemoryGovernor:
+    def __init__(self, budget):
+        # None: no limit
+        self.budget = budget
+        self.inUse = 0
+        self.inFlight = 0
+        self.peakInUse = 0
+
+    def fits(self, estimate):
+        if self.budget is None or self.inFlight == 0:
+            return True
+        return self.inUse + estimate <= self.budget
+
+    def acquire(self, estimate):
+        self.inUse = self.inUse + estimate
+        self.inFlight = self.inFlight + 1
+        self.peakInUse = max(self.peakInUse, self.inUse)
+
+    def release(self, estimate):
+        self.inUse = self.inUse - estimate
+        self.inFlight = self.inFlight - 1
+
+
+# resident memory of the current process, None when it cannot be read
+def _rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        import resource
+        # high water mark only (kilobytes on linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+
+# growth of the resident memory of the process while a block runs, over its
+# resident memory when the block starts, sampled in a thread:
+#     with PeakRss() as peak:
+#         ...
+#     peak.value
+# The conversions running at the same time in the process add to it.
+class PeakRss:
+    interval = 0.05
+
+    def __init__(self):
+        self.start = None
+        self.peak = None
+        self._stop = threading.Event()
+
+    # bytes over the start, None when the memory cannot be read
+    @property
+    def value(self):
+        if self.start is None or self.peak is None:
+            return None
+        return max(self.peak - self.start, 0)
+
+    def _sample(self):
+        rss = _rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.start = _rss()
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return False
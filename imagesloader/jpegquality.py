@@ -0,0 +1,118 @@
+## Jpeg quality chosen per image to fit a byte budget (max_bytes or bits per
+## pixel of an output profile). The quality is searched on a proxy of the
+## image, a mosaic of tiles taken at full resolution over all of it, whose
+## encoded size scales with the area: a few encodes of a small image instead
+## of re-encoding the whole one. The whole image is then encoded once, and
+## again only when the estimate missed the budget. The streamed conversion
+## builds the proxy from the image it wrote on disk (stream.py).
+import io
+
+from .discovery import convertSize
+
+MIN_QUALITY = 10
+MAX_QUALITY = 95
+# the proxy: PROXY_TILES x PROXY_TILES tiles of TILE pixels (a multiple of the 16 pixels of the jpeg blocks)
+PROXY_TILES = 8
+TILE = 64
+# whole encodes after the first one when it is over the budget
+CORRECTIONS = 2
+
+
+def _pil():
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("Pillow is required to encode the jpegs within a byte budget")
+    return Image
+
+
+def jpegBytes(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+# (left, top) of the tiles of the proxy of a width x height image, its grid
+# (cols, rows) and tile size; None when the image is small enough to be its own proxy
+def proxyTiles(width, height):
+    side = PROXY_TILES * TILE
+    if width * height <= 2 * side * side:
+        return None
+    cols = max(1, min(PROXY_TILES, width // TILE))
+    rows = max(1, min(PROXY_TILES, height // TILE))
+    tileWidth = min(TILE, width)
+    tileHeight = min(TILE, height)
+    corners = []
+    for r in range(rows):
+        top = (height - tileHeight) * r // max(1, rows - 1) if rows > 1 else 0
+        for c in range(cols):
+            left = (width - tileWidth) * c // max(1, cols - 1) if cols > 1 else 0
+            corners.append((left, top))
+    return corners, (cols, rows), (tileWidth, tileHeight)
+
+
+# proxy of a Pillow image and the ratio of the area of the image to its own;
+# small images are their own proxy
+def proxyImage(image):
+    width, height = image.size
+    tiles = proxyTiles(width, height)
+    if tiles is None:
+        return image, 1.0
+    corners, (cols, rows), (tileWidth, tileHeight) = tiles
+    proxy = _pil().new(image.mode, (cols * tileWidth, rows * tileHeight))
+    for i, (left, top) in enumerate(corners):
+        proxy.paste(image.crop((left, top, left + tileWidth, top + tileHeight)),
+                    ((i % cols) * tileWidth, (i // cols) * tileHeight))
+    return proxy, width * height / (proxy.size[0] * proxy.size[1])
+
+
+# highest quality whose proxy size times scale fits the budget, MIN_QUALITY when none does
+def searchQuality(proxy, scale, budget, low=MIN_QUALITY, high=MAX_QUALITY):
+    best = low
+    while low <= high:
+        quality = (low + high) // 2
+        if len(jpegBytes(proxy, quality)) * scale <= budget:
+            best = quality
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best
+
+
+# encode an image within budget bytes at the highest quality found on its
+# proxy: encode(quality) writes the whole image and returns its size. Returns
+# the quality and the size of the last encode.
+def encodeWithin(proxy, scale, budget, encode):
+    quality = searchQuality(proxy, scale, budget)
+    size = encode(quality)
+    for i in range(CORRECTIONS):
+        if size <= budget or quality <= MIN_QUALITY:
+            break
+        # the proxy under-estimated this image: scale it by what the whole image gave
+        estimate = len(jpegBytes(proxy, quality)) * scale
+        scale = scale * size / max(1.0, estimate)
+        quality = min(quality - 1, searchQuality(proxy, scale, budget, high=quality - 1))
+        size = encode(quality)
+    return quality, size
+
+
+# save a Pillow image as a jpeg of at most budget bytes, at the highest quality
+# found, and return the quality and the size of the file
+def saveJpegWithin(image, path, budget):
+    proxy, scale = proxyImage(image)
+
+    def encode(quality):
+        data = jpegBytes(image, quality)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return len(data)
+
+    return encodeWithin(proxy, scale, budget, encode)
+
+
+# quality and size of an output for the log
+def describeQuality(quality, size, width, height, budget):
+    text = f"q{quality} {convertSize(size)} {size * 8 / max(1, width * height):.2f} bpp"
+    if size > budget:
+        text = text + ' (over budget)'
+    return text
@@ -0,0 +1,95 @@
+## ImagesLoader: converts a folder of images to reduced jpegs, writes their
+## metadata, groups them in one mosaic dataset per coordinate system and
+## writes the tracking log.
+import dataclasses
+from datetime import datetime
+
+from . import gis
+
+from .convert import getIndexNewFolder, PathMapping
+from .discovery import listImages
+from .options import LoaderOptions
+from .pipeline import convert_folder
+from .watch import watch_folder
+from .report import RunReport
+from .records import RecordStore
+from .runlog import writeRecords
+from .tiles import exportTiles
+from .profiling import RunProfiler
+
+
+# source and reduced path of every image of the folder, without touching
+# the images or creating any folder
+def plan(image_folder):
+    paths = PathMapping(image_folder, [getIndexNewFolder(image_folder)])
+    return [(f, paths.outputPath(f)) for f in listImages(image_folder)]
+
+
+# options of a run: a profiled run converts in threads, the profiler only sees
+# the calling process
+def _runOptions(options):
+    if options.profiling == 'none' or options.executor == 'thread':
+        return options
+    gis.addMessage("Profiling the run with the thread executor")
+    return dataclasses.replace(options, executor='thread')
+
+
+# profiler of a run (profiling.py), started; None when the run is not profiled
+def _startProfiler(options):
+    if options.profiling == 'none':
+        return None
+    profiler = RunProfiler(options.profiling)
+    profiler.start()
+    return profiler
+
+
+# write the log of the results of a run (kept in store), its report and its
+# profile when it is profiled; returns the path of the log
+def _writeRun(results, store, options, report, profiler=None):
+    try:
+        # the stream adds every result to the store
+        for result in results:
+            pass
+        if options.tiles:
+            writeTiles(store.loaded(), options, report)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+    report.finish()
+    # datetime object containing current date and time
+    dt_string = datetime.now().strftime("%d%m%Y_%Hh%Mmin%S")
+    report.write(options.out_folder_path, dt_string)
+    if profiler is not None:
+        profiler.write(options.out_folder_path, dt_string, len(store))
+    return writeRecords(store, options.out_folder_path, dt_string)
+
+
+# web tiles of the images loaded, (source, reduced image, crs), added to the report
+def writeTiles(loaded, options, report=None):
+    summary = exportTiles(loaded, options.tiles, options.tiles_format, options.tile_image, options.tile_min_zoom,
+                          options.tile_max_zoom, options.tile_workers)
+    if report is not None:
+        for group, (written, deleted, zooms) in summary.items():
+            report.addTiles(group, written, deleted, zooms)
+    return summary
+
+
+# run the whole loader and return the path of the log. The run report (and
+# the profile, options.profiling) is written next to it.
+def run(options):
+    options = _runOptions(options)
+    report = RunReport()
+    store = RecordStore()
+    profiler = _startProfiler(options)
+    return _writeRun(convert_folder(options, report=report, store=store), store, options, report, profiler)
+
+
+# load the images written in the folder until stop (a threading.Event) is
+# set, then write the log and the report of the session and return the path of the log
+def watch(options, stop=None, settle=2.0, poll=1.0, initial=False):
+    options = _runOptions(options)
+    report = RunReport()
+    store = RecordStore()
+    profiler = _startProfiler(options)
+    return _writeRun(watch_folder(options, stop, settle=settle, poll=poll, initial=initial, report=report,
+                                  store=store), store, options, report, profiler)
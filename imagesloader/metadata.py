@@ -0,0 +1,238 @@
+## Metadata csv template (NoMetadataImagesList) and metadata editing of the
+## source and reduced images. The metadata of file rasters is written
+## straight into the ArcGIS metadata document of their .aux.xml sidecar;
+## other rasters go through arcpy.metadata.
+import csv
+import os
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+from . import gis
+from .discovery import listImages
+
+# head of the metadata csv template
+templateHead = ['index', 'source file location', 'title', 'tags', 'summary', 'description', 'credits',
+                'Use limitations']
+
+
+def replace_txt(stringg):
+    stringg = stringg.replace('<DIV STYLE="text-align:Left;"><DIV><P><SPAN>', '').replace(
+        '<DIV STYLE="text-align:Left;"><DIV><DIV><P><SPAN>', '').replace('</SPAN></P></DIV></DIV>', '').replace(
+        '</DIV>', '')
+    return stringg
+
+
+def readMetadataFile(file):
+    list_of_csv = []
+    try:
+        with open(file, 'r') as read_obj:
+            # Return a reader object which will
+            # iterate over lines in the given csvfile
+            # csv_reader = csv.reader(read_obj, delimiter =';')
+            csv_reader = csv.reader(read_obj, delimiter='\n')
+            # convert string to list
+            list_of_csv = list(csv_reader)
+    except:
+        pass
+    return list_of_csv
+
+
+def getMetadataRaster(file, listFiles):
+    listFiles = listFiles[1:]
+    for f in listFiles:
+        x = f[0].split(';')
+        if x[1] == file:
+            return x
+    return []
+
+
+def edit_define_metadata(file, listMetadata):
+    md = gis.metadata()
+    # Create a new Metadata object and add some content to it
+    new_md = md.Metadata()
+    if len(listMetadata) < 6:
+        gis.addMessage(f"listMetadata={listMetadata}")
+        raise ValueError(f"Incomplete metadata row for {file}")
+    new_md.title = listMetadata[0]
+    new_md.tags = listMetadata[1]
+    new_md.summary = listMetadata[2]
+    new_md.description = listMetadata[3]
+    new_md.credits = listMetadata[4]
+    new_md.accessConstraints = listMetadata[5]
+    raster = gis.arcpy().Raster(file)
+    extent = raster.extent
+    new_md.extent = str(extent)
+    # Assign the Metadata object's content to a target item
+    tgt_item_md = md.Metadata(file)
+    if not tgt_item_md.isReadOnly:
+        tgt_item_md.copy(new_md)
+        tgt_item_md.save()
+
+
+# domain of the ArcGIS metadata document in the PAMDataset of a .aux.xml
+ESRI_DOMAIN = 'xml:ESRI'
+
+# elements of the metadata document set from a metadata csv row
+# (title, tags, summary, description, credits, use limitations)
+METADATA_ELEMENTS = [('title', 'dataIdInfo/idCitation/resTitle'), ('summary', 'dataIdInfo/idPurp'),
+                     ('description', 'dataIdInfo/idAbs'), ('credits', 'dataIdInfo/idCredit'),
+                     ('accessConstraints', 'dataIdInfo/resConst/Consts/useLimit'),
+                     ('extent', 'dataIdInfo/dataExt/exDesc')]
+
+
+# values of the metadata of an image from its csv row
+def metadataValues(file, listMetadata, extent):
+    if len(listMetadata) < 6:
+        gis.addMessage(f"listMetadata={listMetadata}")
+        raise ValueError(f"Incomplete metadata row for {file}")
+    return {'title': listMetadata[0], 'tags': [tag.strip() for tag in listMetadata[1].split(',') if tag.strip()],
+            'summary': listMetadata[2], 'description': listMetadata[3], 'credits': listMetadata[4],
+            'accessConstraints': listMetadata[5], 'extent': extent}
+
+
+def _element(root, path):
+    element = root
+    for tag in path.split('/'):
+        child = element.find(tag)
+        if child is None:
+            child = ET.SubElement(element, tag)
+        element = child
+    return element
+
+
+# set the values in a <metadata> document, keeping the rest of it
+def applyMetadata(document, values):
+    for key, path in METADATA_ELEMENTS:
+        _element(document, path).text = values[key]
+    searchKeys = _element(document, 'dataIdInfo/searchKeys')
+    for keyword in searchKeys.findall('keyword'):
+        searchKeys.remove(keyword)
+    for tag in values['tags']:
+        ET.SubElement(searchKeys, 'keyword').text = tag
+    return document
+
+
+# metadata document of the values, rendered once for all its targets
+def renderMetadata(values):
+    document = ET.Element('metadata', {'xml:lang': 'en'})
+    esri = ET.SubElement(document, 'Esri')
+    ET.SubElement(esri, 'ArcGISFormat').text = '1.0'
+    ET.SubElement(esri, 'SyncOnce').text = 'TRUE'
+    return ET.tostring(applyMetadata(document, values), encoding='unicode')
+
+
+# write the metadata in the .aux.xml of a file raster. The file is left
+# alone when it already holds these values; returns whether it was written.
+def writeMetadataSidecar(file, rendered, values):
+    auxPath = file + '.aux.xml'
+    root = None
+    if os.path.isfile(auxPath):
+        try:
+            root = ET.parse(auxPath).getroot()
+        except ET.ParseError:
+            root = None
+    if root is None:
+        root = ET.Element('PAMDataset')
+    container = None
+    for element in root.findall('Metadata'):
+        if element.get('domain') == ESRI_DOMAIN:
+            container = element
+    if container is None:
+        container = ET.SubElement(root, 'Metadata', {'domain': ESRI_DOMAIN, 'format': 'xml'})
+    document = container.find('metadata')
+    if document is None:
+        container.append(ET.fromstring(rendered))
+    else:
+        before = ET.tostring(document)
+        if ET.tostring(applyMetadata(document, values)) == before:
+            return False
+    ET.ElementTree(root).write(auxPath, encoding='UTF-8', xml_declaration=False)
+    return True
+
+
+# copy the .aux.xml of a file raster to another one without its metadata
+# document: the other one keeps the spatial reference and statistics only
+def copySidecarWithoutMetadata(fromFile, toFile):
+    auxPath = fromFile + '.aux.xml'
+    if not os.path.isfile(auxPath):
+        return False
+    try:
+        root = ET.parse(auxPath).getroot()
+    except ET.ParseError:
+        return False
+    for element in root.findall('Metadata'):
+        if element.get('domain') == ESRI_DOMAIN:
+            root.remove(element)
+    if len(root) == 0:
+        return False
+    ET.ElementTree(root).write(toFile + '.aux.xml', encoding='UTF-8', xml_declaration=False)
+    return True
+
+
+# write the metadata of a csv row to the source and reduced images. extent is
+# the one found by the probe, read from the first file when not known.
+def writeMetadata(files, listMetadata, extent=''):
+    if extent == '':
+        extent = str(gis.arcpy().Raster(files[0]).extent)
+    values = metadataValues(files[0], listMetadata, extent)
+    rendered = renderMetadata(values)
+    written = []
+    for file in files:
+        if os.path.isfile(file):
+            try:
+                if writeMetadataSidecar(file, rendered, values):
+                    written.append(file)
+            except PermissionError:
+                # read-only, like Metadata.isReadOnly
+                continue
+        else:
+            edit_define_metadata(file, listMetadata)
+            written.append(file)
+    return written
+
+
+# metadata row of an image read from the raster itself, None when the
+# image already has a complete metadata
+def readRasterMetadata(f):
+    raster = gis.arcpy().Raster(f)
+    item_md = gis.metadata().Metadata(raster)
+    values = [item_md.title, item_md.tags, item_md.summary, item_md.description, item_md.credits,
+              item_md.accessConstraints]
+    if all(str(v) != 'None' and str(v) != '' for v in values):
+        return None
+    return [replace_txt(str(v)) if str(v) != 'None' else '' for v in values]
+
+
+# rows of the metadata csv template, one per image missing metadata.
+# With read_metadata=False the images are not opened (blank template) and
+# arcpy is never loaded.
+def templateRows(image_folder, read_metadata=True):
+    index = 1
+    for f in listImages(image_folder):
+        gis.addMessage(f)
+        if not read_metadata:
+            yield [index, f, '', '', '', '', '', '']
+            index = index + 1
+            continue
+        try:
+            values = readRasterMetadata(f)
+            if values is not None:
+                yield [index, f] + values
+                index = index + 1
+        except Exception as e:
+            gis.addError(e.args[0])
+            continue
+
+
+# write the metadata csv template in out_folder_path and return its path
+def writeMetadataTemplate(image_folder, out_folder_path, read_metadata=True):
+    # datetime object containing current date and time
+    now = datetime.now()
+    dt_string = now.strftime("%d%m%Y_%Hh%Mmin%S")
+    path = out_folder_path + "/NoMetadataImages_" + dt_string + ".csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(templateHead)
+        for row in templateRows(image_folder, read_metadata):
+            writer.writerow(row)
+    return path
@@ -0,0 +1,58 @@
+## Mosaic datasets of the run file geodatabase, one per coordinate system.
+import re
+
+from . import gis
+
+
+# name of the mosaic dataset of a coordinate system
+def mosaicName(crsName):
+    mcName = crsName.replace('(', '_').replace(')', '_').replace(' ', '_')
+    return "MosaicDataset_" + mcName
+
+
+def createMosaic(gdbname, mdname, crs):
+    noband = "3"
+    pixtype = "8_BIT_UNSIGNED"
+    pdef = "NONE"
+    wavelength = ""
+    gis.arcpy().CreateMosaicDataset_management(gdbname, mdname, crs, noband, pixtype, pdef, wavelength)
+
+
+# mosaic datasets of an existing geodatabase: {mosaicName: (name, number of
+# images)}, the name carrying the number of images given at the end of a run
+def existingMosaics(gdbPath):
+    arcpy = gis.arcpy()
+    workspace = arcpy.env.workspace
+    arcpy.env.workspace = gdbPath
+    try:
+        names = arcpy.ListDatasets("MosaicDataset_*", "Mosaic") or []
+    finally:
+        arcpy.env.workspace = workspace
+    mosaics = {}
+    for name in names:
+        match = re.match(r'^(.*?)_(\d+)images$', name)
+        if match:
+            mosaics[match.group(1)] = (name, int(match.group(2)))
+        else:
+            mosaics[name] = (name, 0)
+    return mosaics
+
+
+# add a raster to a mosaic dataset and return the start and end messages
+# of the tool (used for the timing columns of the log). With
+# 'OVERWRITE_DUPLICATES' a raster added again replaces its item.
+def addRasterToMosaic(mosaicPath, f, duplicates="ALLOW_DUPLICATES"):
+    arcpy = gis.arcpy()
+    arcpy.management.AddRastersToMosaicDataset(mosaicPath, "Raster Dataset", f, "UPDATE_CELL_SIZES",
+                                               "UPDATE_BOUNDARY", "NO_OVERVIEWS", None, 0, 1500, None, '',
+                                               "SUBFOLDERS", duplicates, "BUILD_PYRAMIDS",
+                                               "CALCULATE_STATISTICS", "NO_THUMBNAILS", '',
+                                               "NO_FORCE_SPATIAL_REFERENCE", "ESTIMATE_STATISTICS", None,
+                                               "NO_PIXEL_CACHE")
+    message_count = arcpy.GetMessageCount()
+    return arcpy.GetMessage(0), arcpy.GetMessage(message_count - 1)
+
+
+# give a mosaic dataset its final name once all its images are added
+def renameMosaic(mosaicPath, newPath):
+    gis.arcpy().management.Rename(mosaicPath, newPath)
@@ -0,0 +1,74 @@
+## Parameters of a run, as given by the toolbox or the command line.
+from dataclasses import dataclass, field
+
+
+@dataclass
+class LoaderOptions:
+    image_folder: str
+    out_folder_path: str
+    metadatafile: str = ''
+    georeference_checked: bool = False
+    georeference_file: str = ''
+    path_field: str = ''
+    flt_dir_field: str = ''
+    scale_dir_field: str = ''
+    # file geodatabase of out_folder_path to add the images to, '' for a new one
+    gdb: str = ''
+    # georeference profiles table (csv), '' for the one of the package
+    georeference_profiles: str = ''
+    # region of the profiles to use before the ones without a region
+    georeference_region: str = ''
+    # folders listed concurrently while looking for the images (network shares)
+    discovery_workers: int = 16
+    # json snapshot of the folder tree: the folders unchanged since the last run are not listed again
+    snapshot: str = ''
+    # number of lanes building mosaic datasets concurrently
+    group_workers: int = 4
+    # number of images converted concurrently, largest first
+    convert_workers: int = 4
+    # reduce the images by this factor (box average); above 1 every image is streamed
+    downsample: int = 1
+    # format of the reduced images: 'jpeg' (with a world file) or 'cog' (tiled GeoTIFF with overviews)
+    output_format: str = 'jpeg'
+    # byte budget of every reduced jpeg, in bytes and/or bits per pixel (the smaller wins); the
+    # quality is searched per image and anything but 0 goes through the streamed conversion
+    max_bytes: int = 0
+    bpp: float = 0.0
+    # extra outputs (profiles.OutputProfile) built from the same read as the reduced images
+    profiles: list = field(default_factory=list)
+    # images whose whole conversion would need more memory are converted strip by strip
+    stream_threshold_mb: int = 1024
+    # source pixels read per strip by the streamed conversion
+    strip_mb: int = 64
+    # 8 bit rescale: 'none' (clip like CopyRaster), 'minmax', 'percent' or 'stddev'. Anything but
+    # 'none' goes through the streamed conversion.
+    stretch: str = 'none'
+    # percent clipped at each end by the 'percent' stretch
+    stretch_clip: float = 2.0
+    # standard deviations kept by the 'stddev' stretch
+    stretch_stddev: float = 2.5
+    # 8 bit jpeg sources are hard linked (or copied) with their world file instead of re-encoded
+    passthrough: bool = True
+    # turn the frames georeferenced with a rotated world file (EW flight lines) north-up in the
+    # reduced images, with a north-up world file
+    north_up: bool = False
+    # copies of the same image in several folders are converted once and linked: 'sample' compares
+    # the size and a hash of a few blocks, 'full' a hash of the whole file, 'none' converts every copy
+    fingerprint: str = 'sample'
+    # folder of the web tiles of every coordinate system group, '' for none; only the tiles touched
+    # by new or changed images are drawn again when it already holds them
+    tiles: str = ''
+    # 'xyz' ({z}/{x}/{y} files) or 'mbtiles', tiles 'png' (transparent outside the images) or 'jpg'
+    tiles_format: str = 'xyz'
+    tile_image: str = 'png'
+    # zoom levels of the tiles, -1 for the ones matching the images (kept when the tiles are updated)
+    tile_min_zoom: int = -1
+    tile_max_zoom: int = -1
+    tile_workers: int = 8
+    # memory budget of the conversions in flight, 0 for half of the physical memory
+    memory_budget_mb: int = 0
+    # 'process' converts and builds the mosaic datasets in worker processes, 'thread' in threads
+    executor: str = 'process'
+    # profile of the run written next to the log: 'cprofile' (cProfile per stage) or 'sample' (sampled
+    # stacks), with counts of the arcpy, stat and listing calls; 'none' does not profile
+    profiling: str = 'none'
@@ -0,0 +1,29 @@
+## Streaming partitioning of the images by coordinate system.
+## Each coordinate system is routed to one lane by a stable hash of its name,
+## so a lane owns its mosaic datasets outright and the groups of different
+## lanes are built concurrently as soon as their first image is probed.
+import zlib
+
+
+# lane of a coordinate system
+def laneOf(crsName, lanes):
+    return zlib.crc32(crsName.encode('utf-8')) % lanes
+
+
+# images of one coordinate system, i.e. one mosaic dataset. current is the
+# name of the dataset in the geodatabase until it is renamed: an existing one
+# keeps its name and number of images until the end of the run.
+class MosaicGroup:
+    __slots__ = ('crs', 'mdname', 'spatialReference', 'count', 'current')
+
+    def __init__(self, crs, mdname, spatialReference, current='', count=0):
+        self.crs = crs
+        self.mdname = mdname
+        self.spatialReference = spatialReference
+        self.count = count
+        self.current = current or mdname
+
+    # final name of the mosaic dataset, with its number of images
+    @property
+    def finalName(self):
+        return self.mdname + '_' + str(self.count) + 'images'
@@ -0,0 +1,94 @@
+## Fast path for sources that are already 8 bit jpegs: the reduced image is
+## the source itself, hard linked (or copied across drives) with its world
+## file, instead of a CopyRaster decode and re-encode that costs time and
+## quality. Frames to turn north-up (rotated world file of an east-west
+## flight line, with --north-up) are rotated by jpegtran, which turns the DCT
+## blocks without decoding them, when it is installed.
+import os
+import shutil
+import subprocess
+
+from . import gis
+from .metadata import copySidecarWithoutMetadata
+from .worldfile import worldFilePath, findWorldFile, readWorldFile, writeWorld, rotateCounterClockwise
+
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+
+def isJpeg(path):
+    return os.path.splitext(path)[1].lower() in JPEG_EXTENSIONS
+
+
+# jpegtran executable, '' when it is not installed
+def jpegtran():
+    return shutil.which('jpegtran') or ''
+
+
+# hard link toPath to fromPath, or copy it when they are on different drives.
+# Returns how the file was written, for the log.
+def linkOrCopy(fromPath, toPath):
+    if os.path.exists(toPath):
+        os.remove(toPath)
+    try:
+        os.link(fromPath, toPath)
+        return 'hard link'
+    except OSError:
+        shutil.copyfile(fromPath, toPath)
+        return 'copy'
+
+
+# lossless 90 degrees counter-clockwise rotation. -perfect makes jpegtran
+# fail rather than trim the partial blocks at the edge of the image.
+def losslessRotate(fromPath, toPath):
+    try:
+        completed = subprocess.run([jpegtran(), '-rotate', '270', '-perfect', '-copy', 'all', '-outfile', toPath,
+                                    fromPath], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except OSError:
+        return False
+    if completed.returncode != 0:
+        if os.path.exists(toPath):
+            os.remove(toPath)
+        return False
+    return True
+
+
+# write the reduced image of the jpeg fromPath at toPath without re-encoding
+# it and return the notes of the conversion for the log. rotated is the world
+# file of a frame to turn north-up (RunSpec.northUp), None to keep it as it is.
+def passThrough(fromPath, toPath, rotated=None):
+    world = findWorldFile(fromPath)
+    params = readWorldFile(world) if world != '' else None
+    if rotated is not None and jpegtran() != '' and losslessRotate(fromPath, toPath):
+        width = gis.arcpy().Describe(fromPath).width
+        writeWorld(worldFilePath(toPath), rotateCounterClockwise(rotated, width))
+        _copySidecars(fromPath, toPath)
+        return {'conversion': 'lossless rotation', 'rotation': 'north-up'}
+    conversion = linkOrCopy(fromPath, toPath)
+    if params is not None:
+        writeWorld(worldFilePath(toPath), params)
+    _copySidecars(fromPath, toPath)
+    return {'conversion': conversion}
+
+
+# hard link (or copy) a reduced image already written for another copy of its
+# source, with its world file and projection. The metadata of the other copy
+# is not carried: its .aux.xml is copied without it (spatial reference only)
+def linkImage(fromPath, toPath):
+    conversion = linkOrCopy(fromPath, toPath)
+    world = findWorldFile(fromPath)
+    if world != '':
+        _copySidecar(world, os.path.splitext(toPath)[0] + world[len(os.path.splitext(fromPath)[0]):])
+    _copySidecar(os.path.splitext(fromPath)[0] + '.prj', os.path.splitext(toPath)[0] + '.prj')
+    copySidecarWithoutMetadata(fromPath, toPath)
+    return conversion
+
+
+def _copySidecar(fromPath, toPath):
+    if os.path.isfile(fromPath):
+        shutil.copyfile(fromPath, toPath)
+
+
+# projection and metadata of the source; copied, not linked, as the metadata is edited afterwards
+def _copySidecars(fromPath, toPath):
+    _copySidecar(os.path.splitext(fromPath)[0] + '.prj', os.path.splitext(toPath)[0] + '.prj')
+    _copySidecar(fromPath + '.aux.xml', toPath + '.aux.xml')
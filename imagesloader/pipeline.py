@@ -0,0 +1,839 @@
+## Streaming pipeline of a run, for embedding the loader in other services.
+##
+##     for result in convert_folder(options):
+##         ...
+##
+## Stages run in their own threads connected by bounded queues:
+## discovery (many folders listed at once) -> crs probe -> (georeferencing of
+## the unreferenced images, in batches) -> conversion (jpeg and metadata,
+## largest images first on a pool of workers, within a memory budget) -> partition by crs
+## -> mosaic lanes (add to mosaic). Every image ends as one ImageResult. With
+## executor='process' the conversions and the mosaic lanes run in worker
+## processes, each with its own arcpy workspace, and their results are merged
+## back into the same stream. Closing the generator, breaking out of the loop or calling
+## cancel() on the CancelToken stops all the stages. aconvert_folder is the asyncio variant.
+## Copies of an image already found (fingerprint.py) skip the stages: once
+## their original is done, its reduced images are linked for them and they
+## share its mosaic dataset item.
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+from . import gis
+from .convert import getIndexNewFolders, splitFolder, PathMapping, copyFromToReduce, copyFromToCog
+from .discovery import DirectoryCrawler
+from .fingerprint import DuplicateFinder
+from .georeference import loadGeoreferenceTable
+from .metadata import readMetadataFile, getMetadataRaster, writeMetadata
+from .mosaic import mosaicName, createMosaic, addRasterToMosaic, renameMosaic, existingMosaics
+from .passthrough import isJpeg, passThrough, jpegtran, linkImage
+from .partition import laneOf, MosaicGroup
+from .profiles import outputProfiles, resolveFactors
+from .records import ImageRecord, ImageResult, RecordStore
+from .governor import MemoryGovernor, PeakRss, rasterHeader, estimateMemory, memoryBudget
+from .report import GroupTiming
+from .schedule import LptQueue, MakespanTracker
+from .stream import streamConvert, streamMemory
+from .worldfile import findWorldFile, readWorldFile, isRotated
+
+QUEUE_SIZE = 64
+# unreferenced images georeferenced together, and the threads writing their sidecars
+GEOREFERENCE_BATCH = 256
+GEOREFERENCE_WORKERS = 8
+WEB_MERCATOR = 'WGS 1984 Web Mercator (auxiliary sphere)'
+
+# conversion methods of an image (ImageRecord.method)
+COPY = 'copy'
+STREAM = 'stream'
+PASSTHROUGH = 'passthrough'
+
+
+
+# end of a stream; compared by type so it survives pickling between processes
+class _End:
+    pass
+
+
+_END = _End()
+
+
+def _isEnd(item):
+    return isinstance(item, _End)
+
+
+# error of a worker process, re-raised by convert_folder
+class _LaneError:
+    def __init__(self, error):
+        self.error = error
+
+
+class Cancelled(Exception):
+    pass
+
+
+# shared flag asking every stage of a run to stop
+class CancelToken:
+    def __init__(self, event=None):
+        self._event = event or threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+
+# queue put/get that give up when the run is cancelled instead of blocking forever
+def _put(q, item, cancel):
+    while True:
+        cancel.check()
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q, cancel):
+    while True:
+        cancel.check()
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+
+# picklable description of a run, shared by the stages and the worker processes
+class RunSpec:
+    def __init__(self, options):
+        self.options = options
+        self.profiles = outputProfiles(options)
+        self.output_folders = getIndexNewFolders(options.image_folder, [profile.suffix for profile in self.profiles])
+        self.reduced_image_folder = self.output_folders[0]
+        # output folders of the source folders, created as the discovery finds them
+        self.paths = PathMapping(options.image_folder, self.output_folders)
+        # Read metadatafile in a List
+        self.list_noMetadataFile = readMetadataFile(options.metadatafile)
+        # datetime object containing current date and time
+        dt_string = datetime.now().strftime("%d%m%Y_%Hh%Mmin%S")
+        # Root Name of the input images folder
+        rootName = splitFolder(options.image_folder)[1]
+        # FileGDB Name
+        self.gdbname = rootName + "_" + dt_string + ".gdb"
+        if options.gdb:
+            self.gdbname = os.path.basename(options.gdb.rstrip('/\\'))
+        # mosaic datasets already in an existing geodatabase (mosaic.existingMosaics)
+        self.mosaics = {}
+        # images added again (watch mode, existing geodatabase) replace their item
+        self.duplicates = "ALLOW_DUPLICATES"
+
+    def mosaicPath(self, mdname):
+        return self.options.out_folder_path + '\\' + self.gdbname + '\\' + mdname
+
+    def reducedPath(self, f):
+        return self.paths.outputPath(f, 0, self.profiles[0].extension)
+
+    # path of an image in every output profile, the reduced image first
+    def outputPaths(self, f):
+        return [self.paths.outputPath(f, i, profile.extension) for i, profile in enumerate(self.profiles)]
+
+    # images that CopyRaster cannot produce in one go
+    def needsStream(self):
+        options = self.options
+        return (options.downsample > 1 or options.stretch != 'none' or len(self.profiles) > 1
+                or self.profiles[0].adaptive)
+
+    # 8 bit grey or RGB jpegs are already what CopyRaster would write
+    def canPassThrough(self, f, header):
+        profile = self.profiles[0]
+        return (self.options.passthrough and isJpeg(f) and not self.needsStream() and profile.format == 'JPEG'
+                and header is not None and header[2] in (1, 3) and str(header[3]).upper() == 'U8')
+
+    # world file of a frame to turn north-up (east-west flight lines georeferenced
+    # with rotation terms), None when the image is kept as it is
+    def northUp(self, f):
+        if not self.options.north_up:
+            return None
+        world = findWorldFile(f)
+        if world == '':
+            return None
+        params = readWorldFile(world)
+        return params if isRotated(params) else None
+
+    # conversion method and memory estimate of an image from its Describe:
+    # reduced rasters, with several outputs or turned north-up are streamed
+    # strip by strip, and so are the ones too large for a whole conversion
+    def conversionOf(self, f, desc, size):
+        options = self.options
+        header = rasterHeader(desc)
+        rotate = self.northUp(f) is not None
+        if self.canPassThrough(f, header) and (not rotate or jpegtran() != ''):
+            # jpegtran holds the DCT coefficients, 2 bytes per sample
+            return PASSTHROUGH, header[0] * header[1] * header[2] * 2
+        if header is None:
+            # compressed formats decode to several times their size on disk
+            return STREAM if self.needsStream() or rotate else COPY, size * 4
+        memory = estimateMemory(*header)
+        if self.needsStream() or rotate or memory > options.stream_threshold_mb * 1048576:
+            factors = resolveFactors(self.profiles, header[0], header[1])
+            return STREAM, streamMemory(*header, factors=factors, blockBytes=options.strip_mb * 1048576)
+        return COPY, memory
+
+    # convert the raster from the source path to the new reduced images location and apply its
+    # metadata (extent is the one of the probe). Returns the reduced image and the notes of the
+    # conversion for the log.
+    def convert(self, f, method=COPY, extent=''):
+        options = self.options
+        rotated = self.northUp(f)
+        if method == PASSTHROUGH:
+            newPathFile = self.reducedPath(f)
+            notes = passThrough(f, newPathFile, rotated)
+            if rotated is not None and notes['conversion'] != 'lossless rotation':
+                # jpegtran could not rotate it without trimming its edge blocks
+                method = STREAM
+        if method == STREAM:
+            paths = self.outputPaths(f)
+            newPathFile = paths[0]
+            notes = streamConvert(f, list(zip(paths, self.profiles)), options.strip_mb * 1048576,
+                                  stretch=options.stretch, clip=options.stretch_clip, stddevs=options.stretch_stddev,
+                                  rotated=rotated)
+            notes['conversion'] = 'streamed'
+        elif method == COPY:
+            newPathFile = self.reducedPath(f)
+            if self.profiles[0].format == 'COG':
+                copyFromToCog(f, newPathFile, self.profiles[0].quality)
+                notes = {'conversion': 'copy raster cog'}
+            else:
+                copyFromToReduce(f, newPathFile)
+                notes = {'conversion': 'copy raster'}
+        self.applyMetadata(f, newPathFile, extent)
+        return newPathFile, notes
+
+    def applyMetadata(self, f, newPathFile, extent=''):
+        if len(self.list_noMetadataFile) != 0:
+            metadata_list = getMetadataRaster(f, self.list_noMetadataFile)
+            # if the file is in the csv file edit it the metadata of the source and newly created image
+            if len(metadata_list) >= 2:
+                metadata_list = metadata_list[2:]
+                writeMetadata([f, newPathFile], metadata_list, extent)
+
+    # result of f, a copy of the image of the result original: the reduced images
+    # of the original are linked in the place of the ones of f (without the metadata
+    # of the original), which is given its own metadata, if any, and shares the
+    # mosaic dataset item of the original
+    def linkCopy(self, f, original):
+        result = ImageResult(0, f, '', original.mosaic, original.crs, original.status, original.error,
+                             notes={'conversion': 'duplicate', 'duplicate of': original.source},
+                             size=original.size, output_size=original.output_size)
+        if original.output == '':
+            result.status = 'FAILED'
+            result.error = 'Duplicate of ' + original.source + ': ' + original.error
+            return result
+        try:
+            result.output = self.reducedPath(f)
+            pairs = [(original.output, result.output)]
+            pairs += list(zip(self.outputPaths(original.source), self.outputPaths(f)))[1:]
+            for fromPath, toPath in pairs:
+                if os.path.isfile(fromPath):
+                    linkImage(fromPath, toPath)
+            self.applyMetadata(f, result.output)
+        except Exception as e:
+            gis.addError(str(e))
+            result.status = 'FAILED'
+            result.error = str(e)
+        return result
+
+
+# state of one run in the calling process
+class _Run:
+    def __init__(self, options, cancel, queue_size, report, sources=None):
+        self.spec = RunSpec(options)
+        self.options = options
+        self.cancel = cancel
+        self.queue_size = queue_size
+        self.report = report
+        # (path, size) of the images to load, the images of the folder when None
+        self.sources = sources
+        self.gdbCreated = False
+        if options.gdb:
+            self.gdbCreated = True
+            self.spec.mosaics = existingMosaics(options.out_folder_path + '/' + self.gdbname)
+        if options.gdb or sources is not None:
+            self.spec.duplicates = "OVERWRITE_DUPLICATES"
+        self.errors = []
+        # spec given to the conversion jobs; the worker processes get it at start instead
+        self.pool_spec = self.spec
+        self._georeferenceTable = None
+        self.finder = None
+        if options.fingerprint != 'none':
+            self.finder = DuplicateFinder(options.fingerprint == 'full')
+        # (copy, original) found by the discovery and the copies waiting for their original
+        self.copies = queue.Queue()
+        self._waiting = {}
+        # results of the images done so far (records.RecordStore)
+        self.store = RecordStore()
+
+    @property
+    def gdbname(self):
+        return self.spec.gdbname
+
+    # images of size bytes that went through a stage in seconds, for the report
+    def addStage(self, name, images, size, seconds):
+        if self.report is not None:
+            self.report.addStage(name, images, size, seconds)
+
+    # the file geodatabase is created before the first mosaic dataset
+    def ensureGdb(self):
+        if not self.gdbCreated:
+            # Execute CreateFileGDB
+            gis.arcpy().CreateFileGDB_management(self.options.out_folder_path, self.gdbname)
+            self.gdbCreated = True
+
+
+    # world files of the frames of the georeference shapefile, read with the first
+    # unreferenced image. Returns the table, or the error given to every unreferenced image.
+    def georeferenceTable(self):
+        if self._georeferenceTable is None:
+            options = self.options
+            try:
+                self._georeferenceTable = loadGeoreferenceTable(options.georeference_file, options.path_field,
+                                                                options.flt_dir_field, options.scale_dir_field,
+                                                                options.georeference_profiles,
+                                                                options.georeference_region)
+            except Exception as e:
+                # a missing or unreadable shapefile or profiles table fails the unreferenced images only
+                self._georeferenceTable = str(e) or repr(e)
+                gis.addError(self._georeferenceTable)
+        return self._georeferenceTable
+
+    # first image discovered with the content of f, None when f is not a copy
+    def originalOf(self, f, size):
+        if self.finder is None:
+            return None
+        try:
+            return self.finder.originalOf(f, size)
+        except OSError:
+            # unreadable now; the conversion reports it
+            return None
+
+    # results of the copies whose original is done, given the result of an
+    # image of the run, already in the store (None to only take the copies
+    # found since the last call)
+    def copyResults(self, result=None):
+        ready = []
+        if result is not None:
+            ready += [self.spec.linkCopy(f, result) for f in self._waiting.pop(result.source, [])]
+        while True:
+            try:
+                f, original = self.copies.get_nowait()
+            except queue.Empty:
+                break
+            done = self.store.find(original)
+            if done is None:
+                self._waiting.setdefault(original, []).append(f)
+            else:
+                ready.append(self.spec.linkCopy(f, done))
+        return ready
+
+
+# run a stage in a thread; an unexpected error cancels the whole run
+def _startStage(run, target, *args):
+    def body():
+        try:
+            target(run, *args)
+        except Cancelled:
+            pass
+        except Exception as e:
+            run.errors.append(e)
+            run.cancel.cancel()
+
+    thread = threading.Thread(target=body, name='imagesloader-' + target.__name__.strip('_'), daemon=True)
+    thread.start()
+    return thread
+
+
+def _discover(run, out):
+    options = run.options
+    sources = run.sources
+    if sources is None:
+        sources = DirectoryCrawler(options.image_folder, options.discovery_workers, options.snapshot)
+    sources = iter(sources)
+    while True:
+        t0 = time.perf_counter()
+        item = next(sources, None)
+        if item is None:
+            break
+        if run.sources is not None:
+            # the sources given (the watcher) wait for new images: only the work done here is timed
+            t0 = time.perf_counter()
+        f, size = item
+        # the output folders of a source folder are created with its first image
+        run.spec.paths.create(f)
+        original = run.originalOf(f, size)
+        run.addStage('discover', 1, size, time.perf_counter() - t0)
+        if original is not None:
+            run.copies.put((f, original))
+            continue
+        _put(out, (f, size), run.cancel)
+    if run.sources is None and options.snapshot:
+        gis.addMessage(f"{sources.listed} folders listed, {sources.reused} unchanged since the snapshot")
+    _put(out, _END, run.cancel)
+
+
+# coordinate system of each image. Unreferenced images go to the georeference
+# stage when asked, otherwise they are only downsized and reported FAILED.
+# The georeference stage ends the stream of the referenced images.
+def _probe(run, inq, out, unreferenced, results):
+    arcpy = gis.arcpy()
+    options = run.options
+    while True:
+        item = _get(inq, run.cancel)
+        if _isEnd(item):
+            break
+        f, size = item
+        t0 = time.perf_counter()
+        try:
+            desc = arcpy.Describe(f)
+            crs = desc.spatialReference.name
+            record = ImageRecord(f, crs, size)
+            record.method, record.memory = run.spec.conversionOf(f, desc, size)
+            record.extent = str(desc.extent)
+            run.addStage('probe', 1, size, time.perf_counter() - t0)
+            if crs != 'Unknown':
+                _put(out, record, run.cancel)
+            # if the image is unreferenced generated its world file, if shp exists
+            elif options.georeference_checked:
+                _put(unreferenced, (record, desc), run.cancel)
+            else:
+                record.error = 'Downsized but not georeferenced'
+                _put(out, record, run.cancel)
+        except Cancelled:
+            raise
+        except Exception as e:
+            gis.addError(e.args[0])
+            _put(results, ImageResult(0, f, error=e.args[0], size=size), run.cancel)
+    _put(unreferenced, _END, run.cancel)
+
+
+# up to size items of a queue: waits for the first one only. Returns the items
+# and whether the end of the stream was reached.
+def _batch(q, cancel, size):
+    items = [_get(q, cancel)]
+    while len(items) < size and not _isEnd(items[-1]):
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            break
+    if _isEnd(items[-1]):
+        return items[:-1], True
+    return items, False
+
+
+# georeference one image; a file that cannot be written fails only this image
+def _georeferenceFrame(table, f):
+    try:
+        return table.georeference(f)
+    except OSError as e:
+        gis.addError(str(e))
+        return str(e)
+
+
+# world files and projection sidecars of the unreferenced images, written
+# for a batch at a time by a pool of threads from the georeference table of
+# the run. Georeferenced images go on to the conversion in Web Mercator; the
+# others keep the error of their frame.
+def _georeference(run, inq, out):
+    with concurrent.futures.ThreadPoolExecutor(GEOREFERENCE_WORKERS,
+                                               thread_name_prefix='imagesloader-georeference') as pool:
+        done = False
+        while not done:
+            batch, done = _batch(inq, run.cancel, GEOREFERENCE_BATCH)
+            if len(batch) == 0:
+                continue
+            t0 = time.perf_counter()
+            table = run.georeferenceTable()
+            if isinstance(table, str):
+                errors = [table] * len(batch)
+            else:
+                errors = list(pool.map(lambda item: _georeferenceFrame(table, item[0].path), batch))
+            run.addStage('georeference', len(batch), sum(record.size for record, desc in batch),
+                         time.perf_counter() - t0)
+            for (record, desc), res in zip(batch, errors):
+                if res == '':
+                    georeferenced = ImageRecord(record.path, WEB_MERCATOR, record.size)
+                    georeferenced.method, georeferenced.memory = run.spec.conversionOf(record.path, desc,
+                                                                                       record.size)
+                    _put(out, georeferenced, run.cancel)
+                else:
+                    record.error = res
+                    _put(out, record, run.cancel)
+    _put(out, _END, run.cancel)
+
+
+# conversion job, run in a worker thread or process
+_workerSpec = None
+
+
+def _initConvertWorker(spec):
+    global _workerSpec
+    _workerSpec = spec
+    gis.arcpy().env.parallelProcessingFactor = "100%"
+
+
+def _convertJob(spec, f, method, extent):
+    spec = spec or _workerSpec
+    t0 = time.perf_counter()
+    with PeakRss() as peak:
+        newPathFile, notes = spec.convert(f, method, extent)
+    seconds = time.perf_counter() - t0
+    outputSize = os.path.getsize(newPathFile) if os.path.isfile(newPathFile) else 0
+    return newPathFile, seconds, peak.value or 0, notes, outputSize
+
+
+# next job to run: the largest one whose memory estimate fits. Smaller jobs
+# may overtake a large one waiting for memory, but only maxBypass times so it
+# is not starved by a stream of small frames.
+def _nextJob(jobs, governor, waiting, maxBypass):
+    if len(jobs) == 0:
+        return None
+    if governor.fits(jobs.peek().memory):
+        return jobs.pop()
+    if waiting[0] >= maxBypass:
+        return None
+    skipped = []
+    job = None
+    while len(jobs) > 0:
+        candidate = jobs.pop()
+        if governor.fits(candidate.memory):
+            job = candidate
+            break
+        skipped.append(candidate)
+    for candidate in skipped:
+        jobs.push(candidate)
+    if job is not None:
+        waiting[0] = waiting[0] + 1
+    return job
+
+
+# dispatch the conversions on the pool, largest source first among the
+# images probed so far. Converted images go on to their mosaic lane; the
+# unreferenced ones and the failures end here.
+def _schedule(run, inq, out, results, pool, workers, tracker, governor):
+    jobs = LptQueue(lambda record: record.size)
+    inflight = {}
+    inputDone = False
+    # number of times the largest job was overtaken while waiting for memory
+    waiting = [0]
+    while not inputDone or len(jobs) > 0 or len(inflight) > 0:
+        run.cancel.check()
+        # take what the probe has ready; only wait for it when there is nothing else to do
+        while not inputDone:
+            try:
+                record = inq.get(timeout=0.05 if len(jobs) == 0 and len(inflight) == 0 else 0)
+            except queue.Empty:
+                break
+            if _isEnd(record):
+                inputDone = True
+            else:
+                jobs.push(record)
+        while len(inflight) < workers:
+            record = _nextJob(jobs, governor, waiting, workers * 4)
+            if record is None:
+                break
+            if len(jobs) == 0 or record.size >= jobs.peek().size:
+                waiting[0] = 0
+            governor.acquire(record.memory)
+            tracker.started()
+            inflight[pool.submit(_convertJob, run.pool_spec, record.path, record.method,
+                                 record.extent)] = record
+        if len(inflight) == 0:
+            continue
+        done, pending = concurrent.futures.wait(list(inflight), timeout=0.05,
+                                                return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            record = inflight.pop(future)
+            governor.release(record.memory)
+            try:
+                record.output, record.seconds, record.peak, record.notes, record.outputSize = future.result()
+                tracker.done(record.size, record.seconds)
+                run.addStage('convert', 1, record.size, record.seconds)
+            except Exception as e:
+                gis.addError(e.args[0] if e.args else repr(e))
+                _put(results, ImageResult(0, record.path, '', '', record.crs, error=e.args[0] if e.args else repr(e),
+                                          memory_estimate=record.memory, size=record.size), run.cancel)
+                continue
+            if record.error != '':
+                _put(results, ImageResult(0, record.path, record.output, '', record.crs, error=record.error,
+                                          memory_estimate=record.memory, peak_rss=record.peak,
+                                          notes=record.notes, size=record.size, output_size=record.outputSize,
+                                          seconds=record.seconds), run.cancel)
+            else:
+                _put(out, record, run.cancel)
+    _put(out, _END, run.cancel)
+
+
+# route each converted image to the lane owning its coordinate system
+def _partition(run, inq, lanes):
+    while True:
+        record = _get(inq, run.cancel)
+        if _isEnd(record):
+            break
+        run.ensureGdb()
+        _put(lanes[laneOf(record.crs, len(lanes))], record, run.cancel)
+    for lane in lanes:
+        _put(lane, _END, run.cancel)
+
+
+# mosaic datasets of the coordinate systems of a lane, created with their
+# first image and filled with the converted images as they arrive.
+# Creating a mosaic dataset changes the schema of the geodatabase, so it is
+# serialised between lanes by schemaLock; adding rasters is not.
+def _laneBody(spec, cancel, inq, results, schemaLock, lane):
+    arcpy = gis.arcpy()
+    arcpy.env.workspace = spec.options.out_folder_path
+    groups = {}
+    timings = {}
+    # images added again replace their item, so they are only counted once
+    added = set() if spec.duplicates == "OVERWRITE_DUPLICATES" else None
+    while True:
+        record = _get(inq, cancel)
+        if _isEnd(record):
+            break
+        group = groups.get(record.crs)
+        t0 = time.perf_counter()
+        try:
+            if group is None:
+                timing = GroupTiming(record.crs, mosaicName(record.crs), lane, started=time.time())
+                timings[record.crs] = timing
+                crs = arcpy.Describe(record.path).spatialReference
+                gis.addMessage(crs.name)
+                existing = spec.mosaics.get(timing.mosaic)
+                if existing is not None:
+                    group = MosaicGroup(record.crs, timing.mosaic, crs, *existing)
+                else:
+                    group = MosaicGroup(record.crs, timing.mosaic, crs)
+                    with schemaLock:
+                        createMosaic(spec.gdbname, group.mdname, crs)
+                groups[record.crs] = group
+            newPathFile = record.output
+            # add raster to mosaic
+            start, end = addRasterToMosaic(spec.mosaicPath(group.current), record.path, spec.duplicates)
+            if added is None or record.path not in added:
+                group.count = group.count + 1
+                if added is not None:
+                    added.add(record.path)
+            gis.addMessage(record.path)
+            result = ImageResult(0, record.path, newPathFile, group.current, record.crs, 'SUCCESS', '', start, end,
+                                 record.memory, record.peak, record.notes, record.size, record.outputSize,
+                                 record.seconds, time.perf_counter() - t0)
+        except Cancelled:
+            raise
+        except Exception as e:
+            gis.addError(e.args[0])
+            result = ImageResult(0, record.path, '', '', record.crs, error=e.args[0], memory_estimate=record.memory,
+                                 peak_rss=record.peak, notes=record.notes, size=record.size,
+                                 output_size=record.outputSize, seconds=record.seconds,
+                                 mosaic_seconds=time.perf_counter() - t0)
+        timing = timings.get(record.crs)
+        if timing is not None:
+            timing.images = timing.images + 1
+            timing.failed = timing.failed + (0 if result.ok else 1)
+            timing.busy = timing.busy + time.perf_counter() - t0
+            timing.ended = time.time()
+        _put(results, result, cancel)
+    for group in groups.values():
+        if group.current != group.finalName:
+            with schemaLock:
+                renameMosaic(spec.mosaicPath(group.current), spec.mosaicPath(group.finalName))
+        timings[group.crs].mosaic = group.finalName
+    for timing in timings.values():
+        _put(results, timing, cancel)
+    _put(results, _END, cancel)
+
+
+def _lane(run, inq, results, schemaLock, lane):
+    _laneBody(run.spec, run.cancel, inq, results, schemaLock, lane)
+
+
+# entry point of a lane worker process
+def _processLane(spec, inq, results, cancelEvent, schemaLock, lane):
+    cancel = CancelToken(cancelEvent)
+    try:
+        gis.arcpy().env.parallelProcessingFactor = "100%"
+        _laneBody(spec, cancel, inq, results, schemaLock, lane)
+    except Cancelled:
+        # do not wait for the parent to drain what is left in the queue
+        results.cancel_join_thread()
+    except Exception as e:
+        try:
+            results.put(_LaneError(e), timeout=1)
+        except Exception:
+            results.put(_LaneError(RuntimeError(repr(e))), timeout=1)
+        cancelEvent.set()
+
+
+# move the results of the lane processes to the results queue of this process,
+# up to the end of every lane. A failure put there by the probe or schedule
+# stage comes before the end of the lanes it leads to, which a queue shared
+# with the processes does not guarantee.
+def _relay(run, inq, out, nbLanes):
+    running = nbLanes
+    while running > 0:
+        item = _get(inq, run.cancel)
+        _put(out, item, run.cancel)
+        if isinstance(item, _LaneError):
+            return
+        if _isEnd(item):
+            running = running - 1
+
+
+# multiprocessing context of the worker processes. arcpy is not fork safe, and
+# inside ArcGIS Pro sys.executable is the application, not its python.
+def _processContext():
+    ctx = multiprocessing.get_context('spawn')
+    if sys.platform == 'win32' and not sys.executable.lower().endswith('python.exe'):
+        ctx.set_executable(os.path.join(sys.exec_prefix, 'python.exe'))
+    return ctx
+
+
+# run the loader as a stream of ImageResult, in the order the images complete.
+# Group timings and the makespan of the conversions are added to report (a
+# RunReport) when one is given. sources, an iterable of (path, size), replaces
+# the listing of the folder (watch.py). The results are also added to store (a
+# records.RecordStore) when one is given.
+def convert_folder(options, cancel=None, queue_size=QUEUE_SIZE, report=None, sources=None, store=None):
+    cancel = cancel or CancelToken()
+    gis.arcpy().env.parallelProcessingFactor = "100%"
+    run = _Run(options, cancel, queue_size, report, sources)
+    if store is not None:
+        run.store = store
+    nbLanes = max(1, options.group_workers)
+    nbConverters = max(1, options.convert_workers)
+    tracker = MakespanTracker(nbConverters)
+    governor = MemoryGovernor(memoryBudget(options.memory_budget_mb))
+    processes = []
+    cancelEvent = None
+    files = queue.Queue(queue_size)
+    probed = queue.Queue(queue_size)
+    unreferenced = queue.Queue(queue_size)
+    converted = queue.Queue(queue_size)
+    if options.executor == 'process':
+        ctx = _processContext()
+        pool = concurrent.futures.ProcessPoolExecutor(nbConverters, mp_context=ctx, initializer=_initConvertWorker,
+                                                      initargs=(run.spec,))
+        run.pool_spec = None
+        cancelEvent = ctx.Event()
+        schemaLock = ctx.Lock()
+        # the failures of the stages of this process go straight to results, the
+        # ones of the lanes through laneResults (_relay)
+        results = queue.Queue(queue_size)
+        laneResults = ctx.Queue(queue_size)
+        lanes = [ctx.Queue(queue_size) for i in range(nbLanes)]
+        for i, lane in enumerate(lanes):
+            process = ctx.Process(target=_processLane, args=(run.spec, lane, laneResults, cancelEvent, schemaLock, i),
+                                  name='imagesloader-lane-' + str(i), daemon=True)
+            process.start()
+            processes.append(process)
+    else:
+        pool = concurrent.futures.ThreadPoolExecutor(nbConverters, thread_name_prefix='imagesloader-convert')
+        schemaLock = threading.Lock()
+        results = queue.Queue(queue_size)
+        lanes = [queue.Queue(queue_size) for i in range(nbLanes)]
+    threads = [_startStage(run, _discover, files),
+               _startStage(run, _probe, files, probed, unreferenced, results),
+               _startStage(run, _georeference, unreferenced, probed),
+               _startStage(run, _schedule, probed, converted, results, pool, nbConverters, tracker, governor),
+               _startStage(run, _partition, converted, lanes)]
+    if processes:
+        threads.append(_startStage(run, _relay, laneResults, results, nbLanes))
+    else:
+        threads += [_startStage(run, _lane, lane, results, schemaLock, i) for i, lane in enumerate(lanes)]
+    running = nbLanes
+    index = 1
+    try:
+        while running > 0:
+            try:
+                result = _get(results, cancel)
+            except Cancelled:
+                break
+            if _isEnd(result):
+                running = running - 1
+                if running > 0:
+                    continue
+                # copies found after the last image reached the lanes
+                items = run.copyResults()
+            elif isinstance(result, _LaneError):
+                run.errors.append(result.error)
+                break
+            elif isinstance(result, GroupTiming):
+                if report is not None:
+                    report.addGroup(result)
+                continue
+            else:
+                items = [result]
+            while items:
+                item = items.pop(0)
+                item.index = index
+                index = index + 1
+                run.store.append(item)
+                if report is not None:
+                    if item.mosaic_seconds > 0:
+                        report.addStage('mosaic', 1, item.size, item.mosaic_seconds)
+                    report.addResult(item)
+                    if 'duplicate of' in item.notes:
+                        report.addDuplicate(item.notes['duplicate of'], item.source)
+                # the copies waiting for this image
+                items += run.copyResults(item)
+                yield item
+    finally:
+        cancel.cancel()
+        if cancelEvent is not None:
+            cancelEvent.set()
+        for thread in threads:
+            thread.join()
+        pool.shutdown(wait=True, cancel_futures=True)
+        for process in processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+    if report is not None:
+        schedule = tracker.toDict()
+        schedule['memory_budget'] = governor.budget
+        schedule['peak_estimated_memory'] = governor.peakInUse
+        report.setSchedule(schedule)
+    if run.errors:
+        raise run.errors[0]
+
+
+# asyncio variant of convert_folder; the stages keep running in threads so
+# the event loop stays free for the caller's own I/O
+async def aconvert_folder(options, cancel=None, queue_size=QUEUE_SIZE, report=None):
+    cancel = cancel or CancelToken()
+    loop = asyncio.get_running_loop()
+    stream = convert_folder(options, cancel, queue_size, report)
+    pending = None
+    try:
+        while True:
+            pending = loop.run_in_executor(None, next, stream, _END)
+            result = await pending
+            pending = None
+            if _isEnd(result):
+                break
+            yield result
+    finally:
+        cancel.cancel()
+        if pending is not None:
+            # the generator cannot be closed while next() still runs in the executor
+            await asyncio.shield(asyncio.wait([pending]))
+        await loop.run_in_executor(None, stream.close)
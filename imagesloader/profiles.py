@@ -0,0 +1,97 @@
+## Output profiles: every image can be written at several sizes (reduced
+## jpeg, preview, web thumbnail...) from a single read of its pixels. Each
+## profile has its own '<source folder><suffix>_v#' folder next to the
+## '_Reduced_Images_v#' one.
+from dataclasses import dataclass
+
+# COG: cloud optimized GeoTIFF (cog.py)
+FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'COG': '.tif'}
+
+
+@dataclass
+class OutputProfile:
+    suffix: str = '_Reduced_Images'
+    # reduction of the source, or the longest edge in pixels when max_size is set
+    factor: int = 1
+    max_size: int = 0
+    quality: int = 75
+    format: str = 'JPEG'
+    # jpeg byte budget of every image, as bytes or bits per pixel; the quality is then
+    # searched per image (jpegquality.py) instead of fixed
+    max_bytes: int = 0
+    bpp: float = 0.0
+
+    @property
+    def extension(self):
+        return FORMATS[self.format]
+
+    @property
+    def adaptive(self):
+        return self.format == 'JPEG' and (self.max_bytes > 0 or self.bpp > 0)
+
+    # bytes allowed for an output of width x height pixels
+    def byteBudget(self, width, height):
+        budgets = []
+        if self.max_bytes > 0:
+            budgets.append(self.max_bytes)
+        if self.bpp > 0:
+            budgets.append(int(self.bpp * width * height / 8))
+        return min(budgets)
+
+
+# byte count with an optional k or m suffix (1024 based), e.g. '500k'
+def parseBytes(text):
+    text = text.strip().lower()
+    units = {'k': 1024, 'm': 1048576}
+    if text[-1:] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+# profile from its command line form: '<suffix>[:key=value,...]', e.g.
+# '_Thumbnails:max_size=256,quality=60' or '_Preview:factor=8,format=png'
+def parseProfile(text):
+    suffix, _, settings = text.partition(':')
+    profile = OutputProfile(suffix=suffix)
+    for setting in settings.split(','):
+        if setting == '':
+            continue
+        key, _, value = setting.partition('=')
+        key = key.strip()
+        if key == 'format':
+            profile.format = value.strip().upper()
+            if profile.format not in FORMATS:
+                raise ValueError("Unknown output format " + value)
+        elif key in ('factor', 'max_size', 'quality'):
+            setattr(profile, key, int(value))
+        elif key == 'max_bytes':
+            profile.max_bytes = parseBytes(value)
+        elif key == 'bpp':
+            profile.bpp = float(value)
+        else:
+            raise ValueError("Unknown output profile setting " + key)
+    return profile
+
+
+# the profiles of a run: the reduced images first, then the extra ones
+def outputProfiles(options):
+    return [OutputProfile(factor=max(1, options.downsample), max_bytes=options.max_bytes, bpp=options.bpp,
+                          format=options.output_format.upper())] + list(options.profiles)
+
+
+# reduction factors of the profiles for an image of width x height. Every
+# level is built from the previous (smaller factor) one, so each factor is
+# rounded up to a multiple of the previous. Returned in the profiles order.
+def resolveFactors(profiles, width, height):
+    wanted = []
+    for profile in profiles:
+        factor = max(1, profile.factor)
+        if profile.max_size > 0:
+            factor = max(1, -(-max(width, height) // profile.max_size))
+        wanted.append(factor)
+    factors = [0] * len(profiles)
+    previous = 1
+    for i in sorted(range(len(profiles)), key=lambda i: wanted[i]):
+        previous = -(-wanted[i] // previous) * previous
+        factors[i] = previous
+    return factors
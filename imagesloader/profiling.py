@@ -0,0 +1,286 @@
+## Opt-in profiling of a run (options.profiling), to see whether its time goes
+## to arcpy, the file system or python, stage by stage.
+## 'cprofile' profiles every thread of the calling process with cProfile and
+## merges the threads of each stage (the stage threads, the conversion,
+## georeference and crawl pools); 'sample' takes the stacks of the threads
+## every SAMPLE_INTERVAL seconds, which costs little whatever the number of
+## calls. Both count the expensive calls (arcpy rasters opened, Describe,
+## stat and listings) and the bytes read and written by the process, for the
+## whole run: the figures per image are averages.
+## The profiles are written next to the log: profile_<date>.json and .txt,
+## with one profile_<date>_<stage>.prof (pstats, snakeviz) or .folded
+## (collapsed stacks for flame graphs) per stage. A profiled run uses the
+## thread executor (loader.py), so the conversions and the mosaic lanes run in
+## the process profiled.
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from . import gis
+
+PROFILERS = ['none', 'cprofile', 'sample']
+# seconds between two samples of the stacks
+SAMPLE_INTERVAL = 0.005
+# functions listed per stage in the text summary
+TOP_FUNCTIONS = 15
+# modules of the file system calls, for the time spent per kind of call
+FILE_MODULES = ('os', 'genericpath', 'posixpath', 'ntpath', 'shutil', 'pathlib', 'io', '_pyio', 'glob')
+# (module, function) where the threads wait for work or for each other
+WAITS = {('threading', 'wait'), ('threading', '_wait_for_tstate_lock'), ('queue', 'get'), ('queue', 'put'),
+         ('thread', '_worker'), ('selectors', 'select')}
+
+
+# stage of a thread from its name ('imagesloader-convert_0' -> 'convert')
+def stageOf(threadName):
+    if threadName == 'MainThread':
+        return 'main'
+    if threadName.startswith('imagesloader-'):
+        return re.split(r'[-_]\d', threadName[len('imagesloader-'):])[0]
+    return 'other'
+
+
+# bytes read and written by the process so far, None when they cannot be read
+def ioBytes():
+    try:
+        import psutil
+        counters = psutil.Process().io_counters()
+        return counters.read_bytes, counters.write_bytes
+    except (ImportError, AttributeError):
+        pass
+    try:
+        with open('/proc/self/io') as f:
+            values = dict(line.split(': ') for line in f.read().splitlines())
+        return int(values['rchar']), int(values['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+# kind of call of a stack (frames from the outermost): 'arcpy' when arcpy is on
+# it, 'file system' or 'waiting' after its innermost frame, else 'python'
+def kindOf(frames):
+    for filename, name in frames:
+        if 'arcpy' in filename or 'arcgisscripting' in filename:
+            return 'arcpy'
+    if not frames:
+        return 'python'
+    module = os.path.splitext(os.path.basename(frames[-1][0]))[0]
+    if (module, frames[-1][1]) in WAITS:
+        return 'waiting'
+    return 'file system' if module in FILE_MODULES else 'python'
+
+
+# counts of the expensive calls, made by wrapping them for the run
+class CallCounters:
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._patched = []
+
+    def _wrap(self, owner, attribute, name):
+        function = getattr(owner, attribute, None)
+        if function is None:
+            return
+        counts = self.counts
+        lock = self._lock
+
+        def counted(*args, **kwargs):
+            with lock:
+                counts[name] = counts[name] + 1
+            return function(*args, **kwargs)
+
+        setattr(owner, attribute, counted)
+        self._patched.append((owner, attribute, function))
+
+    def install(self):
+        self._wrap(os, 'stat', 'stat')
+        self._wrap(os, 'scandir', 'listing')
+        self._wrap(os, 'listdir', 'listing')
+        arcpy = gis.arcpy()
+        self._wrap(arcpy, 'Raster', 'arcpy raster opened')
+        self._wrap(arcpy, 'Describe', 'arcpy describe')
+
+    def uninstall(self):
+        for owner, attribute, function in reversed(self._patched):
+            setattr(owner, attribute, function)
+        self._patched = []
+
+
+# stacks of the threads sampled in a thread of their own
+class StackSampler:
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        # samples per (stage, collapsed stack), per (stage, kind) and per stage
+        self.stacks = Counter()
+        self.kinds = Counter()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stage = stageOf(names.get(ident, ''))
+            frames = []
+            while frame is not None:
+                frames.append((frame.f_code.co_filename, frame.f_code.co_name))
+                frame = frame.f_back
+            frames.reverse()
+            stack = ';'.join(os.path.basename(filename) + ':' + name for filename, name in frames)
+            self.stacks[(stage, stack)] += 1
+            self.kinds[(stage, kindOf(frames))] += 1
+            self.samples[stage] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='imagesloader-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+# profilers of the threads of the run, one cProfile per thread, started in
+# every thread by its first profile event
+class ThreadProfiles:
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+
+    def _enable(self, stage):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # python 3.12+ allows a single cProfile at a time: this thread is not profiled
+            return
+        with self._lock:
+            self.profiles.append((stage, profile))
+
+    def _starter(self, frame, event, arg):
+        # enabling the profile replaces this hook for the thread
+        sys.setprofile(None)
+        self._enable(stageOf(threading.current_thread().name))
+
+    def start(self):
+        threading.setprofile(self._starter)
+        self._enable('main')
+
+    def stop(self):
+        threading.setprofile(None)
+        for stage, profile in self.profiles:
+            profile.disable()
+
+    # pstats.Stats of the threads of every stage
+    def stats(self):
+        stages = {}
+        for stage, profile in self.profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stage in stages:
+                stages[stage].add(profile)
+            else:
+                stages[stage] = pstats.Stats(profile)
+        return stages
+
+
+class RunProfiler:
+    def __init__(self, mode):
+        if mode not in PROFILERS[1:]:
+            raise ValueError(f"Unknown profiler {mode!r}, expected one of {', '.join(PROFILERS[1:])}")
+        self.mode = mode
+        self.counters = CallCounters()
+        self._profiler = ThreadProfiles() if mode == 'cprofile' else StackSampler()
+        self.started = None
+        self.elapsed = 0.0
+        self._io = None
+        self.ioRead = None
+        self.ioWritten = None
+
+    def start(self):
+        self.counters.install()
+        self._io = ioBytes()
+        self.started = time.perf_counter()
+        self._profiler.start()
+
+    def stop(self):
+        self._profiler.stop()
+        self.elapsed = time.perf_counter() - self.started
+        self.counters.uninstall()
+        end = ioBytes()
+        if self._io is not None and end is not None:
+            self.ioRead = end[0] - self._io[0]
+            self.ioWritten = end[1] - self._io[1]
+
+    # expensive calls and bytes of the run, in total and on average per image (the calls
+    # are not told apart by image: a few images making most of them do not show)
+    def counts(self, images):
+        counts = dict(self.counters.counts)
+        if self.ioRead is not None:
+            counts['bytes read'] = self.ioRead
+            counts['bytes written'] = self.ioWritten
+        return {name: {'total': n, 'average_per_image': n / images if images else 0.0} for name, n in sorted(counts.items())}
+
+    # per stage figures of the profile and the lines of its text summary; writes the profile of every stage
+    def _stages(self, root):
+        stages = {}
+        lines = []
+        if self.mode == 'cprofile':
+            for stage, stats in sorted(self._profiler.stats().items()):
+                stats.dump_stats(root + '_' + stage + '.prof')
+                text = io.StringIO()
+                stats.stream = text
+                stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+                stages[stage] = {'calls': stats.total_calls, 'seconds': stats.total_tt,
+                                 'profile': root + '_' + stage + '.prof'}
+                lines += [f"== {stage}: {stats.total_calls} calls, {stats.total_tt:.2f} sec", text.getvalue()]
+            return stages, lines
+        sampler = self._profiler
+        for stage, samples in sorted(sampler.samples.items()):
+            with open(root + '_' + stage + '.folded', 'w') as f:
+                for (s, stack), n in sorted(sampler.stacks.items()):
+                    if s == stage:
+                        f.write(f"{stack} {n}\n")
+            kinds = {kind: n / samples for (s, kind), n in sampler.kinds.items() if s == stage}
+            stages[stage] = {'samples': samples, 'seconds': samples * sampler.interval, 'kinds': kinds,
+                             'profile': root + '_' + stage + '.folded'}
+            lines.append(f"== {stage}: {samples} samples (~{samples * sampler.interval:.1f} thread sec), "
+                         + ', '.join(f"{kind} {100 * share:.0f}%" for kind, share in sorted(kinds.items())))
+            top = Counter()
+            for (s, stack), n in sampler.stacks.items():
+                if s == stage:
+                    top[stack.rsplit(';', 1)[-1]] += n
+            lines += [f"  {n:6d}  {name}" for name, n in top.most_common(TOP_FUNCTIONS)]
+        return stages, lines
+
+    # write profile_<dt_string>.json and .txt and the profiles of the stages in
+    # out_folder_path; returns the path of the json
+    def write(self, out_folder_path, dt_string, images):
+        root = out_folder_path + "/profile_" + dt_string
+        stages, lines = self._stages(root)
+        counts = self.counts(images)
+        head = [f"profiler {self.mode}, {self.elapsed:.1f} sec, {images} images"]
+        head += [f"{name}: {c['total']} ({c['average_per_image']:.1f} per image on average)" for name, c in counts.items()]
+        with open(root + '.json', 'w') as f:
+            json.dump({'mode': self.mode, 'elapsed': self.elapsed, 'images': images, 'counts': counts,
+                       'stages': stages}, f, indent=2)
+        with open(root + '.txt', 'w') as f:
+            f.write('\n'.join(head + lines) + '\n')
+        for line in head:
+            gis.addMessage(line)
+        return root + '.json'
@@ -0,0 +1,224 @@
+## Compact per-image records of a run.
+## ImageRecord is one image on its way through the stages, ImageResult the
+## outcome of one image given to the caller, and RecordStore the outcomes of
+## the whole run in columns: the folders, coordinate systems, mosaic datasets
+## and statuses shared by thousands of images are kept once, the numbers in
+## typed arrays. The log, the catalog and the tiles are exported from it.
+import array
+import csv
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+
+
+# folder (with its separator) and name of a path, the folder interned:
+# thousands of images share a few hundred folders
+def splitPath(path):
+    i = max(path.rfind('/'), path.rfind('\\')) + 1
+    return sys.intern(path[:i]), path[i:]
+
+
+# one image on its way through the pipeline. Coordinate system names are
+# interned: a run has thousands of images but only a handful of systems.
+class ImageRecord:
+    __slots__ = ('folder', 'name', 'crs', 'size', 'memory', 'peak', 'method', 'extent', 'output', 'outputSize',
+                 'seconds', 'error', 'notes')
+
+    def __init__(self, path, crs, size=0):
+        self.folder, self.name = splitPath(path)
+        self.crs = sys.intern(crs)
+        self.size = size
+        # estimated and measured peak memory of the conversion (bytes)
+        self.memory = 0
+        self.peak = 0
+        # conversion of the image: 'copy' (CopyRaster), 'stream' (strip by strip,
+        # stream.py) or 'passthrough' (the source jpeg itself, passthrough.py)
+        self.method = 'copy'
+        # extent found by the probe (str of the arcpy Extent), '' when unknown
+        self.extent = ''
+        # reduced image, once converted, its size (bytes) and the time of the conversion (sec)
+        self.output = ''
+        self.outputSize = 0
+        self.seconds = 0.0
+        # set when the image is only downsized and cannot go in a mosaic dataset
+        self.error = ''
+        # details of the conversion for the log
+        self.notes = {}
+
+    @property
+    def path(self):
+        return self.folder + self.name
+
+    def __repr__(self):
+        return f"ImageRecord({self.path!r}, {self.crs!r})"
+
+
+# result of one image of the run
+@dataclass
+class ImageResult:
+    index: int
+    source: str
+    output: str = ''
+    mosaic: str = ''
+    crs: str = 'Unknown'
+    status: str = 'FAILED'
+    error: str = ''
+    start: str = ''
+    end: str = ''
+    # estimated and measured peak memory of the conversion (bytes)
+    memory_estimate: int = 0
+    peak_rss: int = 0
+    # details of the conversion written in the log (e.g. 'stretch')
+    notes: dict = field(default_factory=dict)
+    # size of the source and of the reduced image (bytes)
+    size: int = 0
+    output_size: int = 0
+    # time spent converting the image and adding it to its mosaic dataset (sec)
+    seconds: float = 0.0
+    mosaic_seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return self.status == 'SUCCESS'
+
+
+# distinct values of a column, referenced by their index
+class _Values:
+    def __init__(self):
+        self.values = []
+        self._index = {}
+
+    def add(self, value):
+        i = self._index.get(value)
+        if i is None:
+            i = len(self.values)
+            self.values.append(sys.intern(value))
+            self._index[value] = i
+        return i
+
+
+# results of a run in columns, in the order they were added
+class RecordStore:
+    def __init__(self):
+        self._folders = _Values()
+        self._crs = _Values()
+        self._mosaics = _Values()
+        self._statuses = _Values()
+        self._index = array.array('I')
+        self._sourceFolder = array.array('I')
+        self._sourceName = []
+        self._outputFolder = array.array('I')
+        self._outputName = []
+        self._mosaic = array.array('I')
+        self._crsOf = array.array('I')
+        self._status = array.array('I')
+        self._memory = array.array('q')
+        self._peak = array.array('q')
+        self._size = array.array('q')
+        self._outputSize = array.array('q')
+        self._seconds = array.array('d')
+        self._mosaicSeconds = array.array('d')
+        # arcpy messages of the mosaic dataset, errors and notes, only for the rows that have them
+        self._times = {}
+        self._errors = {}
+        self._notes = {}
+        # row of every source, built by find() on first use, and the number of rows in it
+        self._rows = {}
+        self._indexed = 0
+
+    def __len__(self):
+        return len(self._sourceName)
+
+    def append(self, result):
+        row = len(self)
+        folder, name = splitPath(result.source)
+        self._index.append(result.index)
+        self._sourceFolder.append(self._folders.add(folder))
+        self._sourceName.append(name)
+        folder, name = splitPath(result.output)
+        self._outputFolder.append(self._folders.add(folder))
+        self._outputName.append(name)
+        self._mosaic.append(self._mosaics.add(result.mosaic))
+        self._crsOf.append(self._crs.add(result.crs))
+        self._status.append(self._statuses.add(result.status))
+        self._memory.append(result.memory_estimate)
+        self._peak.append(result.peak_rss)
+        self._size.append(result.size)
+        self._outputSize.append(result.output_size)
+        self._seconds.append(result.seconds)
+        self._mosaicSeconds.append(result.mosaic_seconds)
+        if result.start or result.end:
+            self._times[row] = (result.start, result.end)
+        if result.error:
+            self._errors[row] = result.error
+        if result.notes:
+            self._notes[row] = result.notes
+        return row
+
+    def source(self, row):
+        return self._folders.values[self._sourceFolder[row]] + self._sourceName[row]
+
+    def status(self, row):
+        return self._statuses.values[self._status[row]]
+
+    def crs(self, row):
+        return self._crs.values[self._crsOf[row]]
+
+    def __getitem__(self, row):
+        start, end = self._times.get(row, ('', ''))
+        return ImageResult(self._index[row], self.source(row),
+                           self._folders.values[self._outputFolder[row]] + self._outputName[row],
+                           self._mosaics.values[self._mosaic[row]], self.crs(row), self.status(row),
+                           self._errors.get(row, ''), start, end, self._memory[row], self._peak[row],
+                           dict(self._notes.get(row, {})), self._size[row], self._outputSize[row],
+                           self._seconds[row], self._mosaicSeconds[row])
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    # last result of a source, None when it has none
+    def find(self, source):
+        for row in range(self._indexed, len(self)):
+            self._rows[self.source(row)] = row
+        self._indexed = len(self)
+        row = self._rows.get(source)
+        return None if row is None else self[row]
+
+    # results with a status and/or coordinate system
+    def select(self, status=None, crs=None):
+        for row in range(len(self)):
+            if (status is None or self.status(row) == status) and (crs is None or self.crs(row) == crs):
+                yield self[row]
+
+    # number of images per (coordinate system, status)
+    def counts(self, status=None, crs=None):
+        counter = Counter()
+        for row in range(len(self)):
+            key = (self.crs(row), self.status(row))
+            if (status is None or key[1] == status) and (crs is None or key[0] == crs):
+                counter[key] = counter[key] + 1
+        return counter
+
+    # (source, reduced image, crs) of the images loaded, without the copies of
+    # another image (which share its reduced image)
+    def loaded(self):
+        return [(r.source, r.output, r.crs) for r in self.select('SUCCESS') if 'duplicate of' not in r.notes]
+
+    # store of the rows of a log written by runlog.writeRecords
+    @classmethod
+    def fromLog(cls, path):
+        store = cls()
+        with open(path, newline="") as f:
+            reader = csv.reader(f, delimiter="|")
+            head = next(reader, None)
+            if head is None:
+                return store
+            for values in reader:
+                row = dict(zip(head, values))
+                notes = {'duplicate of': row['duplicate of']} if row.get('duplicate of') else {}
+                store.append(ImageResult(int(row.get('index') or 0), row.get('source file location', ''),
+                                         row.get('new file location', ''), row.get('mosaic dataset name', ''),
+                                         row.get('output coordinate system', ''), row.get('status', ''),
+                                         row.get('error detail', ''), notes=notes))
+        return store
@@ -0,0 +1,206 @@
+## Run report: aggregate figures of a run, written as json and text next to
+## the log and summarised in the geoprocessing messages. The figures are
+## updated as the images go through the stages and complete, so the report
+## can be read at any time during the run.
+import heapq
+import json
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, asdict
+
+from . import gis
+from .discovery import convertSize
+
+# stages of the pipeline, in their order
+STAGES = ['discover', 'probe', 'georeference', 'convert', 'mosaic']
+# images listed as the slowest of the run
+SLOWEST = 10
+
+
+# images and bytes of the sources through a stage and the time it spent on them
+@dataclass
+class StageTiming:
+    name: str
+    images: int = 0
+    bytes: int = 0
+    busy: float = 0.0
+    # wall clock of the start of the first image and the end of the last one (epoch seconds)
+    started: float = 0.0
+    ended: float = 0.0
+
+    @property
+    def elapsed(self):
+        return self.ended - self.started
+
+    # images of size bytes done in seconds, just now
+    def add(self, images, size, seconds):
+        self.ended = time.time()
+        if self.images == 0:
+            self.started = self.ended - seconds
+        self.images = self.images + images
+        self.bytes = self.bytes + size
+        self.busy = self.busy + seconds
+
+    def toDict(self):
+        elapsed = max(self.elapsed, 1e-6)
+        return dict(asdict(self), elapsed=self.elapsed, images_per_sec=self.images / elapsed,
+                    mb_per_sec=self.bytes / 1048576 / elapsed)
+
+
+# class of an error, to count the failures by cause: the arcpy error code, or
+# the message without the paths and numbers that differ from image to image
+def errorClass(error):
+    match = re.search(r'ERROR \d{6}', error)
+    if match:
+        return match.group(0)
+    text = error.strip().splitlines()[0] if error.strip() else 'unknown'
+    text = re.sub(r'\S*[\\/]\S*', '<path>', text)
+    return re.sub(r'\d+(\.\d+)?', '#', text)[:100]
+
+
+# timing of one mosaic dataset (coordinate system group)
+@dataclass
+class GroupTiming:
+    crs: str
+    mosaic: str
+    lane: int
+    images: int = 0
+    failed: int = 0
+    # wall clock of the first and last image of the group (epoch seconds)
+    started: float = 0.0
+    ended: float = 0.0
+    # time spent converting and adding the images of the group
+    busy: float = 0.0
+
+    @property
+    def elapsed(self):
+        return self.ended - self.started
+
+
+class RunReport:
+    def __init__(self, slowest=SLOWEST):
+        self.started = time.time()
+        self.ended = None
+        self.groups = []
+        self.schedule = None
+        # copies of every original image found by the fingerprints
+        self.duplicates = {}
+        # tiles written and deleted and zoom levels of every group (tiles.py)
+        self.tiles = {}
+        self.stages = {name: StageTiming(name) for name in STAGES}
+        # bytes of the sources and reduced images, images per coordinate system and status
+        self.sourceBytes = 0
+        self.outputBytes = 0
+        self.crs = {}
+        # failures per error class and the first image of each class
+        self.failures = Counter()
+        self.failureExamples = {}
+        # (seconds, source) of the slowest images, a heap of at most slowest items
+        self.slowest = slowest
+        self._slowest = []
+
+    def addGroup(self, timing):
+        self.groups.append(timing)
+
+    # planned versus actual makespan of the conversions (schedule.MakespanTracker)
+    def setSchedule(self, schedule):
+        self.schedule = schedule
+
+    def addDuplicate(self, original, copy):
+        self.duplicates.setdefault(original, []).append(copy)
+
+    # images of size bytes that went through a stage in seconds
+    def addStage(self, name, images, size, seconds):
+        self.stages[name].add(images, size, seconds)
+
+    # an image of the run, once done
+    def addResult(self, result):
+        self.sourceBytes = self.sourceBytes + result.size
+        self.outputBytes = self.outputBytes + result.output_size
+        counts = self.crs.setdefault(result.crs, Counter())
+        counts[result.status] = counts[result.status] + 1
+        if not result.ok:
+            key = errorClass(result.error)
+            self.failures[key] = self.failures[key] + 1
+            self.failureExamples.setdefault(key, (result.source, result.error))
+        seconds = result.seconds + result.mosaic_seconds
+        if seconds > 0:
+            if len(self._slowest) < self.slowest:
+                heapq.heappush(self._slowest, (seconds, result.source))
+            elif self.slowest > 0:
+                heapq.heappushpop(self._slowest, (seconds, result.source))
+
+    def addTiles(self, group, written, deleted, zooms):
+        self.tiles[group] = {'written': written, 'deleted': deleted, 'zooms': zooms}
+
+    def finish(self):
+        self.ended = time.time()
+
+    def toDict(self):
+        ended = self.ended if self.ended is not None else time.time()
+        return {
+            'started': self.started,
+            'ended': ended,
+            'elapsed': ended - self.started,
+            'groups': [dict(asdict(g), elapsed=g.elapsed) for g in sorted(self.groups, key=lambda g: g.crs)],
+            'conversion': self.schedule,
+            'duplicates': [{'original': original, 'copies': copies}
+                           for original, copies in sorted(self.duplicates.items())],
+            'tiles': self.tiles,
+            'stages': [stage.toDict() for stage in self.stages.values() if stage.images > 0],
+            'bytes': {'source': self.sourceBytes, 'output': self.outputBytes,
+                      'ratio': self.outputBytes / self.sourceBytes if self.sourceBytes else 0.0},
+            'crs': {crs: dict(counts) for crs, counts in sorted(self.crs.items())},
+            'failures': [{'class': key, 'images': n, 'example': self.failureExamples[key][0],
+                          'error': self.failureExamples[key][1]} for key, n in self.failures.most_common()],
+            'slowest': [{'source': source, 'seconds': seconds} for seconds, source in sorted(self._slowest,
+                                                                                            reverse=True)],
+        }
+
+    def summary(self):
+        lines = []
+        for stage in self.stages.values():
+            if stage.images > 0:
+                elapsed = max(stage.elapsed, 1e-6)
+                lines.append(f"{stage.name}: {stage.images} images, {convertSize(stage.bytes)} in "
+                             f"{stage.elapsed:.1f} sec ({stage.images / elapsed:.1f} images/sec, "
+                             f"{stage.bytes / 1048576 / elapsed:.1f} MB/sec, {stage.busy:.1f} sec busy)")
+        if self.sourceBytes:
+            lines.append(f"sources {convertSize(self.sourceBytes)}, reduced images {convertSize(self.outputBytes)} "
+                         f"({100 * self.outputBytes / self.sourceBytes:.1f}%)")
+        for crs, counts in sorted(self.crs.items()):
+            lines.append(f"{crs}: " + ', '.join(f"{n} {status}" for status, n in sorted(counts.items())))
+        for key, n in self.failures.most_common():
+            lines.append(f"{n} failed with {key} (e.g. {self.failureExamples[key][0]})")
+        if self._slowest:
+            lines.append("slowest images: " + ', '.join(f"{source} {seconds:.1f} sec"
+                                                       for seconds, source in sorted(self._slowest, reverse=True)))
+        for g in sorted(self.groups, key=lambda g: g.crs):
+            lines.append(f"{g.mosaic}: {g.images} images, {g.failed} failed, {g.elapsed:.1f} sec "
+                         f"({g.busy:.1f} sec busy, lane {g.lane})")
+        if self.schedule is not None:
+            lines.append(f"conversion makespan: {self.schedule['actual_makespan']:.1f} sec actual, "
+                         f"{self.schedule['planned_makespan']:.1f} sec planned (largest first on "
+                         f"{self.schedule['workers']} workers)")
+        if self.duplicates:
+            copies = sum(len(c) for c in self.duplicates.values())
+            lines.append(f"{copies} duplicate images linked to {len(self.duplicates)} converted ones")
+        for group, tiles in sorted(self.tiles.items()):
+            zooms = tiles['zooms']
+            lines.append(f"tiles of {group}: {tiles['written']} written, {tiles['deleted']} deleted"
+                         + (f" (zoom {zooms[0]}-{zooms[1]})" if zooms else ''))
+        return lines
+
+    # write report_<dt_string>.json and its summary report_<dt_string>.txt in
+    # out_folder_path and return the path of the json
+    def write(self, out_folder_path, dt_string):
+        path = out_folder_path + "/report_" + dt_string + ".json"
+        with open(path, "w") as f:
+            json.dump(self.toDict(), f, indent=2)
+        lines = self.summary()
+        with open(out_folder_path + "/report_" + dt_string + ".txt", "w") as f:
+            f.write('\n'.join(lines) + '\n')
+        for line in lines:
+            gis.addMessage(line)
+        return path
@@ -0,0 +1,93 @@
+## Tracking log of a run (pipe delimited csv, one row per image).
+import csv
+import re
+
+from . import gis
+from .discovery import rasSize, convertSize
+from .metadata import replace_txt
+
+# head of log file
+head = ['index', 'source file location', 'source file size', 'new file location', 'new file size',
+        'mosaic dataset name', 'output coordinate system', 'start', 'end', 'duration', 'title', 'tags', 'summary',
+        'description', 'credits', 'Use limitations', 'extent', 'scale range', 'status', 'error detail',
+        'estimated memory', 'peak memory', 'stretch', 'other outputs', 'conversion', 'rotation',
+        'duplicate of', 'jpeg quality']
+
+
+# metadata, extent and scale range of a source, blank when it cannot be read
+def metadataCells(filePath):
+    try:
+        raster = gis.arcpy().Raster(filePath)
+        item_md = gis.metadata().Metadata(raster)
+        cells = []
+        for value in [item_md.title, item_md.tags, item_md.summary, item_md.description, item_md.credits,
+                      item_md.accessConstraints]:
+            if value is not None:
+                cells.append(replace_txt(value))
+            else:
+                cells.append('')
+        cells.append(raster.extent)
+        cells.append(str(item_md.minScale) + '-' + str(item_md.maxScale))
+        return cells
+    except Exception:
+        return [''] * 8
+
+
+# row of the log of an image; the sizes are read from the files when not given
+def logRow(index, filePath, newPathFile, mosaicName, crs, start, end, state, errorDetail, memoryEstimate=0,
+           peakRss=0, notes=None, size=None, outputSize=None):
+    notes = notes or {}
+    logRow = []
+    logRow.append(index)
+    logRow.append(filePath)
+    logRow.append(convertSize(rasSize(filePath) if size is None else size))
+    logRow.append(newPathFile)
+    logRow.append(convertSize(rasSize(newPathFile) if outputSize is None else outputSize))
+    logRow.append(mosaicName)
+    logRow.append(crs)
+    logRow.append(start.replace('Start Time: ', ''))
+    end1 = end.replace('Succeeded at ', '')
+    logRow.append(end1[:end1.find('(')])
+    # extract duration
+    dur = end[end.find('(') + 1:]
+    dur = dur.replace(',', '.')
+    dur = re.findall(r'\d+.\d+', dur)
+    if len(dur) == 1:
+        logRow.append(str(dur[0]) + ' sec')
+    else:
+        logRow.append('0 sec')
+    # raster metadata
+    logRow += metadataCells(filePath)
+    logRow.append(state)
+    logRow.append(errorDetail)
+    logRow.append(convertSize(memoryEstimate) if memoryEstimate else '')
+    logRow.append(convertSize(peakRss) if peakRss else '')
+    logRow.append(notes.get('stretch', ''))
+    logRow.append(notes.get('outputs', ''))
+    logRow.append(notes.get('conversion', ''))
+    logRow.append(notes.get('rotation', ''))
+    logRow.append(notes.get('duplicate of', ''))
+    logRow.append(notes.get('quality', ''))
+    return logRow
+
+
+# write the log of the results of a store (records.RecordStore) in out_folder_path, one
+# row at a time, and return its path. The sizes are the ones recorded in the store, and
+# a row that cannot be built keeps the result only, so one image does not lose the log.
+def writeRecords(store, out_folder_path, dt_string):
+    path = out_folder_path + "/log_" + dt_string + ".csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, delimiter="|")
+        writer.writerow(head)
+        for result in store:
+            try:
+                row = logRow(result.index, result.source, result.output, result.mosaic, result.crs, result.start,
+                             result.end, result.status, result.error, result.memory_estimate, result.peak_rss,
+                             result.notes, result.size, result.output_size)
+            except Exception as e:
+                row = [result.index, result.source, convertSize(result.size), result.output,
+                       convertSize(result.output_size), result.mosaic, result.crs, '', '', '', '', '', '', '', '', '',
+                       '', '', result.status, result.error or str(e)]
+            writer.writerow(row)
+    return path
+
@@ -0,0 +1,74 @@
+## Size aware scheduling of the conversions.
+## Jobs wait in a largest-first queue (longest processing time first) so the
+## multi-GB scans start early instead of leaving the pool draining a single
+## huge job at the end of the run. The planned makespan is the LPT schedule
+## of all the jobs of the run, the actual one is measured.
+import heapq
+import itertools
+import time
+
+
+# load of the busiest worker when jobs of the given costs are scheduled
+# largest first on a number of workers
+def lptMakespan(costs, workers):
+    loads = [0] * max(1, workers)
+    for cost in sorted(costs, reverse=True):
+        heapq.heapreplace(loads, loads[0] + cost)
+    return max(loads)
+
+
+# queue of jobs popped largest cost first, in arrival order between equal costs
+class LptQueue:
+    def __init__(self, cost):
+        self.cost = cost
+        self._heap = []
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, job):
+        heapq.heappush(self._heap, (-self.cost(job), next(self._counter), job))
+
+    def peek(self):
+        return self._heap[0][2]
+
+    def pop(self):
+        return heapq.heappop(self._heap)[2]
+
+
+# planned versus actual makespan of the conversion stage
+class MakespanTracker:
+    def __init__(self, workers):
+        self.workers = workers
+        self.costs = []
+        self.busy = 0.0
+        self.first = None
+        self.last = None
+
+    def started(self):
+        if self.first is None:
+            self.first = time.time()
+
+    def done(self, cost, seconds):
+        self.costs.append(cost)
+        self.busy = self.busy + seconds
+        self.last = time.time()
+
+    def toDict(self):
+        total = sum(self.costs)
+        actual = (self.last - self.first) if self.first is not None and self.last is not None else 0.0
+        # bytes per second of one worker, measured on this run
+        throughput = total / self.busy if self.busy > 0 else 0.0
+        planned = lptMakespan(self.costs, self.workers) / throughput if throughput > 0 else 0.0
+        lowerBound = total / self.workers / throughput if throughput > 0 else 0.0
+        return {
+            'workers': self.workers,
+            'jobs': len(self.costs),
+            'bytes': total,
+            'busy': self.busy,
+            'throughput_mb_s': throughput / 1048576,
+            'planned_makespan': planned,
+            'lower_bound_makespan': lowerBound,
+            'actual_makespan': actual,
+        }
@@ -0,0 +1,142 @@
+## Reader of point shapefiles (.shp/.shx/.dbf) without arcpy, for the
+## georeference index. The files are memory mapped and only the asked
+## attribute columns and the X/Y of the points are decoded, as numpy arrays.
+import mmap
+import os
+
+# shape types of the point files
+POINT_TYPES = (1, 11, 21)
+NULL_SHAPE = 0
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required to read the shapefiles")
+    return numpy
+
+
+def _mapFile(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# read(buffer) on the memory map of a file. What read returns must not be a
+# view of the buffer, which is closed afterwards.
+def _readMapped(path, read):
+    buffer = _mapFile(path)
+    try:
+        return read(buffer)
+    finally:
+        if isinstance(buffer, mmap.mmap):
+            try:
+                buffer.close()
+            except BufferError:
+                # still referenced by the traceback of an error; closed by the garbage collector
+                pass
+
+
+# encoding of the attributes, from the .cpg file written next to the .dbf
+def dbfEncoding(shp):
+    cpg = os.path.splitext(shp)[0] + '.cpg'
+    if os.path.isfile(cpg):
+        with open(cpg) as f:
+            encoding = f.read().strip()
+        if encoding != '':
+            return 'utf-8' if encoding.upper() in ('UTF-8', 'UTF8', '65001') else encoding
+    return 'latin-1'
+
+
+# fields of a .dbf: [(name, type, offset in the record, length)], with the
+# number of records, the header length and the record length
+def dbfHeader(buffer):
+    np = _numpy()
+    count = int(np.frombuffer(buffer, '<u4', 1, 4)[0])
+    headerLength, recordLength = (int(v) for v in np.frombuffer(buffer, '<u2', 2, 8))
+    fields = []
+    # every record starts with its deletion flag
+    offset = 1
+    position = 32
+    while position + 32 <= headerLength and buffer[position] != 0x0D:
+        descriptor = bytes(buffer[position:position + 32])
+        name = descriptor[:11].split(b'\x00')[0].decode('ascii', 'replace').strip()
+        length = descriptor[16]
+        fields.append((name, chr(descriptor[11]), offset, length))
+        offset = offset + length
+        position = position + 32
+    return fields, count, headerLength, recordLength
+
+
+# names of the fields of the .dbf of a shapefile
+def shapefileFields(shp):
+    return _readMapped(os.path.splitext(shp)[0] + '.dbf', lambda dbf: [field[0] for field in dbfHeader(dbf)[0]])
+
+
+# (X, Y) of the records of a point .shp, from the offsets of its .shx; NaN for null shapes
+def _readPoints(shp):
+    np = _numpy()
+    # record offsets are in 16 bit words; the content starts after the 8 bytes of the record header
+    index = _readMapped(os.path.splitext(shp)[0] + '.shx', lambda shx: np.frombuffer(shx, '>i4', offset=100).copy())
+    content = index.reshape(-1, 2)[:, 0].astype(np.int64) * 2 + 8
+
+    def read(buffer):
+        shapeType = int(np.frombuffer(buffer, '<i4', 1, 32)[0])
+        if shapeType not in POINT_TYPES:
+            raise ValueError(shp + " is not a point shapefile")
+        data = np.frombuffer(buffer, np.uint8)
+        types = data[content[:, None] + np.arange(4)].view('<i4')[:, 0]
+        # a null shape is only its type: X/Y are read for the points alone
+        points = types != NULL_SHAPE
+        xy = np.full((len(content), 2), np.nan)
+        xy[points] = data[content[points][:, None] + 4 + np.arange(16)].view('<f8')
+        return xy[:, 0], xy[:, 1]
+
+    return _readMapped(shp, read)
+
+
+# {field: array} of the attributes of a .dbf, only for the given fields.
+# Character fields are str arrays, numeric ones float arrays (NaN when empty).
+def _readAttributes(shp, names):
+    np = _numpy()
+    encoding = dbfEncoding(shp)
+
+    def read(dbf):
+        fields, count, headerLength, recordLength = dbfHeader(dbf)
+        byName = {field[0]: field for field in fields}
+        byUpperName = {field[0].upper(): field for field in fields}
+        records = np.frombuffer(dbf, np.uint8, count * recordLength, headerLength).reshape(count, recordLength)
+        columns = {'__deleted__': records[:, 0] == ord('*')}
+        for name in names:
+            field = byName.get(name) or byUpperName.get(name.upper())
+            if field is None:
+                raise ValueError("Missing " + name + " Column")
+            fieldName, fieldType, offset, length = field
+            raw = np.ascontiguousarray(records[:, offset:offset + length]).view('S' + str(length))[:, 0]
+            raw = np.char.strip(raw)
+            if fieldType in ('N', 'F'):
+                values = np.full(count, np.nan)
+                filled = (raw != b'') & (np.char.find(raw, b'*') < 0)
+                values[filled] = raw[filled].astype(np.float64)
+                columns[name] = values
+            else:
+                columns[name] = np.char.decode(raw, encoding, 'replace')
+        return columns
+
+    return _readMapped(os.path.splitext(shp)[0] + '.dbf', read)
+
+
+# columns of a point shapefile: the given attribute fields and 'SHAPE@X', 'SHAPE@Y'
+# as arrays, without the deleted records
+def readPointShapefile(shp, fields):
+    xs, ys = _readPoints(shp)
+    columns = _readAttributes(shp, fields)
+    keep = ~columns.pop('__deleted__')
+    if len(keep) != len(xs):
+        raise ValueError(shp + " has different numbers of shapes and attribute records")
+    columns = {name: values[keep] for name, values in columns.items()}
+    columns['SHAPE@X'] = xs[keep]
+    columns['SHAPE@Y'] = ys[keep]
+    return columns
@@ -0,0 +1,285 @@
+## Strip streamed conversion for rasters larger than memory.
+## The source is read in strips of full rows with arcpy.RasterToNumPyArray;
+## every strip is downsampled and converted to 8 bit on its own and written
+## at its place in the (already reduced) output images, which are temporary
+## raw rasters on disk (OutputRaster). The memory is bounded by the strip
+## size whatever the image size (streamMemory). All the output profiles
+## (profiles.py) are built from the same strips, each level from the
+## previous one. 16 bit and float sources can be rescaled on the way
+## (stretch.py). Frames georeferenced with a rotated world file can be
+## turned north-up on the way, strip by strip. The rasters are then encoded
+## by GDAL when its python bindings are installed, otherwise by CopyRaster,
+## which both read them by blocks: at a fixed quality or within a byte
+## budget (jpegquality.py), with their world file and projection next to
+## them, or as cloud optimized GeoTIFFs (cog.py).
+## numpy and Pillow come with the ArcGIS Pro python; they are only imported
+## when this path is used.
+import os
+
+from . import gis
+from .cog import writeCog, gdalWith
+from .convert import copyFromToFormat
+from .governor import pixelBytes
+from .jpegquality import encodeWithin, describeQuality, proxyTiles
+from .profiles import resolveFactors
+from .stretch import rasterStretch
+from .worldfile import worldFilePath, writeWorld, reduceWorld, rotateCounterClockwise
+
+# bytes of source pixels read per strip
+STRIP_BYTES = 64 * 1048576
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required for the streamed conversion")
+    return numpy
+
+
+def _pil():
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("Pillow is required for the streamed conversion")
+    return Image
+
+
+# number of rows per strip: a multiple of the downsample factor holding
+# about blockBytes of source pixels
+def stripRows(width, bands, pixelType, factor=1, blockBytes=STRIP_BYTES):
+    rowBytes = max(1, width * bands * pixelBytes(pixelType))
+    rows = max(1, blockBytes // rowBytes)
+    return max(factor, rows // factor * factor)
+
+
+# peak memory of a streamed conversion: a strip, its float copy and its reduced
+# levels (float and 8 bit); the outputs are on disk
+def streamMemory(width, height, bands, pixelType, factors=(1,), blockBytes=STRIP_BYTES):
+    rows = min(stripRows(width, bands, pixelType, max(factors), blockBytes), height)
+    strip = rows * width * bands
+    outBands = 3 if bands >= 3 else 1
+    levels = sum(-(-rows // factor) * -(-width // factor) * outBands * 5 for factor in factors)
+    return strip * pixelBytes(pixelType) + strip * 4 + levels
+
+
+# (bands, rows, cols) strips of a raster from the top, with the row of the first line
+def iterStrips(raster, rows):
+    arcpy = gis.arcpy()
+    np = _numpy()
+    extent = raster.extent
+    cellHeight = raster.meanCellHeight
+    for row0 in range(0, raster.height, rows):
+        n = min(rows, raster.height - row0)
+        corner = arcpy.Point(extent.XMin, extent.YMax - (row0 + n) * cellHeight)
+        block = arcpy.RasterToNumPyArray(raster, corner, raster.width, n, 0)
+        if block.ndim == 2:
+            block = block[np.newaxis, :, :]
+        yield row0, block
+
+
+# the bands written in the jpeg: grey or the first three (RGB of RGBN scans)
+def jpegBands(block):
+    if block.shape[0] >= 3:
+        return block[:3]
+    return block[:1]
+
+
+# 8 bit values, clipped like CopyRaster to 8_BIT_UNSIGNED without scaling
+def to8bit(block):
+    np = _numpy()
+    if block.dtype == np.uint8:
+        return block
+    return np.clip(block, 0, 255).astype(np.uint8)
+
+
+# box average over factor x factor pixels; the last partial box of each
+# axis is padded with the edge pixels
+def downsample(block, factor):
+    if factor <= 1:
+        return block
+    np = _numpy()
+    bands, rows, cols = block.shape
+    padRows = -rows % factor
+    padCols = -cols % factor
+    if padRows or padCols:
+        block = np.pad(block, ((0, 0), (0, padRows), (0, padCols)), mode='edge')
+    bands, rows, cols = block.shape
+    boxes = block.reshape(bands, rows // factor, factor, cols // factor, factor)
+    return boxes.mean(axis=(2, 4), dtype=np.float32)
+
+
+# world file of a jpeg whose top left corner and pixel size are given
+def writeWorldFile(imagePath, left, top, cellWidth, cellHeight):
+    # world files give the center of the top left pixel
+    return writeWorld(worldFilePath(imagePath), (cellWidth, 0.0, 0.0, -cellHeight, left + cellWidth / 2,
+                                                 top - cellHeight / 2))
+
+
+def writeProjection(imagePath, spatialReference):
+    prjPath = os.path.splitext(imagePath)[0] + '.prj'
+    with open(prjPath, 'w') as f:
+        f.write(spatialReference.exportToString())
+    return prjPath
+
+
+# 8 bit output image of a streamed conversion, written on disk as it is built:
+# a raw band interleaved by pixel raster (ESRI .hdr) with its world file and
+# projection, which GDAL and CopyRaster read like any georeferenced raster
+class OutputRaster:
+    def __init__(self, toPath, rows, cols, bands, world, spatialReference):
+        self.path = os.path.splitext(toPath)[0] + '_temp.bip'
+        self.shape = (rows, cols, bands)
+        root = os.path.splitext(self.path)[0]
+        with open(root + '.hdr', 'w') as f:
+            f.write(f"BYTEORDER I\nLAYOUT BIP\nNROWS {rows}\nNCOLS {cols}\nNBANDS {bands}\nNBITS 8\n"
+                    f"TOTALROWBYTES {cols * bands}\n")
+        writeWorld(worldFilePath(self.path), world)
+        writeProjection(self.path, spatialReference)
+        self._file = open(self.path, 'wb')
+        self._file.truncate(rows * cols * bands)
+
+    # write (rows, cols, bands) pixels with their top left corner at (row0, col0)
+    def write(self, row0, col0, pixels):
+        rows, cols, bands = self.shape
+        if col0 == 0 and pixels.shape[1] == cols:
+            self._file.seek(row0 * cols * bands)
+            self._file.write(pixels.tobytes())
+            return
+        for r in range(pixels.shape[0]):
+            self._file.seek(((row0 + r) * cols + col0) * bands)
+            self._file.write(pixels[r].tobytes())
+
+    def close(self):
+        self._file.close()
+
+    # Pillow image of the proxy of the raster (jpegquality.py) read from the disk, and its scale
+    def proxy(self):
+        np = _numpy()
+        Image = _pil()
+        rows, cols, bands = self.shape
+        pixels = np.memmap(self.path, np.uint8, 'r', shape=self.shape)
+        try:
+            tiles = proxyTiles(cols, rows)
+            if tiles is None:
+                proxy = np.array(pixels)
+            else:
+                corners, (tileCols, tileRows), (tileWidth, tileHeight) = tiles
+                proxy = np.empty((tileRows * tileHeight, tileCols * tileWidth, bands), np.uint8)
+                for i, (left, top) in enumerate(corners):
+                    r = i // tileCols * tileHeight
+                    c = i % tileCols * tileWidth
+                    proxy[r:r + tileHeight, c:c + tileWidth] = pixels[top:top + tileHeight, left:left + tileWidth]
+        finally:
+            del pixels
+        image = Image.fromarray(proxy[:, :, 0], 'L') if bands == 1 else Image.fromarray(proxy, 'RGB')
+        return image, rows * cols / (proxy.shape[0] * proxy.shape[1])
+
+    # encode the raster to toPath in format ('JPEG', 'PNG' or 'COG')
+    def encode(self, toPath, format, quality=75):
+        # never write through a hard link to the source (passthrough.py)
+        if os.path.exists(toPath):
+            os.remove(toPath)
+        if format == 'COG':
+            writeCog(self.path, toPath, quality)
+            return
+        gdal = gdalWith(format)
+        if gdal is not None:
+            gdal.Translate(toPath, self.path, format=format,
+                           creationOptions=['QUALITY=' + str(quality)] if format == 'JPEG' else [])
+        else:
+            copyFromToFormat(self.path, toPath, format, quality)
+
+    def remove(self):
+        self.close()
+        root = os.path.splitext(self.path)[0]
+        for path in (self.path, root + '.hdr', worldFilePath(self.path), root + '.prj', self.path + '.aux.xml',
+                     self.path + '.ovr'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# world file of an output reduced by factor: rotated is the world file of a
+# frame turned north-up, else the cells of the raster are scaled
+def outputWorld(raster, factor, rotated=None):
+    if rotated is not None:
+        return rotateCounterClockwise(reduceWorld(rotated, factor), -(-raster.width // factor))
+    cellWidth = raster.meanCellWidth * factor
+    cellHeight = raster.meanCellHeight * factor
+    # world files give the center of the top left pixel
+    return (cellWidth, 0.0, 0.0, -cellHeight, raster.extent.XMin + cellWidth / 2,
+            raster.extent.YMax - cellHeight / 2)
+
+
+# convert fromPath strip by strip to the outputs of targets, a list of
+# (path, OutputProfile), and return the notes of the conversion for the log.
+# rotated is the world file of a frame to turn 90 degrees counter-clockwise:
+# every strip of source rows becomes a band of output columns, written at
+# their place in the output on disk.
+def streamConvert(fromPath, targets, blockBytes=STRIP_BYTES, stretch='none', clip=2.0, stddevs=2.5, rotated=None):
+    np = _numpy()
+    raster = gis.arcpy().Raster(fromPath)
+    notes = {}
+    stretcher = rasterStretch(raster, stretch, 3 if raster.bandCount >= 3 else 1, clip, stddevs)
+    if stretcher is not None:
+        notes['stretch'] = stretcher.describe()
+    factors = resolveFactors([profile for path, profile in targets], raster.width, raster.height)
+    # levels from the largest to the smallest output, each reduced from the previous
+    order = sorted(range(len(targets)), key=lambda i: factors[i])
+    rows = stripRows(raster.width, raster.bandCount, raster.pixelType, max(factors), blockBytes)
+    outputs = [None] * len(targets)
+    qualities = []
+    try:
+        for row0, block in iterStrips(raster, rows):
+            level = jpegBands(block)
+            del block
+            previous = 1
+            for i in order:
+                level = downsample(level, factors[i] // previous)
+                previous = factors[i]
+                if stretcher is not None:
+                    reduced = stretcher.apply(level)
+                else:
+                    reduced = to8bit(level if level.dtype == np.uint8 else np.rint(level))
+                height = -(-raster.height // factors[i])
+                width = -(-raster.width // factors[i])
+                outRow = row0 // factors[i]
+                if outputs[i] is None:
+                    shape = (width, height) if rotated is not None else (height, width)
+                    outputs[i] = OutputRaster(targets[i][0], *shape, reduced.shape[0],
+                                              outputWorld(raster, factors[i], rotated), raster.spatialReference)
+                if rotated is not None:
+                    turned = np.rot90(reduced, 1, axes=(1, 2))
+                    outputs[i].write(0, outRow, np.moveaxis(turned, 0, -1))
+                else:
+                    outputs[i].write(outRow, 0, np.moveaxis(reduced, 0, -1))
+        for (toPath, profile), factor, output in zip(targets, factors, outputs):
+            output.close()
+            if profile.adaptive:
+                rowCount, colCount = output.shape[:2]
+                budget = profile.byteBudget(colCount, rowCount)
+                proxy, scale = output.proxy()
+
+                def encode(quality):
+                    output.encode(toPath, 'JPEG', quality)
+                    return os.path.getsize(toPath)
+
+                quality, size = encodeWithin(proxy, scale, budget, encode)
+                qualities.append(describeQuality(quality, size, colCount, rowCount, budget))
+            else:
+                output.encode(toPath, profile.format, profile.quality)
+            if profile.format != 'COG':
+                # the COG holds its georeferencing
+                writeWorld(worldFilePath(toPath), outputWorld(raster, factor, rotated))
+                writeProjection(toPath, raster.spatialReference)
+    finally:
+        for output in outputs:
+            if output is not None:
+                output.remove()
+    if rotated is not None:
+        notes['rotation'] = 'north-up'
+    if qualities:
+        notes['quality'] = '; '.join(qualities)
+    if len(targets) > 1:
+        notes['outputs'] = ', '.join(path for path, profile in targets[1:])
+    return notes
@@ -0,0 +1,96 @@
+## 8 bit rescale of 16 bit and float sources.
+## The statistics come from a decimated sample of the raster (a few strips
+## spread over its height, every n-th column) instead of every pixel, and
+## the stretch is applied block by block by the streamed conversion. The
+## chosen parameters are written in the log so a run can be reproduced.
+from . import gis
+
+STRETCHES = ['none', 'minmax', 'percent', 'stddev']
+
+# pixels read to compute the statistics of a raster
+SAMPLE_PIXELS = 1000000
+SAMPLE_STRIPS = 16
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required to stretch the images")
+    return numpy
+
+
+# (bands, n) sample of the pixels of a raster
+def sampleRaster(raster, maxPixels=SAMPLE_PIXELS, strips=SAMPLE_STRIPS):
+    arcpy = gis.arcpy()
+    np = _numpy()
+    width = raster.width
+    height = raster.height
+    # decimate the columns as much as the rows
+    stride = max(1, int((width * height / maxPixels) ** 0.5))
+    strips = min(strips, height)
+    rows = max(1, min(height // strips, maxPixels // strips // max(1, width // stride)))
+    extent = raster.extent
+    cellHeight = raster.meanCellHeight
+    samples = []
+    for i in range(strips):
+        row0 = (height - rows) * i // max(1, strips - 1) if strips > 1 else 0
+        corner = arcpy.Point(extent.XMin, extent.YMax - (row0 + rows) * cellHeight)
+        block = arcpy.RasterToNumPyArray(raster, corner, width, rows, 0)
+        if block.ndim == 2:
+            block = block[np.newaxis, :, :]
+        samples.append(block[:, ::stride, ::stride].reshape(block.shape[0], -1))
+    return np.concatenate(samples, axis=1)
+
+
+# linear stretch of every band from [low, high] to [0, 255]
+class Stretch:
+    def __init__(self, method, low, high):
+        self.method = method
+        self.low = [float(v) for v in low]
+        self.high = [float(v) for v in high]
+
+    # 8 bit (bands, rows, cols) block
+    def apply(self, block):
+        np = _numpy()
+        low = np.asarray(self.low[:block.shape[0]], dtype=np.float32)[:, None, None]
+        high = np.asarray(self.high[:block.shape[0]], dtype=np.float32)[:, None, None]
+        scale = 255.0 / np.maximum(high - low, 1e-6)
+        out = (block.astype(np.float32, copy=False) - low) * scale
+        return np.clip(np.rint(out), 0, 255).astype(np.uint8)
+
+    # parameters written in the log
+    def describe(self):
+        bands = '; '.join(f"b{i + 1} {lo:g}-{hi:g}" for i, (lo, hi) in enumerate(zip(self.low, self.high)))
+        return f"{self.method}: {bands}"
+
+
+# stretch of a (bands, n) sample. percent clips clip % of each tail,
+# stddev keeps mean +/- stddevs standard deviations.
+def computeStretch(sample, method, clip=2.0, stddevs=2.5):
+    np = _numpy()
+    sample = sample.astype(np.float64, copy=False)
+    if method == 'minmax':
+        low = np.nanmin(sample, axis=1)
+        high = np.nanmax(sample, axis=1)
+    elif method == 'percent':
+        low = np.nanpercentile(sample, clip, axis=1)
+        high = np.nanpercentile(sample, 100 - clip, axis=1)
+    elif method == 'stddev':
+        mean = np.nanmean(sample, axis=1)
+        std = np.nanstd(sample, axis=1)
+        low = np.maximum(mean - stddevs * std, np.nanmin(sample, axis=1))
+        high = np.minimum(mean + stddevs * std, np.nanmax(sample, axis=1))
+    else:
+        raise ValueError("Unknown stretch " + str(method))
+    return Stretch(method, low, high)
+
+
+# stretch of a raster from a sample of its pixels, None for 'none'
+def rasterStretch(raster, method, bands=None, clip=2.0, stddevs=2.5):
+    if method == 'none':
+        return None
+    sample = sampleRaster(raster)
+    if bands is not None:
+        sample = sample[:bands]
+    return computeStretch(sample, method, clip, stddevs)
@@ -0,0 +1,493 @@
+## Web tiles of the reduced images, so the mosaics can be viewed in a browser
+## without ArcGIS: one Web Mercator pyramid per coordinate system group, as an
+## XYZ folder ({z}/{x}/{y}.png) or an MBTiles file.
+## The tiles of the deepest zoom level are drawn from the images that cover
+## them; every other level is built from the four tiles below it. Tiles are
+## drawn in parallel. The projection to Web Mercator is exact on a grid of
+## control points per image (arcpy) and interpolated in between.
+## A manifest kept with the tiles records the images drawn, by source, and
+## their footprint, so a new run (writing to a new _v# folder) only redraws
+## the tiles touched by the images added, changed or deleted since, and their
+## parents.
+import concurrent.futures
+import io
+import json
+import math
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from . import gis
+from .mosaic import mosaicName
+from .worldfile import findWorldFile, readWorldFile
+
+TILE_SIZE = 256
+# half of the width of the Web Mercator world, in meters
+ORIGIN = 20037508.342789244
+MAX_ZOOM = 22
+WEB_MERCATOR_CODES = (3857, 102100)
+# control points per side of the grid projected per image
+CONTROL_POINTS = 17
+# points per side of an image projected to find its footprint
+EDGE_POINTS = 9
+TILE_WORKERS = 8
+# decoded images kept in memory while the tiles are drawn
+CACHE_BYTES = 512 * 1048576
+TILE_FORMATS = {'png': 'PNG', 'jpg': 'JPEG'}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required to build the tiles")
+    return numpy
+
+
+def _pil():
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("Pillow is required to build the tiles")
+    return Image
+
+
+# size of a pixel of zoom level z, in meters
+def tileResolution(z):
+    return 2 * ORIGIN / (TILE_SIZE * 2 ** z)
+
+
+# (xmin, ymin, xmax, ymax) of a tile
+def tileBounds(z, x, y):
+    span = 2 * ORIGIN / 2 ** z
+    return -ORIGIN + x * span, ORIGIN - (y + 1) * span, -ORIGIN + (x + 1) * span, ORIGIN - y * span
+
+
+# tiles of zoom level z covering a Web Mercator bounding box
+def tilesOf(bbox, z):
+    span = 2 * ORIGIN / 2 ** z
+    last = 2 ** z - 1
+    x0 = min(last, max(0, int((bbox[0] + ORIGIN) // span)))
+    x1 = min(last, max(0, int((bbox[2] + ORIGIN) // span)))
+    y0 = min(last, max(0, int((ORIGIN - bbox[3]) // span)))
+    y1 = min(last, max(0, int((ORIGIN - bbox[1]) // span)))
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+# deepest zoom level whose pixels are not larger than resolution
+def zoomFor(resolution):
+    return min(MAX_ZOOM, max(0, math.ceil(math.log2(2 * ORIGIN / (TILE_SIZE * resolution)))))
+
+
+def isWebMercator(spatialReference):
+    return getattr(spatialReference, 'factoryCode', 0) in WEB_MERCATOR_CODES
+
+
+# points projected between two spatial references, one by one (arcpy)
+def projectPoints(xs, ys, fromSR, toSR):
+    arcpy = gis.arcpy()
+    points = [arcpy.PointGeometry(arcpy.Point(float(x), float(y)), fromSR).projectAs(toSR).firstPoint
+              for x, y in zip(xs, ys)]
+    return [p.X for p in points], [p.Y for p in points]
+
+
+# a reduced image placed in Web Mercator: its world file, footprint and the
+# pixel coordinates of a grid of control points over the footprint
+class TileImage:
+    def __init__(self, path, spatialReference, bbox=None):
+        np = _numpy()
+        self.path = path
+        with _pil().open(path) as image:
+            self.width, self.height = image.size
+        self.world = readWorldFile(findWorldFile(path))
+        self.spatialReference = spatialReference
+        self.identity = isWebMercator(spatialReference)
+        self._mercator = None if self.identity else gis.arcpy().SpatialReference(WEB_MERCATOR_CODES[0])
+        if bbox is None:
+            across = np.linspace(-0.5, self.width - 0.5, EDGE_POINTS)
+            down = np.linspace(-0.5, self.height - 0.5, EDGE_POINTS)
+            cols = np.concatenate([across, np.full(EDGE_POINTS, self.width - 0.5), across,
+                                   np.full(EDGE_POINTS, -0.5)])
+            rows = np.concatenate([np.full(EDGE_POINTS, -0.5), down, np.full(EDGE_POINTS, self.height - 0.5), down])
+            xs, ys = self._toMercator(*self.worldOf(cols, rows))
+            bbox = (min(xs), min(ys), max(xs), max(ys))
+        self.bbox = tuple(bbox)
+        self._grid = None
+
+    # map coordinates of pixel centers
+    def worldOf(self, cols, rows):
+        a, d, b, e, c, f = self.world
+        return a * cols + b * rows + c, d * cols + e * rows + f
+
+    def pixelOf(self, xs, ys):
+        a, d, b, e, c, f = self.world
+        det = a * e - b * d
+        dx = xs - c
+        dy = ys - f
+        return (e * dx - b * dy) / det, (a * dy - d * dx) / det
+
+    def _toMercator(self, xs, ys):
+        if self.identity:
+            return list(xs), list(ys)
+        return projectPoints(xs, ys, self.spatialReference, self._mercator)
+
+    # pixel coordinates of the control points, projected once per image
+    def _controlGrid(self):
+        if self._grid is None:
+            np = _numpy()
+            gx, gy = np.meshgrid(np.linspace(self.bbox[0], self.bbox[2], CONTROL_POINTS),
+                                 np.linspace(self.bbox[1], self.bbox[3], CONTROL_POINTS))
+            xs, ys = projectPoints(gx.ravel(), gy.ravel(), self._mercator, self.spatialReference)
+            cols, rows = self.pixelOf(np.asarray(xs), np.asarray(ys))
+            self._grid = cols.reshape(gx.shape), rows.reshape(gx.shape)
+        return self._grid
+
+    # pixel coordinates of the Web Mercator points xs (columns) x ys (rows)
+    def pixelsOf(self, xs, ys):
+        np = _numpy()
+        if self.identity:
+            return self.pixelOf(xs[None, :], ys[:, None])
+        cols, rows = self._controlGrid()
+        last = CONTROL_POINTS - 1
+        u = np.clip((xs - self.bbox[0]) / max(self.bbox[2] - self.bbox[0], 1e-9) * last, 0, last)
+        v = np.clip((ys - self.bbox[1]) / max(self.bbox[3] - self.bbox[1], 1e-9) * last, 0, last)
+        i = np.minimum(u.astype(int), last - 1)
+        j = np.minimum(v.astype(int), last - 1)
+        fu = (u - i)[None, :]
+        fv = (v - j)[:, None]
+        i = i[None, :]
+        j = j[:, None]
+
+        def interpolate(grid):
+            return ((grid[j, i] * (1 - fu) + grid[j, i + 1] * fu) * (1 - fv)
+                    + (grid[j + 1, i] * (1 - fu) + grid[j + 1, i + 1] * fu) * fv)
+
+        return interpolate(cols), interpolate(rows)
+
+
+# decoded RGB images, least recently used ones dropped first
+class ImageCache:
+    def __init__(self, maxBytes=CACHE_BYTES):
+        self.maxBytes = maxBytes
+        self._images = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            pixels = self._images.get(path)
+            if pixels is not None:
+                self._images.move_to_end(path)
+                return pixels
+        with _pil().open(path) as image:
+            pixels = _numpy().asarray(image.convert('RGB'))
+        with self._lock:
+            if path not in self._images:
+                self._images[path] = pixels
+                self._bytes = self._bytes + pixels.nbytes
+                while self._bytes > self.maxBytes and len(self._images) > 1:
+                    dropped, old = self._images.popitem(last=False)
+                    self._bytes = self._bytes - old.nbytes
+        return pixels
+
+
+# bilinear samples of an (rows, cols, bands) image at fractional pixel coordinates
+def _bilinear(pixels, cols, rows):
+    np = _numpy()
+    height, width = pixels.shape[:2]
+    cols = np.clip(cols, 0, width - 1)
+    rows = np.clip(rows, 0, height - 1)
+    c0 = np.minimum(cols.astype(int), max(0, width - 2))
+    r0 = np.minimum(rows.astype(int), max(0, height - 2))
+    c1 = np.minimum(c0 + 1, width - 1)
+    r1 = np.minimum(r0 + 1, height - 1)
+    fc = (cols - c0)[:, None]
+    fr = (rows - r0)[:, None]
+    top = pixels[r0, c0] * (1 - fc) + pixels[r0, c1] * fc
+    bottom = pixels[r1, c0] * (1 - fc) + pixels[r1, c1] * fc
+    return np.rint(top * (1 - fr) + bottom * fr).astype(np.uint8)
+
+
+# RGBA pixels of a tile of the deepest level drawn from images, the first one
+# on top; None when none of them covers it
+def drawTile(z, x, y, images, cache):
+    np = _numpy()
+    xmin, ymin, xmax, ymax = tileBounds(z, x, y)
+    resolution = tileResolution(z)
+    xs = xmin + (np.arange(TILE_SIZE) + 0.5) * resolution
+    ys = ymax - (np.arange(TILE_SIZE) + 0.5) * resolution
+    tile = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    for image in images:
+        cols, rows = image.pixelsOf(xs, ys)
+        inside = ((cols >= -0.5) & (cols <= image.width - 0.5) & (rows >= -0.5) & (rows <= image.height - 0.5)
+                  & (tile[:, :, 3] == 0))
+        if not inside.any():
+            continue
+        tile[inside, :3] = _bilinear(cache.get(image.path), cols[inside], rows[inside])
+        tile[inside, 3] = 255
+        if tile[:, :, 3].all():
+            break
+    return tile if tile[:, :, 3].any() else None
+
+
+def encodeTile(tile, fmt):
+    Image = _pil()
+    buffer = io.BytesIO()
+    if fmt == 'JPEG':
+        Image.fromarray(tile[:, :, :3], 'RGB').save(buffer, 'JPEG', quality=85)
+    else:
+        Image.fromarray(tile, 'RGBA').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def decodeTile(data):
+    np = _numpy()
+    with _pil().open(io.BytesIO(data)) as image:
+        return np.asarray(image.convert('RGBA'))
+
+
+# tile built from the four tiles below it, None when they are all empty
+def parentTile(store, z, x, y):
+    np = _numpy()
+    canvas = np.zeros((2 * TILE_SIZE, 2 * TILE_SIZE, 4), dtype=np.uint8)
+    found = False
+    for dx in (0, 1):
+        for dy in (0, 1):
+            data = store.read(z + 1, 2 * x + dx, 2 * y + dy)
+            if data is not None:
+                canvas[dy * TILE_SIZE:(dy + 1) * TILE_SIZE, dx * TILE_SIZE:(dx + 1) * TILE_SIZE] = decodeTile(data)
+                found = True
+    if not found:
+        return None
+    return np.asarray(_pil().fromarray(canvas, 'RGBA').resize((TILE_SIZE, TILE_SIZE), _pil().BOX))
+
+
+# XYZ folder: {z}/{x}/{y}.<format> and manifest.json
+class XyzStore:
+    def __init__(self, folder, fmt='PNG'):
+        self.folder = folder
+        self.format = fmt
+        self.extension = '.jpg' if fmt == 'JPEG' else '.png'
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, z, x, y):
+        return os.path.join(self.folder, str(z), str(x), str(y) + self.extension)
+
+    def read(self, z, x, y):
+        try:
+            with open(self.path(z, x, y), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, z, x, y, data):
+        path = self.path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def delete(self, z, x, y):
+        if os.path.exists(self.path(z, x, y)):
+            os.remove(self.path(z, x, y))
+
+    def manifest(self):
+        try:
+            with open(os.path.join(self.folder, 'manifest.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def saveManifest(self, manifest):
+        with open(os.path.join(self.folder, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+
+    def close(self):
+        pass
+
+
+# MBTiles file (sqlite, rows counted from the bottom), with the manifest in its metadata
+class MbtilesStore:
+    def __init__(self, path, fmt='PNG'):
+        self.format = fmt
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, "
+                         "tile_row INTEGER, tile_data BLOB, PRIMARY KEY (zoom_level, tile_column, tile_row))")
+
+    def read(self, z, x, y):
+        with self._lock:
+            row = self._db.execute("SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                                   (z, x, 2 ** z - 1 - y)).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def write(self, z, x, y, data):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)", (z, x, 2 ** z - 1 - y, data))
+
+    def delete(self, z, x, y):
+        with self._lock:
+            self._db.execute("DELETE FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                             (z, x, 2 ** z - 1 - y))
+
+    def manifest(self):
+        row = self._db.execute("SELECT value FROM metadata WHERE name='imagesloader'").fetchone()
+        return {} if row is None else json.loads(row[0])
+
+    def saveManifest(self, manifest):
+        bbox = manifest.get('bbox')
+        metadata = {'name': manifest.get('name', ''), 'format': 'jpg' if self.format == 'JPEG' else 'png',
+                    'type': 'overlay', 'minzoom': str(manifest['min_zoom']), 'maxzoom': str(manifest['max_zoom']),
+                    'imagesloader': json.dumps(manifest)}
+        if bbox is not None:
+            # bounds in longitude and latitude
+            west, south = mercatorToLonLat(bbox[0], bbox[1])
+            east, north = mercatorToLonLat(bbox[2], bbox[3])
+            metadata['bounds'] = f"{west:.6f},{south:.6f},{east:.6f},{north:.6f}"
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)", list(metadata.items()))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+
+def mercatorToLonLat(x, y):
+    return math.degrees(x / 6378137.0), math.degrees(2 * math.atan(math.exp(y / 6378137.0)) - math.pi / 2)
+
+
+# tile store of a group: '<folder>/<group>/' or '<folder>/<group>.mbtiles'
+def openStore(folder, group, kind='xyz', fmt='PNG'):
+    if kind == 'mbtiles':
+        os.makedirs(folder, exist_ok=True)
+        return MbtilesStore(os.path.join(folder, group + '.mbtiles'), fmt)
+    return XyzStore(os.path.join(folder, group), fmt)
+
+
+# draw the tiles of a group of reduced images, a list of (source, reduced image), in
+# a store, redrawing only the tiles touched by the images changed since its
+# manifest. Returns the number of tiles written and deleted and the zoom levels.
+def buildTiles(store, images, spatialReference, name='', minZoom=-1, maxZoom=-1, workers=TILE_WORKERS):
+    manifest = store.manifest()
+    previous = manifest.get('images', {})
+    entries = dict(previous)
+    changed = []
+    tileImages = {}
+    for source, path in images:
+        # the source when it is still there: every run writes its reduced images to a new folder
+        stat = os.stat(source if os.path.isfile(source) else path)
+        entry = {'path': path, 'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+        old = previous.get(source)
+        if old is not None and old.get('mtime') == entry['mtime'] and old.get('size') == entry['size']:
+            # unchanged: its tiles are kept, and redrawn from its latest reduced image when needed
+            entries[source] = dict(old, path=path)
+            continue
+        image = TileImage(path, spatialReference)
+        tileImages[path] = image
+        entry['bbox'] = list(image.bbox)
+        entry['resolution'] = (image.bbox[2] - image.bbox[0]) / max(1, image.width)
+        entries[source] = entry
+        changed.append(entry['bbox'])
+        if old is not None:
+            changed.append(old['bbox'])
+    # images of earlier runs whose reduced image was deleted
+    for source, entry in previous.items():
+        if entries.get(source) is entry and not os.path.isfile(entry['path']):
+            del entries[source]
+            changed.append(entry['bbox'])
+    if len(entries) == 0:
+        return 0, 0, None
+    # the zoom levels are kept from the first build so it can be updated
+    if maxZoom < 0:
+        maxZoom = manifest.get('max_zoom', -1)
+    if maxZoom < 0:
+        resolutions = sorted(entry['resolution'] for entry in entries.values())
+        maxZoom = zoomFor(resolutions[len(resolutions) // 2])
+    bbox = [min(e['bbox'][0] for e in entries.values()), min(e['bbox'][1] for e in entries.values()),
+            max(e['bbox'][2] for e in entries.values()), max(e['bbox'][3] for e in entries.values())]
+    if minZoom < 0:
+        minZoom = manifest.get('min_zoom', -1)
+    if minZoom < 0:
+        # the whole group in a tile or two
+        minZoom = min(maxZoom, zoomFor(max(bbox[2] - bbox[0], bbox[3] - bbox[1]) / TILE_SIZE))
+    if manifest.get('max_zoom', maxZoom) != maxZoom or manifest.get('min_zoom', minZoom) != minZoom:
+        changed = [e['bbox'] for e in entries.values()] + [e['bbox'] for e in previous.values()]
+    touched = set()
+    for box in changed:
+        touched.update(tilesOf(box, maxZoom))
+    # images covering every touched tile, in the order of the sources
+    covering = {}
+    for source in sorted(entries):
+        entry = entries[source]
+        for tile in tilesOf(entry['bbox'], maxZoom):
+            if tile in touched:
+                covering.setdefault(tile, []).append(entry)
+    cache = ImageCache()
+    lock = threading.Lock()
+
+    def imageOf(entry):
+        with lock:
+            image = tileImages.get(entry['path'])
+        if image is None:
+            image = TileImage(entry['path'], spatialReference, entry['bbox'])
+            with lock:
+                tileImages[entry['path']] = image
+        return image
+
+    written = [0]
+    deleted = [0]
+
+    def save(z, x, y, tile):
+        if tile is None:
+            store.delete(z, x, y)
+            with lock:
+                deleted[0] = deleted[0] + 1
+        else:
+            store.write(z, x, y, encodeTile(tile, store.format))
+            with lock:
+                written[0] = written[0] + 1
+
+    def base(tile):
+        x, y = tile
+        save(maxZoom, x, y, drawTile(maxZoom, x, y, [imageOf(e) for e in covering.get(tile, [])], cache))
+
+    with concurrent.futures.ThreadPoolExecutor(max(1, workers), thread_name_prefix='imagesloader-tiles') as pool:
+        # neighbouring tiles one after the other, so the decoded images are reused
+        list(pool.map(base, sorted(touched)))
+        for z in range(maxZoom - 1, minZoom - 1, -1):
+            touched = {(x // 2, y // 2) for x, y in touched}
+            list(pool.map(lambda tile: save(z, tile[0], tile[1], parentTile(store, z, tile[0], tile[1])),
+                          sorted(touched)))
+    store.saveManifest({'name': name, 'min_zoom': minZoom, 'max_zoom': maxZoom, 'bbox': bbox, 'images': entries})
+    return written[0], deleted[0], (minZoom, maxZoom)
+
+
+# name of the tiles of a coordinate system group
+def groupName(crs):
+    return mosaicName(crs)[len("MosaicDataset_"):]
+
+
+# build the tiles of every coordinate system group of a run from (source, reduced
+# image, crs) of its images; returns {group: (written, deleted, zooms)}
+def exportTiles(images, folder, kind='xyz', fmt='png', minZoom=-1, maxZoom=-1, workers=TILE_WORKERS):
+    groups = {}
+    for source, path, crs in images:
+        if path == '' or not os.path.isfile(path):
+            gis.addMessage("No tiles for " + source + ": its reduced image " + path + " is missing")
+        elif findWorldFile(path) == '':
+            gis.addMessage("No tiles for " + source + ": " + path + " has no world file")
+        else:
+            groups.setdefault(crs, []).append((source, path))
+    summary = {}
+    for crs, group in sorted(groups.items()):
+        spatialReference = gis.arcpy().Describe(group[0][1]).spatialReference
+        store = openStore(folder, groupName(crs), kind, TILE_FORMATS[fmt])
+        try:
+            summary[groupName(crs)] = buildTiles(store, group, spatialReference, groupName(crs), minZoom, maxZoom,
+                                                 workers)
+        finally:
+            store.close()
+    return summary
@@ -0,0 +1,157 @@
+## Watch mode: the images dropped in the source folder while the loader runs
+## are converted, given their metadata and added to their mosaic dataset one
+## by one, seconds after they are written, in the geodatabase of the session
+## or an existing one (options.gdb).
+## Changes are notified by watchdog (inotify, ReadDirectoryChangesW) when it is
+## installed, otherwise the folder is polled. A file is only taken once its
+## size and modification time have not changed for `settle` seconds and it
+## can be opened, so frames still being copied are left alone.
+import os
+import threading
+import time
+
+from .discovery import isImage, iterImageStats
+from .pipeline import convert_folder, CancelToken, QUEUE_SIZE
+
+# seconds between two checks of the files waiting to settle
+TICK = 0.2
+
+
+def _watchdog():
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+    return FileSystemEventHandler, Observer
+
+
+# a file being written is locked on Windows, and may not exist any more
+def _readable(path):
+    try:
+        with open(path, 'rb') as f:
+            f.read(1)
+        return True
+    except OSError:
+        return False
+
+
+# iterable of the (path, size) of the images of a folder as they are created
+# or modified, until stop (a threading.Event) is set or the run is cancelled
+class FolderWatcher:
+    def __init__(self, folder, stop=None, settle=2.0, poll=1.0, initial=False, cancel=None):
+        self.folder = folder
+        self.stop = stop or threading.Event()
+        self.settle = settle
+        self.poll = poll
+        self.initial = initial
+        self.cancel = cancel
+        self.backend = 'watchdog' if _watchdog() is not None else 'polling'
+        self._lock = threading.Lock()
+        self._events = set()
+        # (size, mtime) of the images given to the run, and of the ones waiting
+        # to settle with the time they last changed
+        self._done = {}
+        self._pending = {}
+
+    def stopped(self):
+        return self.stop.is_set() or (self.cancel is not None and self.cancel.cancelled)
+
+    def _snapshot(self):
+        return {f: (stat.st_size, stat.st_mtime_ns) for f, stat in iterImageStats(self.folder)}
+
+    # paths of the events built like the ones of the listings: the folder as it was given, then '/' separated
+    def _notify(self, path):
+        path = self.folder + '/' + os.path.relpath(path, self.folder).replace(os.sep, '/')
+        if isImage(path):
+            with self._lock:
+                self._events.add(path)
+
+    def _startObserver(self):
+        FileSystemEventHandler, Observer = _watchdog()
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                if not event.is_directory:
+                    watcher._notify(event.src_path)
+
+            def on_modified(self, event):
+                if not event.is_directory:
+                    watcher._notify(event.src_path)
+
+            def on_moved(self, event):
+                if not event.is_directory:
+                    watcher._notify(event.dest_path)
+
+            def on_closed(self, event):
+                if not event.is_directory:
+                    watcher._notify(event.src_path)
+
+        observer = Observer()
+        observer.schedule(Handler(), self.folder, recursive=True)
+        observer.daemon = True
+        observer.start()
+        return observer
+
+    # paths created or modified since the last call
+    def _changes(self, lastPoll):
+        if self.backend == 'watchdog':
+            with self._lock:
+                events = self._events
+                self._events = set()
+            return events, lastPoll
+        now = time.monotonic()
+        if now - lastPoll < self.poll:
+            return set(), lastPoll
+        snapshot = self._snapshot()
+        return {f for f, key in snapshot.items() if self._done.get(f) != key}, now
+
+    def __iter__(self):
+        observer = self._startObserver() if self.backend == 'watchdog' else None
+        try:
+            # the images already there are the baseline, unless they are asked for
+            snapshot = self._snapshot()
+            if self.initial:
+                self._pending = {f: (None, 0.0) for f in snapshot}
+            else:
+                self._done = dict(snapshot)
+            lastPoll = time.monotonic()
+            while not self.stopped():
+                changes, lastPoll = self._changes(lastPoll)
+                for f in changes:
+                    if f not in self._pending:
+                        self._pending[f] = (None, 0.0)
+                now = time.monotonic()
+                for f, (key, since) in list(self._pending.items()):
+                    try:
+                        stat = os.stat(f)
+                    except OSError:
+                        # deleted or renamed before it settled
+                        del self._pending[f]
+                        continue
+                    current = (stat.st_size, stat.st_mtime_ns)
+                    if current != key:
+                        self._pending[f] = (current, now)
+                    elif now - since >= self.settle and self._done.get(f) != current and _readable(f):
+                        del self._pending[f]
+                        self._done[f] = current
+                        yield f, stat.st_size
+                    elif self._done.get(f) == current:
+                        del self._pending[f]
+                self.stop.wait(TICK)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join(5)
+
+
+# run the loader on the images written in options.image_folder until stop is
+# set, as a stream of ImageResult (see pipeline.convert_folder). When stop is
+# set the images already taken are finished and the mosaic datasets renamed
+# with their number of images.
+def watch_folder(options, stop=None, cancel=None, settle=2.0, poll=1.0, initial=False, queue_size=QUEUE_SIZE,
+                 report=None, store=None):
+    cancel = cancel or CancelToken()
+    watcher = FolderWatcher(options.image_folder, stop, settle, poll, initial, cancel)
+    return convert_folder(options, cancel, queue_size, report, sources=watcher, store=store)
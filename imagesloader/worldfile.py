@@ -0,0 +1,59 @@
+## World files: the six affine parameters of an image, one per line
+## (A, D, B, E, C, F) where x = A*col + B*row + C and y = D*col + E*row + F
+## give the center of pixel (col, row).
+import os
+
+
+# world file name of an image: first and last letters of its extension + 'w' (.jgw, .tfw, .pgw)
+def worldFilePath(imagePath):
+    root, ext = os.path.splitext(imagePath)
+    return root + '.' + ext[1] + ext[-1] + 'w'
+
+
+# existing world file of an image, '' when there is none. GeoreferenceTable.georeference()
+# writes a .tfw whatever the format of the image, so it is looked for last.
+def findWorldFile(imagePath):
+    root, ext = os.path.splitext(imagePath)
+    for path in (worldFilePath(imagePath), imagePath + 'w', root + '.wld', root + '.tfw'):
+        if os.path.isfile(path):
+            return path
+    return ''
+
+
+# (A, D, B, E, C, F) of a world file
+def readWorldFile(path):
+    with open(path) as f:
+        values = [float(line) for line in f.read().split()]
+    if len(values) != 6:
+        raise ValueError("Invalid world file " + path)
+    return tuple(values)
+
+
+def writeWorld(path, params):
+    with open(path, 'w') as f:
+        for value in params:
+            f.write(repr(float(value)) + "\n")
+    return path
+
+
+# parameters of the image reduced by factor (box average): the center of
+# a reduced pixel is the center of its factor x factor box
+def reduceWorld(params, factor):
+    A, D, B, E, C, F = params
+    shift = (factor - 1) / 2
+    return (A * factor, D * factor, B * factor, E * factor, C + (A + B) * shift, F + (D + E) * shift)
+
+
+# the columns run along y and the rows along x: a frame of an east-west
+# flight line georeferenced with rotation terms
+def isRotated(params):
+    A, D, B, E, C, F = params
+    return A == 0 and E == 0 and B != 0 and D != 0
+
+
+# parameters of the image turned 90 degrees counter-clockwise, width being
+# the number of columns before the rotation: the new pixel (c, r) is the old
+# (width - 1 - r, c), so the image is north-up when the old one was rotated.
+def rotateCounterClockwise(params, width):
+    A, D, B, E, C, F = params
+    return (B, E, -A, -D, C + A * (width - 1), F + D * (width - 1))
@@ -0,0 +1,55 @@
+## Listing of the source folders (imagesloader/discovery.py) and its snapshot.
+import os
+
+from imagesloader.discovery import DirectoryCrawler, iterImageStats, listImages
+
+
+def _tree(root):
+    (root / 'sub' / 'deeper').mkdir(parents=True)
+    (root / 'other').mkdir()
+    for name in ('a.tif', 'notes.txt', 'sub/b.jpg', 'sub/deeper/c.jp2', 'other/d.png'):
+        (root / name).write_bytes(b'x' * len(name))
+
+
+def test_crawl(tmp_path):
+    _tree(tmp_path)
+    folder = str(tmp_path)
+    crawled = list(DirectoryCrawler(folder, workers=3))
+    assert sorted(crawled) == sorted((f, stat.st_size) for f, stat in iterImageStats(folder))
+    assert len(crawled) == 4
+    assert listImages(folder, workers=1) == sorted(f for f, size in crawled)
+
+
+# the second crawl lists only the folders changed since the first one
+def test_snapshot(tmp_path):
+    root = tmp_path / 'images'
+    root.mkdir()
+    _tree(root)
+    snapshot = str(tmp_path / 'snapshot.json')
+    crawler = DirectoryCrawler(str(root), snapshot=snapshot)
+    first = sorted(crawler)
+    assert (crawler.listed, crawler.reused) == (4, 0)
+    crawler = DirectoryCrawler(str(root), snapshot=snapshot)
+    assert sorted(crawler) == first
+    assert (crawler.listed, crawler.reused) == (0, 4)
+    (root / 'sub' / 'e.tif').write_bytes(b'new')
+    stat = os.stat(root / 'sub')
+    os.utime(root / 'sub', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    crawler = DirectoryCrawler(str(root), snapshot=snapshot)
+    assert (str(root) + '/sub/e.tif', 3) in list(crawler)
+    assert (crawler.listed, crawler.reused) == (1, 3)
+
+
+# a snapshot of another folder, or an unreadable one, is not used
+def test_snapshot_other_root(tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    snapshot = str(tmp_path / 'snapshot.json')
+    list(DirectoryCrawler(str(tmp_path / 'a'), snapshot=snapshot))
+    crawler = DirectoryCrawler(str(tmp_path / 'b'), snapshot=snapshot)
+    list(crawler)
+    assert (crawler.listed, crawler.reused) == (1, 0)
+    (tmp_path / 'snapshot.json').write_text('{not json')
+    crawler = DirectoryCrawler(str(tmp_path / 'b'), snapshot=snapshot)
+    list(crawler)
+    assert crawler.listed == 1
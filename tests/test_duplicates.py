@@ -0,0 +1,101 @@
+## Copies of the same image (user-042): the reduced image of a copy is linked from the original's.
+import importlib
+
+from imagesloader.passthrough import linkImage
+
+fingerprints = importlib.import_module('imagesloader.fingerprint')
+original_fingerprint = fingerprints.fingerprint
+
+AUX = ('<PAMDataset><SRS>PROJCS["NAD 1983 UTM Zone 16N"]</SRS>'
+       '<Metadata domain="xml:ESRI" format="xml"><metadata><dataIdInfo><idCitation><resTitle>Original</resTitle>'
+       '</idCitation></dataIdInfo></metadata></Metadata></PAMDataset>')
+
+
+# the copy gets the pixels, world file, projection and spatial reference of the original, not its metadata
+def test_linkImage(tmp_path):
+    original = tmp_path / 'a.jpg'
+    original.write_bytes(b'jpeg')
+    (tmp_path / 'a.jgw').write_text('1\n0\n0\n-1\n0.5\n-0.5\n')
+    (tmp_path / 'a.prj').write_text('PROJCS["NAD 1983 UTM Zone 16N"]')
+    (tmp_path / 'a.jpg.aux.xml').write_text(AUX)
+    copy = tmp_path / 'sub' / 'a.jpg'
+    copy.parent.mkdir()
+    linkImage(str(original), str(copy))
+    assert copy.read_bytes() == b'jpeg'
+    assert (tmp_path / 'sub' / 'a.jgw').read_text() == (tmp_path / 'a.jgw').read_text()
+    assert (tmp_path / 'sub' / 'a.prj').is_file()
+    aux = (tmp_path / 'sub' / 'a.jpg.aux.xml').read_text()
+    assert '<SRS>' in aux
+    assert 'Original' not in aux
+
+
+def test_linkImage_metadata_only(tmp_path):
+    original = tmp_path / 'a.jpg'
+    original.write_bytes(b'jpeg')
+    (tmp_path / 'a.jpg.aux.xml').write_text('<PAMDataset><Metadata domain="xml:ESRI" format="xml"><metadata/>'
+                                           '</Metadata></PAMDataset>')
+    linkImage(str(original), str(tmp_path / 'b.jpg'))
+    assert not (tmp_path / 'b.jpg.aux.xml').exists()
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return str(path), len(data)
+
+
+# copies are the later images of the same pixels and georeferencing; a lone size is never read
+def test_DuplicateFinder(tmp_path, monkeypatch):
+    (tmp_path / 'sub').mkdir()
+    a = _write(tmp_path / 'a.tif', b'pixels of a')
+    other = _write(tmp_path / 'b.tif', b'pixels of b')
+    lone = _write(tmp_path / 'c.tif', b'other size')
+    copy = _write(tmp_path / 'sub' / 'a.tif', b'pixels of a')
+    read = []
+    monkeypatch.setattr(fingerprints, 'fingerprint', lambda path, size, full: read.append(path) or
+                        original_fingerprint(path, size, full))
+    finder = fingerprints.DuplicateFinder()
+    assert finder.originalOf(*a) is None
+    assert finder.originalOf(*lone) is None
+    assert read == []
+    assert finder.originalOf(*other) is None
+    assert finder.originalOf(*copy) == a[0]
+    assert lone[0] not in read
+
+
+# the same pixels placed elsewhere are another image
+def test_DuplicateFinder_world_file(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    a = _write(tmp_path / 'a.jpg', b'pixels')
+    copy = _write(tmp_path / 'sub' / 'a.jpg', b'pixels')
+    (tmp_path / 'a.jgw').write_text('1\n0\n0\n-1\n0.5\n-0.5\n')
+    (tmp_path / 'sub' / 'a.jgw').write_text('1\n0\n0\n-1\n100.5\n-0.5\n')
+    finder = fingerprints.DuplicateFinder()
+    assert finder.originalOf(*a) is None
+    assert finder.originalOf(*copy) is None
+
+
+# an image modified in watch mode is no longer the original of its old copies' content
+def test_DuplicateFinder_modified(tmp_path):
+    a = _write(tmp_path / 'a.tif', b'first')
+    b = _write(tmp_path / 'b.tif', b'first')
+    finder = fingerprints.DuplicateFinder()
+    finder.originalOf(*a)
+    assert finder.originalOf(*b) == a[0]
+    a = _write(tmp_path / 'a.tif', b'other')
+    assert finder.originalOf(*a) is None
+    c = _write(tmp_path / 'c.tif', b'first')
+    assert finder.originalOf(*c) == b[0]
+
+
+# the sampled fingerprint of a large file reads blocks of it, the full one all of it
+def test_fingerprint_sampled(tmp_path):
+    size = fingerprints.SAMPLE_BLOCKS * fingerprints.SAMPLE_BLOCK_BYTES * 2
+    data = bytearray(size)
+    path, size = _write(tmp_path / 'a.tif', bytes(data))
+    sampled = original_fingerprint(path, size)
+    full = original_fingerprint(path, size, full=True)
+    # a byte between the sampled blocks
+    data[fingerprints.SAMPLE_BLOCK_BYTES + 10] = 1
+    _write(tmp_path / 'a.tif', bytes(data))
+    assert original_fingerprint(path, size) == sampled
+    assert original_fingerprint(path, size, full=True) != full
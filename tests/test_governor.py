@@ -0,0 +1,78 @@
+## Memory budget of the conversions (imagesloader/governor.py and the admission in pipeline._nextJob).
+import types
+
+from imagesloader.governor import MemoryGovernor, PeakRss, estimateMemory, memoryBudget, rasterHeader
+from imagesloader.pipeline import _nextJob
+from imagesloader.schedule import LptQueue
+
+
+def _jobs(*memories):
+    jobs = LptQueue(lambda job: job.memory)
+    for i, memory in enumerate(memories):
+        jobs.push(types.SimpleNamespace(name=i, memory=memory))
+    return jobs
+
+
+def test_estimateMemory():
+    # 16 bit RGBN source and its 8 bit RGB output
+    assert estimateMemory(100, 10, 4, 'U16') == int((100 * 10 * 4 * 2 + 100 * 10 * 3) * 1.25)
+    # unknown pixel types count as 4 bytes
+    assert estimateMemory(10, 10, 1, 'XX') == int((10 * 10 * 4 + 10 * 10) * 1.25)
+
+
+def test_rasterHeader():
+    band = types.SimpleNamespace(width=30, height=20, pixelType='U8')
+    assert rasterHeader(types.SimpleNamespace(bandCount=3, children=[band])) == (30, 20, 3, 'U8')
+    assert rasterHeader(types.SimpleNamespace(bandCount=1, width=5, height=6, pixelType='F32')) == (5, 6, 1, 'F32')
+    assert rasterHeader(object()) is None
+
+
+def test_memoryBudget():
+    assert memoryBudget(512) == 512 * 1048576
+
+
+def test_governor():
+    governor = MemoryGovernor(100)
+    # a job larger than the budget runs alone
+    assert governor.fits(500)
+    governor.acquire(60)
+    assert governor.fits(40)
+    assert not governor.fits(41)
+    governor.acquire(40)
+    governor.release(60)
+    assert (governor.inUse, governor.inFlight, governor.peakInUse) == (40, 1, 100)
+    assert MemoryGovernor(None).fits(10 ** 12)
+
+
+def test_nextJob_largest_that_fits():
+    governor = MemoryGovernor(100)
+    governor.acquire(50)
+    jobs = _jobs(80, 30, 40)
+    waiting = [0]
+    # the 80 waits for memory, the 40 overtakes it
+    assert _nextJob(jobs, governor, waiting, 2).memory == 40
+    assert waiting == [1]
+    assert len(jobs) == 2 and jobs.peek().memory == 80
+
+
+# the largest job is only overtaken maxBypass times
+def test_nextJob_bypass_limit():
+    governor = MemoryGovernor(100)
+    governor.acquire(50)
+    jobs = _jobs(80, 10, 10, 10)
+    waiting = [0]
+    assert _nextJob(jobs, governor, waiting, 2) is not None
+    assert _nextJob(jobs, governor, waiting, 2) is not None
+    assert _nextJob(jobs, governor, waiting, 2) is None
+    governor.release(50)
+    assert _nextJob(jobs, governor, waiting, 2).memory == 80
+    assert _nextJob(_jobs(), governor, waiting, 2) is None
+
+
+# the growth of the memory over its level at the start, not the memory of the process
+def test_peakRss():
+    with PeakRss() as peak:
+        block = bytearray(32 * 1048576)
+        block[::4096] = b'x' * len(block[::4096])
+    if peak.value is not None:
+        assert peak.value < peak.peak
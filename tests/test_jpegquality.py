@@ -0,0 +1,73 @@
+## Jpeg quality searched per image to fit a byte budget (imagesloader/jpegquality.py).
+import numpy as np
+from PIL import Image
+
+from imagesloader import jpegquality
+from imagesloader.jpegquality import (describeQuality, encodeWithin, jpegBytes, proxyImage, proxyTiles,
+                                      saveJpegWithin, searchQuality)
+
+
+# a noisy image, whose size depends a lot on the quality
+def _image(width, height, seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def test_proxyTiles():
+    assert proxyTiles(600, 400) is None
+    corners, grid, tile = proxyTiles(4000, 1000)
+    assert grid == (8, 8) and tile == (64, 64)
+    # the tiles reach the edges of the image
+    assert corners[0] == (0, 0) and corners[-1] == (4000 - 64, 1000 - 64)
+    corners, grid, tile = proxyTiles(100000, 40)
+    assert grid == (8, 1) and tile == (64, 40)
+
+
+def test_proxyImage():
+    image = _image(200, 100)
+    assert proxyImage(image) == (image, 1.0)
+    proxy, scale = proxyImage(_image(2048, 1024))
+    assert proxy.size == (512, 512) and scale == 8.0
+    assert proxy.getpixel((0, 0)) == _image(2048, 1024).getpixel((0, 0))
+
+
+def test_searchQuality():
+    image = _image(128, 128)
+    budget = len(jpegBytes(image, 50))
+    quality = searchQuality(image, 1.0, budget)
+    assert len(jpegBytes(image, quality)) <= budget < len(jpegBytes(image, quality + 1))
+    assert searchQuality(image, 1.0, 10) == jpegquality.MIN_QUALITY
+
+
+def test_saveJpegWithin(tmp_path):
+    image = _image(1500, 1000)
+    path = tmp_path / 'a.jpg'
+    budget = 400000
+    quality, size = saveJpegWithin(image, str(path), budget)
+    assert size == path.stat().st_size <= budget
+    assert jpegquality.MIN_QUALITY < quality < jpegquality.MAX_QUALITY
+    assert Image.open(path).size == (1500, 1000)
+
+
+# an encode over the budget is corrected with the size the whole image gave, at most CORRECTIONS times
+def test_encodeWithin_corrections():
+    proxy = _image(128, 128)
+    proxySize = len(jpegBytes(proxy, 60))
+    qualities = []
+
+    def encode(quality):
+        qualities.append(quality)
+        # the whole image is twice as large as the proxy says
+        return len(jpegBytes(proxy, quality)) * 2
+
+    quality, size = encodeWithin(proxy, 1.0, proxySize, encode)
+    assert len(qualities) == 2 and qualities[1] < qualities[0]
+    assert size <= proxySize and quality == qualities[-1]
+    qualities.clear()
+    quality, size = encodeWithin(proxy, 1.0, 10, lambda quality: qualities.append(quality) or 1000)
+    assert qualities == [jpegquality.MIN_QUALITY]
+
+
+def test_describeQuality():
+    assert describeQuality(80, 2048, 128, 128, 4096) == 'q80 2.00 KB 1.00 bpp'
+    assert describeQuality(10, 8192, 128, 128, 4096).endswith('(over budget)')
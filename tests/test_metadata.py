@@ -0,0 +1,62 @@
+## Metadata written straight into the .aux.xml of the images (imagesloader/metadata.py).
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from imagesloader.metadata import metadataValues, renderMetadata, writeMetadata, writeMetadataSidecar
+
+ROW = ['Flight 12', 'ortho, 2019 ,', 'Summary', 'Description', 'Credits', 'None']
+EXTENT = '0 0 10 10 NaN NaN NaN NaN'
+
+
+def _document(path):
+    root = ET.parse(str(path) + '.aux.xml').getroot()
+    return root, root.find("Metadata[@domain='xml:ESRI']/metadata")
+
+
+def test_metadataValues():
+    values = metadataValues('a.tif', ROW, EXTENT)
+    assert values['tags'] == ['ortho', '2019']
+    assert values['accessConstraints'] == 'None' and values['extent'] == EXTENT
+    with pytest.raises(ValueError):
+        metadataValues('a.tif', ROW[:5], EXTENT)
+
+
+def test_new_sidecar(tmp_path):
+    image = tmp_path / 'a.jpg'
+    values = metadataValues(str(image), ROW, EXTENT)
+    assert writeMetadataSidecar(str(image), renderMetadata(values), values)
+    root, document = _document(image)
+    assert root.tag == 'PAMDataset'
+    assert document.findtext('dataIdInfo/idCitation/resTitle') == 'Flight 12'
+    assert document.findtext('dataIdInfo/dataExt/exDesc') == EXTENT
+    assert [k.text for k in document.findall('dataIdInfo/searchKeys/keyword')] == ['ortho', '2019']
+
+
+# the rest of the sidecar is kept, and a sidecar holding the values already is not rewritten
+def test_existing_sidecar(tmp_path):
+    image = tmp_path / 'a.tif'
+    (tmp_path / 'a.tif.aux.xml').write_text(
+        '<PAMDataset><SRS>PROJCS["UTM"]</SRS><Metadata domain="xml:ESRI" format="xml"><metadata>'
+        '<dataIdInfo><idCitation><resTitle>Old</resTitle></idCitation><idCredit>Kept</idCredit>'
+        '<searchKeys><keyword>old</keyword></searchKeys></dataIdInfo></metadata></Metadata></PAMDataset>')
+    values = metadataValues(str(image), ROW, EXTENT)
+    rendered = renderMetadata(values)
+    assert writeMetadataSidecar(str(image), rendered, values)
+    root, document = _document(image)
+    assert root.findtext('SRS') == 'PROJCS["UTM"]'
+    assert document.findtext('dataIdInfo/idCitation/resTitle') == 'Flight 12'
+    assert document.findtext('dataIdInfo/idCredit') == 'Credits'
+    assert [k.text for k in document.findall('dataIdInfo/searchKeys/keyword')] == ['ortho', '2019']
+    assert not writeMetadataSidecar(str(image), rendered, values)
+
+
+# every file raster of an image gets the same metadata, without opening it when the extent is known
+def test_writeMetadata(tmp_path):
+    source = tmp_path / 'a.tif'
+    reduced = tmp_path / 'a.jpg'
+    source.write_bytes(b'')
+    reduced.write_bytes(b'')
+    assert writeMetadata([str(source), str(reduced)], ROW, EXTENT) == [str(source), str(reduced)]
+    assert _document(reduced)[1].findtext('dataIdInfo/idAbs') == 'Description'
+    assert writeMetadata([str(source), str(reduced)], ROW, EXTENT) == []
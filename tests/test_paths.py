@@ -0,0 +1,36 @@
+## Output paths of a run (imagesloader/convert.py PathMapping).
+import os
+
+from imagesloader.convert import PathMapping, splitFolder
+
+
+def test_splitFolder():
+    assert splitFolder('D:\\data\\Images\\') == ('D:\\data', 'Images')
+    assert splitFolder('/data/Images') == ('/data', 'Images')
+
+
+# the output folders are next to the images folder and mirror its sub folders
+def test_outputPath(tmp_path):
+    images = str(tmp_path / 'Images')
+    paths = PathMapping(images, ['Images_Reduced_Images_v0', 'Images_Thumbnails_v0'])
+    source = images + '/12/north/a.tif'
+    assert paths.outputPath(source) == os.path.join(str(tmp_path), 'Images_Reduced_Images_v0', '12', 'north', 'a.jpg')
+    assert paths.outputPath(source, 1, '.png') == os.path.join(str(tmp_path), 'Images_Thumbnails_v0', '12', 'north',
+                                                               'a.png')
+    assert paths.outputPath(images + '/a.b.tif') == os.path.join(str(tmp_path), 'Images_Reduced_Images_v0', 'a.b.jpg')
+    # the folders given by the toolbox, with backslashes
+    assert paths.foldersOf(images + '\\12\\') == paths.foldersOf(images + '/12/')
+
+
+# the folders of a source folder are created with its first image only
+def test_create(tmp_path):
+    images = str(tmp_path / 'Images') + '/'
+    paths = PathMapping(images, ['Images_Reduced_Images_v0', 'Images_Preview_v0'])
+    paths.create(images + 'sub/a.tif')
+    assert (tmp_path / 'Images_Reduced_Images_v0' / 'sub').is_dir()
+    assert (tmp_path / 'Images_Preview_v0' / 'sub').is_dir()
+    os.rmdir(tmp_path / 'Images_Preview_v0' / 'sub')
+    paths.create(images + 'sub/b.tif')
+    assert not (tmp_path / 'Images_Preview_v0' / 'sub').exists()
+    paths.create(images + 'c.tif')
+    assert (tmp_path / 'Images_Preview_v0').is_dir()
@@ -0,0 +1,47 @@
+## Stage plumbing of the pipeline (imagesloader/pipeline.py), without arcpy.
+import queue
+import types
+
+import pytest
+
+from imagesloader.pipeline import CancelToken, Cancelled, _END, _LaneError, _get, _isEnd, _put, _relay
+
+
+def _run():
+    return types.SimpleNamespace(cancel=CancelToken())
+
+
+# the results of the lanes are relayed in their order, up to the end of every lane
+def test_relay():
+    lanes = queue.Queue()
+    results = queue.Queue()
+    for item in ['a', _END, 'b', _END, 'after']:
+        lanes.put(item)
+    _relay(_run(), lanes, results, 2)
+    relayed = [results.get_nowait() for i in range(results.qsize())]
+    assert relayed[0] == 'a' and _isEnd(relayed[1]) and relayed[2] == 'b' and _isEnd(relayed[3])
+    assert len(relayed) == 4
+    assert lanes.get_nowait() == 'after'
+
+
+# a lane that failed ends the relay
+def test_relay_lane_error():
+    lanes = queue.Queue()
+    results = queue.Queue()
+    error = _LaneError(RuntimeError('lane'))
+    lanes.put(error)
+    _relay(_run(), lanes, results, 2)
+    assert results.get_nowait() is error
+    assert results.empty()
+
+
+def test_cancel():
+    cancel = CancelToken()
+    q = queue.Queue(1)
+    _put(q, 1, cancel)
+    assert _get(q, cancel) == 1
+    cancel.cancel()
+    with pytest.raises(Cancelled):
+        _get(q, cancel)
+    with pytest.raises(Cancelled):
+        _put(q, 2, cancel)
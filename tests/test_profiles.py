@@ -0,0 +1,38 @@
+## Output profiles (imagesloader/profiles.py) and the folders of their outputs.
+import pytest
+
+from imagesloader.convert import getIndexNewFolders
+from imagesloader.profiles import OutputProfile, parseProfile, resolveFactors
+
+
+def test_parseProfile():
+    profile = parseProfile('_Thumbnails:max_size=256,quality=60')
+    assert (profile.suffix, profile.max_size, profile.quality, profile.factor) == ('_Thumbnails', 256, 60, 1)
+    profile = parseProfile('_Preview:factor=8,format=png')
+    assert (profile.factor, profile.format, profile.extension) == (8, 'PNG', '.png')
+    assert parseProfile('_Same') == OutputProfile(suffix='_Same')
+    with pytest.raises(ValueError):
+        parseProfile('_Preview:format=gif')
+    with pytest.raises(ValueError):
+        parseProfile('_Preview:size=8')
+
+
+# each factor is a multiple of the next smaller one, so every level is built from the previous one
+def test_resolveFactors():
+    profiles = [OutputProfile(factor=2), OutputProfile(factor=8), OutputProfile(factor=3)]
+    assert resolveFactors(profiles, 1000, 800) == [2, 8, 4]
+    # the longest edge of 1000 pixels within 256: a factor of 4, a multiple of 2 already
+    profiles = [OutputProfile(max_size=256), OutputProfile(factor=2)]
+    assert resolveFactors(profiles, 1000, 600) == [4, 2]
+    assert resolveFactors([OutputProfile(max_size=2000)], 1000, 600) == [1]
+
+
+# the outputs of a run share the first version free for all of them
+def test_getIndexNewFolders(tmp_path):
+    (tmp_path / 'Images').mkdir()
+    (tmp_path / 'Images_Reduced_Images_v0').mkdir()
+    (tmp_path / 'Images_Thumbnails_v0').mkdir()
+    (tmp_path / 'Images_Thumbnails_v1').mkdir()
+    folders = getIndexNewFolders(str(tmp_path / 'Images'), ['_Reduced_Images', '_Thumbnails'])
+    assert folders == ['Images_Reduced_Images_v2', 'Images_Thumbnails_v2']
+    assert getIndexNewFolders(str(tmp_path / 'Images') + '/', ['_Preview']) == ['Images_Preview_v0']
@@ -0,0 +1,59 @@
+## Columnar results of a run (imagesloader/records.py) and the log written from them.
+from imagesloader.records import ImageResult, RecordStore, splitPath
+from imagesloader.runlog import writeRecords
+
+
+def _store():
+    store = RecordStore()
+    store.append(ImageResult(1, 'D:/flights/12/a.tif', 'D:/flights_v0/12/a.jpg', 'UTM16', 'NAD 1983 UTM 16N',
+                             'SUCCESS', start='Start Time: 10:00', size=4000, output_size=400, seconds=1.5))
+    store.append(ImageResult(2, 'D:/flights/12/b.tif', '', '', 'Unknown', 'FAILED', 'No world file'))
+    store.append(ImageResult(3, 'D:/flights/13/a.tif', 'D:/flights_v0/13/a.jpg', 'UTM16', 'NAD 1983 UTM 16N',
+                             'SUCCESS', notes={'conversion': 'duplicate', 'duplicate of': 'D:/flights/12/a.tif'}))
+    return store
+
+
+def test_splitPath():
+    assert splitPath('D:\\flights/12\\a.tif') == ('D:\\flights/12\\', 'a.tif')
+    assert splitPath('a.tif') == ('', 'a.tif')
+
+
+# the rows read back as the results appended, the shared values kept once
+def test_store():
+    store = _store()
+    assert len(store) == 3
+    assert store[0] == ImageResult(1, 'D:/flights/12/a.tif', 'D:/flights_v0/12/a.jpg', 'UTM16', 'NAD 1983 UTM 16N',
+                                   'SUCCESS', start='Start Time: 10:00', size=4000, output_size=400, seconds=1.5)
+    assert store[1].error == 'No world file' and store[1].output == ''
+    assert len(store._folders.values) == 5 and len(store._crs.values) == 2
+    # the notes given out are copies
+    store[2].notes.clear()
+    assert store[2].notes['conversion'] == 'duplicate'
+
+
+def test_queries():
+    store = _store()
+    assert [r.index for r in store.select('SUCCESS')] == [1, 3]
+    assert [r.index for r in store.select(crs='Unknown')] == [2]
+    assert store.counts() == {('NAD 1983 UTM 16N', 'SUCCESS'): 2, ('Unknown', 'FAILED'): 1}
+    assert store.loaded() == [('D:/flights/12/a.tif', 'D:/flights_v0/12/a.jpg', 'NAD 1983 UTM 16N')]
+    assert store.find('D:/flights/12/b.tif').index == 2
+    assert store.find('D:/flights/14/a.tif') is None
+    # the last result of a source, also when added after a first find
+    store.append(ImageResult(4, 'D:/flights/12/b.tif', status='SUCCESS'))
+    assert store.find('D:/flights/12/b.tif').index == 4
+
+
+# a log written by writeRecords reads back into a store (without arcpy: blank metadata)
+def test_fromLog(tmp_path):
+    path = writeRecords(_store(), str(tmp_path), 'run')
+    assert path == str(tmp_path / 'log_run.csv')
+    store = RecordStore.fromLog(path)
+    assert [(r.index, r.source, r.output, r.mosaic, r.crs, r.status, r.error) for r in store] == [
+        (1, 'D:/flights/12/a.tif', 'D:/flights_v0/12/a.jpg', 'UTM16', 'NAD 1983 UTM 16N', 'SUCCESS', ''),
+        (2, 'D:/flights/12/b.tif', '', '', 'Unknown', 'FAILED', 'No world file'),
+        (3, 'D:/flights/13/a.tif', 'D:/flights_v0/13/a.jpg', 'UTM16', 'NAD 1983 UTM 16N', 'SUCCESS', '')]
+    assert store[2].notes == {'duplicate of': 'D:/flights/12/a.tif'}
+    assert len(store.loaded()) == 1
+    (tmp_path / 'empty.csv').write_text('')
+    assert len(RecordStore.fromLog(str(tmp_path / 'empty.csv'))) == 0
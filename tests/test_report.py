@@ -0,0 +1,75 @@
+## Run report (imagesloader/report.py).
+import json
+
+from imagesloader.records import ImageResult
+from imagesloader.report import GroupTiming, RunReport, errorClass
+
+
+def test_groups(tmp_path):
+    report = RunReport()
+    report.addGroup(GroupTiming('WGS 1984', 'MosaicDataset_WGS_1984', 1, images=3, failed=1, started=10.0,
+                                ended=14.5, busy=6.0))
+    report.addGroup(GroupTiming('NAD 1983', 'MosaicDataset_NAD_1983', 0, images=2, started=10.0, ended=11.0))
+    report.finish()
+    groups = report.toDict()['groups']
+    # sorted by coordinate system
+    assert [g['crs'] for g in groups] == ['NAD 1983', 'WGS 1984']
+    assert groups[1]['elapsed'] == 4.5
+    assert groups[1]['failed'] == 1
+    path = report.write(str(tmp_path), 'test')
+    with open(path) as f:
+        assert json.load(f)['groups'] == groups
+    assert "MosaicDataset_WGS_1984: 3 images, 1 failed, 4.5 sec (6.0 sec busy, lane 1)" in report.summary()
+
+
+# the failures of the same cause in different images fall in the same class
+def test_errorClass():
+    assert errorClass('ERROR 000732: Input Raster: Dataset D:/a.tif does not exist') == 'ERROR 000732'
+    assert errorClass('Cannot open D:\\flights\\12\\a.tif after 3 tries\ntrace') == 'Cannot open <path> after # tries'
+    assert errorClass('') == 'unknown'
+
+
+def test_results():
+    report = RunReport(slowest=2)
+    report.addResult(ImageResult(1, 'a.tif', 'a.jpg', status='SUCCESS', crs='UTM', size=4000, output_size=400,
+                                 seconds=1.0))
+    report.addResult(ImageResult(2, 'b.tif', status='FAILED', crs='UTM', error='ERROR 000732: b.tif', size=1000,
+                                 seconds=5.0, mosaic_seconds=1.0))
+    report.addResult(ImageResult(3, 'c.tif', status='FAILED', crs='Unknown', error='ERROR 000732: c.tif', size=1000,
+                                 seconds=3.0))
+    report.addResult(ImageResult(4, 'd.tif', 'd.jpg', status='SUCCESS', crs='UTM', size=2000, output_size=200))
+    data = report.toDict()
+    assert data['bytes'] == {'source': 8000, 'output': 600, 'ratio': 0.075}
+    assert data['crs'] == {'UTM': {'SUCCESS': 2, 'FAILED': 1}, 'Unknown': {'FAILED': 1}}
+    assert data['failures'] == [{'class': 'ERROR 000732', 'images': 2, 'example': 'b.tif',
+                                 'error': 'ERROR 000732: b.tif'}]
+    # the slowest images, conversion and mosaic, at most slowest of them
+    assert data['slowest'] == [{'source': 'b.tif', 'seconds': 6.0}, {'source': 'c.tif', 'seconds': 3.0}]
+    summary = report.summary()
+    assert 'sources 7.81 KB, reduced images 600.00 B (7.5%)' in summary
+    assert '2 failed with ERROR 000732 (e.g. b.tif)' in summary
+    assert 'slowest images: b.tif 6.0 sec, c.tif 3.0 sec' in summary
+
+
+def test_stages():
+    report = RunReport()
+    report.addStage('probe', 1, 1048576, 0.5)
+    report.addStage('probe', 2, 2097152, 1.0)
+    stages = report.toDict()['stages']
+    assert [s['name'] for s in stages] == ['probe']
+    assert stages[0]['images'] == 3 and stages[0]['bytes'] == 3145728 and stages[0]['busy'] == 1.5
+    # the first image started its seconds before it was added
+    assert stages[0]['elapsed'] >= 0.5
+    assert report.summary()[0].startswith('probe: 3 images, 3.00 MB in ')
+
+
+def test_duplicates_and_tiles():
+    report = RunReport()
+    report.addDuplicate('a.tif', 'sub/a.tif')
+    report.addDuplicate('a.tif', 'other/a.tif')
+    report.addTiles('UTM', 20, 3, (4, 12))
+    data = report.toDict()
+    assert data['duplicates'] == [{'original': 'a.tif', 'copies': ['sub/a.tif', 'other/a.tif']}]
+    summary = report.summary()
+    assert '2 duplicate images linked to 1 converted ones' in summary
+    assert 'tiles of UTM: 20 written, 3 deleted (zoom 4-12)' in summary
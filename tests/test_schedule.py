@@ -0,0 +1,36 @@
+## Largest-first scheduling of the conversions (imagesloader/schedule.py).
+from imagesloader.schedule import LptQueue, MakespanTracker, lptMakespan
+
+
+def test_lptQueue_largest_first():
+    jobs = LptQueue(lambda job: job[1])
+    for job in [('a', 10), ('b', 300), ('c', 10), ('d', 50)]:
+        jobs.push(job)
+    assert len(jobs) == 4
+    assert jobs.peek() == ('b', 300)
+    # equal costs keep their arrival order
+    assert [jobs.pop()[0] for i in range(4)] == ['b', 'd', 'a', 'c']
+    assert len(jobs) == 0
+
+
+def test_lptMakespan():
+    # largest first: 5+3 and 4+3+3, where the best split is 9
+    assert lptMakespan([5, 4, 3, 3, 3], 2) == 10
+    assert lptMakespan([7, 1, 1, 1], 3) == 7
+    # no worker counts as one
+    assert lptMakespan([1, 2], 0) == 3
+
+
+def test_makespanTracker():
+    tracker = MakespanTracker(2)
+    assert tracker.toDict()['planned_makespan'] == 0.0
+    tracker.started()
+    # 1 byte per second and per worker
+    for cost in [4, 2, 2]:
+        tracker.done(cost, float(cost))
+    schedule = tracker.toDict()
+    assert schedule['jobs'] == 3
+    assert schedule['bytes'] == 8
+    assert schedule['planned_makespan'] == 4.0
+    assert schedule['lower_bound_makespan'] == 4.0
+    assert schedule['actual_makespan'] >= 0.0
@@ -0,0 +1,81 @@
+## Point shapefile reader (imagesloader/shapefile.py), on small files written here.
+import math
+import struct
+
+import pytest
+
+from imagesloader.shapefile import readPointShapefile, shapefileFields
+
+PATH_LENGTH = 20
+
+
+# main file header of a .shp or .shx of length bytes: point shapes, unit bounding box
+def _header(length):
+    return struct.pack('>i20xi', 9994, length // 2) + struct.pack('<ii4d32x', 1000, 1, 0, 0, 1, 1)
+
+
+# point shapefile root + .shp/.shx/.dbf with a PATH character field; None in points is a null shape
+def writePoints(root, points, paths, deleted=()):
+    records = []
+    for i, point in enumerate(points):
+        content = struct.pack('<i', 0) if point is None else struct.pack('<idd', 1, *point)
+        records.append(struct.pack('>ii', i + 1, len(content) // 2) + content)
+    shp = b''.join(records)
+    shx = b''
+    offset = 100
+    for record in records:
+        shx += struct.pack('>ii', offset // 2, (len(record) - 8) // 2)
+        offset += len(record)
+    with open(root + '.shp', 'wb') as f:
+        f.write(_header(100 + len(shp)) + shp)
+    with open(root + '.shx', 'wb') as f:
+        f.write(_header(100 + len(shx)) + shx)
+    dbf = struct.pack('<BBBBIHH20x', 3, 24, 1, 1, len(paths), 32 + 32 + 1, 1 + PATH_LENGTH)
+    dbf += struct.pack('<11sc4xBB14x', b'PATH', b'C', PATH_LENGTH, 0) + b'\r'
+    for i, path in enumerate(paths):
+        dbf += (b'*' if i in deleted else b' ') + path.encode().ljust(PATH_LENGTH)
+    with open(root + '.dbf', 'wb') as f:
+        f.write(dbf + b'\x1a')
+    return root + '.shp'
+
+
+def test_points(tmp_path):
+    shp = writePoints(str(tmp_path / 'index'), [(500000.0, 4000000.0), (-87.5, 41.25)], ['a.tif', 'sub/b.tif'])
+    assert shapefileFields(shp) == ['PATH']
+    columns = readPointShapefile(shp, ['PATH'])
+    assert list(columns['PATH']) == ['a.tif', 'sub/b.tif']
+    assert list(columns['SHAPE@X']) == [500000.0, -87.5]
+    assert list(columns['SHAPE@Y']) == [4000000.0, 41.25]
+
+
+# a null shape is only its type: it reads as NaN and does not shift the points after it
+def test_null_shape(tmp_path):
+    shp = writePoints(str(tmp_path / 'index'), [(1.0, 2.0), None, (3.0, 4.0)], ['a.tif', 'b.tif', 'c.tif'])
+    columns = readPointShapefile(shp, ['PATH'])
+    assert list(columns['PATH']) == ['a.tif', 'b.tif', 'c.tif']
+    xs = columns['SHAPE@X']
+    ys = columns['SHAPE@Y']
+    assert (xs[0], ys[0]) == (1.0, 2.0)
+    assert math.isnan(xs[1]) and math.isnan(ys[1])
+    assert (xs[2], ys[2]) == (3.0, 4.0)
+
+
+# the last record a null shape: nothing is read past the end of the file
+def test_null_shape_last(tmp_path):
+    shp = writePoints(str(tmp_path / 'index'), [(1.0, 2.0), None], ['a.tif', 'b.tif'])
+    columns = readPointShapefile(shp, ['PATH'])
+    assert columns['SHAPE@X'][0] == 1.0
+    assert math.isnan(columns['SHAPE@X'][1])
+
+
+def test_deleted_records(tmp_path):
+    shp = writePoints(str(tmp_path / 'index'), [(1.0, 2.0), (3.0, 4.0)], ['a.tif', 'b.tif'], deleted={0})
+    columns = readPointShapefile(shp, ['PATH'])
+    assert list(columns['PATH']) == ['b.tif']
+    assert list(columns['SHAPE@X']) == [3.0]
+
+
+def test_missing_field(tmp_path):
+    shp = writePoints(str(tmp_path / 'index'), [(1.0, 2.0)], ['a.tif'])
+    with pytest.raises(ValueError, match='Missing Scale Column'):
+        readPointShapefile(shp, ['PATH', 'Scale'])
@@ -0,0 +1,73 @@
+## Strip streamed conversion (imagesloader/stream.py), the parts that do not need arcpy.
+import types
+
+import numpy as np
+
+from imagesloader.stream import OutputRaster, downsample, jpegBands, streamMemory, stripRows, to8bit
+
+SPATIAL_REFERENCE = types.SimpleNamespace(exportToString=lambda: 'PROJCS["NAD 1983 UTM Zone 16N"]')
+
+
+def test_stripRows():
+    # 1000 pixels of 2 bytes a row: 50 rows in 100000 bytes, rounded down to the factor
+    assert stripRows(1000, 1, 'U16', 1, 100000) == 50
+    assert stripRows(1000, 1, 'U16', 8, 100000) == 48
+    # at least one box of the factor
+    assert stripRows(1000, 1, 'U16', 8, 10) == 8
+
+
+# the memory depends on the strip, not on the height of the raster
+def test_streamMemory():
+    small = streamMemory(4000, 3000, 3, 'U8', (1,), 1048576)
+    huge = streamMemory(4000, 300000, 3, 'U8', (1,), 1048576)
+    assert small == huge
+    assert huge < 4000 * 300000 * 3
+    # a raster shorter than a strip
+    assert streamMemory(4000, 10, 3, 'U8', (1,), 1048576) < small
+
+
+def test_downsample():
+    block = np.arange(2 * 5 * 5, dtype=np.uint8).reshape(2, 5, 5)
+    reduced = downsample(block, 2)
+    assert reduced.shape == (2, 3, 3)
+    assert reduced[0, 0, 0] == block[0, :2, :2].mean()
+    # the last partial box is padded with the edge pixels
+    assert reduced[1, 2, 2] == block[1, 4, 4]
+    assert downsample(block, 1) is block
+
+
+def test_bands():
+    assert jpegBands(np.zeros((4, 2, 2))).shape[0] == 3
+    assert jpegBands(np.zeros((2, 2, 2))).shape[0] == 1
+    assert list(to8bit(np.array([-5.0, 12.0, 300.0]))) == [0, 12, 255]
+
+
+# strips of rows and bands of columns land at their place in the raster on disk
+def test_outputRaster(tmp_path):
+    world = (1.0, 0.0, 0.0, -1.0, 0.5, -0.5)
+    output = OutputRaster(str(tmp_path / 'a.jpg'), 4, 6, 3, world, SPATIAL_REFERENCE)
+    pixels = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+    output.write(0, 0, pixels[:2])
+    output.write(2, 0, pixels[2:, :4])
+    output.write(2, 4, pixels[2:, 4:])
+    output.close()
+    assert (np.fromfile(output.path, np.uint8).reshape(4, 6, 3) == pixels).all()
+    assert (tmp_path / 'a_temp.hdr').read_text().startswith('BYTEORDER I\nLAYOUT BIP\nNROWS 4\nNCOLS 6\nNBANDS 3')
+    assert (tmp_path / 'a_temp.bpw').is_file() and (tmp_path / 'a_temp.prj').is_file()
+    proxy, scale = output.proxy()
+    assert proxy.size == (6, 4) and scale == 1.0
+    output.remove()
+    assert list(tmp_path.iterdir()) == []
+
+
+# the proxy of a large raster is a mosaic of its tiles read from the disk
+def test_outputRaster_proxy(tmp_path):
+    output = OutputRaster(str(tmp_path / 'a.jpg'), 1024, 2048, 1, (1.0, 0.0, 0.0, -1.0, 0.5, -0.5),
+                          SPATIAL_REFERENCE)
+    output.write(0, 0, np.full((1024, 2048, 1), 7, np.uint8))
+    output.close()
+    proxy, scale = output.proxy()
+    assert proxy.mode == 'L' and proxy.size == (512, 512)
+    assert scale == 8.0
+    assert proxy.getextrema() == (7, 7)
+    output.remove()
@@ -0,0 +1,43 @@
+## 8 bit stretch (imagesloader/stretch.py) of a sample of the pixels.
+import numpy as np
+import pytest
+
+from imagesloader.stretch import Stretch, computeStretch
+
+
+def test_minmax():
+    sample = np.array([[100, 200, 300], [0, 1000, 4000]], dtype=np.uint16)
+    stretch = computeStretch(sample, 'minmax')
+    assert stretch.low == [100.0, 0.0] and stretch.high == [300.0, 4000.0]
+    block = sample.reshape(2, 1, 3)
+    assert stretch.apply(block).tolist() == [[[0, 128, 255]], [[0, 64, 255]]]
+
+
+# the clip % darkest and brightest pixels of each band are saturated
+def test_percent():
+    sample = np.arange(101, dtype=np.float32)[np.newaxis, :]
+    stretch = computeStretch(sample, 'percent', clip=10.0)
+    assert stretch.low == [10.0] and stretch.high == [90.0]
+    assert stretch.apply(np.array([[[0.0, 50.0, 100.0]]])).tolist() == [[[0, 128, 255]]]
+
+
+# mean +/- stddevs standard deviations, within the range of the sample
+def test_stddev():
+    sample = np.array([[0.0, 10.0, 10.0, 20.0]])
+    stretch = computeStretch(sample, 'stddev', stddevs=1.0)
+    std = sample.std()
+    assert stretch.low == pytest.approx([10.0 - std]) and stretch.high == pytest.approx([10.0 + std])
+    assert computeStretch(sample, 'stddev', stddevs=10.0).low == [0.0]
+
+
+def test_nodata_and_flat():
+    sample = np.array([[np.nan, 5.0, 15.0]])
+    assert computeStretch(sample, 'minmax').low == [5.0]
+    # a band of one value does not divide by 0
+    assert Stretch('minmax', [7], [7]).apply(np.full((1, 1, 2), 7.0)).tolist() == [[[0, 0]]]
+
+
+def test_describe_and_unknown():
+    assert Stretch('minmax', [0, 10], [255, 4000.5]).describe() == 'minmax: b1 0-255; b2 10-4000.5'
+    with pytest.raises(ValueError):
+        computeStretch(np.zeros((1, 2)), 'gamma')
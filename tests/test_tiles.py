@@ -0,0 +1,87 @@
+## Web tiles (imagesloader/tiles.py): the tile grid, the stores and the parent tiles.
+import sqlite3
+
+import numpy as np
+import pytest
+
+from imagesloader.tiles import (ORIGIN, TILE_SIZE, MbtilesStore, XyzStore, decodeTile, encodeTile,
+                                mercatorToLonLat, parentTile, tileBounds, tileResolution, tilesOf, zoomFor)
+
+
+def test_tileBounds():
+    assert tileBounds(0, 0, 0) == (-ORIGIN, -ORIGIN, ORIGIN, ORIGIN)
+    # rows are counted from the north
+    assert tileBounds(1, 1, 0) == (0.0, 0.0, ORIGIN, ORIGIN)
+    assert tileResolution(1) == ORIGIN / TILE_SIZE
+
+
+def test_tilesOf():
+    assert tilesOf((-ORIGIN, -ORIGIN, ORIGIN, ORIGIN), 1) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    assert tilesOf((10.0, 10.0, 20.0, 20.0), 1) == [(1, 0)]
+    # the box is clamped to the world
+    assert tilesOf((-2 * ORIGIN, 10.0, -ORIGIN / 2, 20.0), 2) == [(0, 1), (1, 1)]
+    xmin, ymin, xmax, ymax = tileBounds(12, 2000, 1500)
+    assert tilesOf((xmin + 1, ymin + 1, xmax - 1, ymax - 1), 12) == [(2000, 1500)]
+
+
+# the first level whose pixels are as fine as the images
+def test_zoomFor():
+    for resolution in (0.3, 1.0, 12.5, 5000.0):
+        z = zoomFor(resolution)
+        assert tileResolution(z) <= resolution < tileResolution(z - 1)
+    assert zoomFor(1e9) == 0
+    assert zoomFor(1e-6) == 22
+
+
+def test_mercatorToLonLat():
+    assert mercatorToLonLat(0.0, 0.0) == (0.0, 0.0)
+    lon, lat = mercatorToLonLat(ORIGIN, ORIGIN)
+    assert lon == pytest.approx(180.0) and lat == pytest.approx(85.0511, abs=1e-4)
+
+
+def _tile(value):
+    tile = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    tile[:, :] = (value, value, value, 255)
+    return tile
+
+
+def test_xyzStore(tmp_path):
+    store = XyzStore(str(tmp_path / 'group'))
+    assert store.read(3, 1, 2) is None and store.manifest() == {}
+    store.write(3, 1, 2, b'tile')
+    assert (tmp_path / 'group' / '3' / '1' / '2.png').read_bytes() == b'tile'
+    store.saveManifest({'images': {}})
+    assert store.manifest() == {'images': {}}
+    store.delete(3, 1, 2)
+    assert store.read(3, 1, 2) is None
+
+
+# MBTiles rows are counted from the south
+def test_mbtilesStore(tmp_path):
+    path = str(tmp_path / 'group.mbtiles')
+    store = MbtilesStore(path, 'JPEG')
+    store.write(3, 1, 2, b'tile')
+    assert store.read(3, 1, 2) == b'tile'
+    store.saveManifest({'name': 'group', 'min_zoom': 1, 'max_zoom': 3, 'bbox': [0.0, 0.0, ORIGIN, ORIGIN]})
+    store.close()
+    db = sqlite3.connect(path)
+    assert db.execute("SELECT tile_row FROM tiles WHERE zoom_level=3").fetchall() == [(5,)]
+    metadata = dict(db.execute("SELECT name, value FROM metadata"))
+    db.close()
+    assert metadata['format'] == 'jpg' and metadata['minzoom'] == '1' and metadata['maxzoom'] == '3'
+    assert metadata['bounds'].startswith('0.000000,0.000000,180.000000,85.05')
+    assert MbtilesStore(path).manifest()['name'] == 'group'
+
+
+# a parent tile is its four children halved; an empty child stays transparent
+def test_parentTile(tmp_path):
+    store = XyzStore(str(tmp_path / 'group'))
+    assert parentTile(store, 0, 0, 0) is None
+    store.write(1, 0, 0, encodeTile(_tile(200), 'PNG'))
+    store.write(1, 1, 1, encodeTile(_tile(100), 'PNG'))
+    parent = parentTile(store, 0, 0, 0)
+    half = TILE_SIZE // 2
+    assert tuple(parent[0, 0]) == (200, 200, 200, 255)
+    assert tuple(parent[-1, -1]) == (100, 100, 100, 255)
+    assert parent[0, half + 1, 3] == 0 and parent[half + 1, 0, 3] == 0
+    assert (decodeTile(encodeTile(_tile(50), 'PNG')) == _tile(50)).all()
@@ -0,0 +1,26 @@
+## Folder watcher (imagesloader/watch.py): the paths of its events match the ones of the listings.
+import importlib
+import ntpath
+import types
+
+from imagesloader.discovery import iterImageStats
+
+watch = importlib.import_module('imagesloader.watch')
+
+
+def test_notify_matches_listing(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'a.tif').write_bytes(b'')
+    folder = str(tmp_path)
+    watcher = watch.FolderWatcher(folder)
+    watcher._notify(str(tmp_path / 'sub' / 'a.tif'))
+    watcher._notify(str(tmp_path / 'sub' / 'a.txt'))
+    assert watcher._events == {f for f, stat in iterImageStats(folder)}
+
+
+# a windows folder keeps its backslashes, like the paths listed under it
+def test_notify_windows_folder(monkeypatch):
+    monkeypatch.setattr(watch, 'os', types.SimpleNamespace(path=ntpath, sep='\\'))
+    watcher = watch.FolderWatcher('C:\\data')
+    watcher._notify('C:\\data\\sub\\a.tif')
+    assert watcher._events == {'C:\\data/sub/a.tif'}
@@ -0,0 +1,64 @@
+## World files (imagesloader/worldfile.py), above all the rotation of the east-west frames.
+import pytest
+
+from imagesloader.worldfile import (findWorldFile, isRotated, readWorldFile, reduceWorld, rotateCounterClockwise,
+                                    writeWorld)
+
+# frame of an east-west flight line, 1 m pixels: the columns run north, the rows east
+ROTATED = (0.0, 1.0, 1.0, 0.0, 500000.0, 4000000.0)
+
+
+# (x, y) of the center of pixel (col, row)
+def _place(params, col, row):
+    A, D, B, E, C, F = params
+    return A * col + B * row + C, D * col + E * row + F
+
+
+def test_isRotated():
+    assert isRotated(ROTATED)
+    assert not isRotated((1.0, 0.0, 0.0, -1.0, 500000.0, 4000000.0))
+
+
+# the rotated image is north-up and its pixel (c, r) is where the old (width - 1 - r, c) was
+def test_rotateCounterClockwise():
+    width, height = 4, 3
+    rotated = rotateCounterClockwise(ROTATED, width)
+    assert rotated[:4] == (1.0, 0.0, 0.0, -1.0)
+    assert not isRotated(rotated)
+    for c in range(height):
+        for r in range(width):
+            assert _place(rotated, c, r) == _place(ROTATED, width - 1 - r, c)
+
+
+# a skewed world file (A and E not 0): every pixel still lands where it was
+def test_rotateCounterClockwise_skewed():
+    width, height = 5, 2
+    skewed = (0.25, 1.0, 1.0, -0.5, 1000.0, 2000.0)
+    rotated = rotateCounterClockwise(skewed, width)
+    assert rotated[:4] == (1.0, -0.5, -0.25, -1.0)
+    for c in range(height):
+        for r in range(width):
+            assert _place(rotated, c, r) == _place(skewed, width - 1 - r, c)
+
+
+def test_reduceWorld():
+    params = (1.0, 0.0, 0.0, -1.0, 100.0, 200.0)
+    reduced = reduceWorld(params, 4)
+    assert reduced[:4] == (4.0, 0.0, 0.0, -4.0)
+    # the center of the reduced pixel (0, 0) is the center of the box of pixels 0 to 3
+    assert _place(reduced, 0, 0) == (101.5, 198.5)
+
+
+def test_readWrite(tmp_path):
+    image = str(tmp_path / 'frame.jpg')
+    assert findWorldFile(image) == ''
+    path = writeWorld(str(tmp_path / 'frame.jgw'), ROTATED)
+    assert findWorldFile(image) == path
+    assert readWorldFile(path) == ROTATED
+
+
+def test_invalid(tmp_path):
+    path = tmp_path / 'frame.jgw'
+    path.write_text('1.0\n0.0\n')
+    with pytest.raises(ValueError):
+        readWorldFile(str(path))